@@ -1,11 +1,15 @@
+import argparse
 import csv
 import os
+import queue
 import random
+import threading
 import time
+from collections import defaultdict
 from datetime import datetime
 
+from backend.features import ollama, web_search
 from backend.features.ai_brain import AIBrain
-from backend.features import web_search
 
 SEED_TOPICS = [
     "global warming",
@@ -42,14 +46,41 @@ TEMPLATES = [
 
 LOG_PATH = "autotrain_log.csv"
 
+# Pipeline defaults; each can be overridden on the command line
+SEARCH_WORKERS = int(os.getenv("AUTOTRAIN_SEARCH_WORKERS", 4))
+LLM_WORKERS = int(os.getenv("AUTOTRAIN_LLM_WORKERS", 2))
+QUEUE_SIZE = int(os.getenv("AUTOTRAIN_QUEUE_SIZE", 8))
+SEARCH_RATE = float(os.getenv("AUTOTRAIN_SEARCH_RATE", 1.0))  # requests/second per provider
+LLM_RATE = float(os.getenv("AUTOTRAIN_LLM_RATE", 0))  # 0 = unlimited
+LOG_BATCH = int(os.getenv("AUTOTRAIN_LOG_BATCH", 25))
 
-def init_log(path: str) -> csv.writer:
-    exists = os.path.exists(path)
-    f = open(path, "a", newline="", encoding="utf-8")
-    writer = csv.writer(f)
-    if not exists:
-        writer.writerow(["timestamp", "question", "answer", "source"])
-    return writer
+
+class BatchedLog:
+    """CSV log that buffers rows and writes them in batches."""
+
+    def __init__(self, path: str, batch_size: int = LOG_BATCH) -> None:
+        exists = os.path.exists(path)
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.batch_size = batch_size
+        self.rows: list[list[str]] = []
+        if not exists:
+            self.writer.writerow(["timestamp", "question", "answer", "source"])
+
+    def write(self, row: list[str]) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows:
+            self.writer.writerows(self.rows)
+            self.rows = []
+        self.file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
 
 
 def generate_question(asked: set[str]) -> str:
@@ -70,32 +101,181 @@ def shorten(text: str, limit: int = 80) -> str:
     return text if len(text) <= limit else text[:limit] + "..."
 
 
-def main() -> None:
-    brain = AIBrain()
-    asked_questions: set[str] = set()
-    writer = init_log(LOG_PATH)
-    counter = 0
-    try:
+_STOP = object()
+
+
+class Autotrainer:
+    """Pipelined autotraining.
+
+    Question generation, web search, LLM answering and persistence run as
+    separate stages connected by bounded queues, so searches and
+    generations for different questions overlap. Requests are throttled
+    by one token bucket per provider (DuckDuckGo, Bing, Ollama), taken
+    where each request is sent, so cache hits cost nothing and the
+    Ollama fallback of a search shares the LLM rate."""
+
+    def __init__(self, brain: AIBrain, log: BatchedLog, search_workers: int = SEARCH_WORKERS,
+                 llm_workers: int = LLM_WORKERS, queue_size: int = QUEUE_SIZE,
+                 search_rate: float = SEARCH_RATE, llm_rate: float = LLM_RATE) -> None:
+        self.brain = brain
+        self.log = log
+        self.search_workers = search_workers
+        self.llm_workers = llm_workers
+        self.questions: queue.Queue = queue.Queue(queue_size)
+        self.searched: queue.Queue = queue.Queue(queue_size)
+        self.answered: queue.Queue = queue.Queue(queue_size)
+        self.limits = {**web_search.limits, "ollama": ollama.limit}
+        for name in web_search.limits:
+            self.limits[name].set_rate(search_rate)
+        self.limits["ollama"].set_rate(llm_rate)
+        self.stop = threading.Event()
+        self.stage_time: dict[str, float] = defaultdict(float)
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def _timed(self, stage: str, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.stage_time[stage] += time.perf_counter() - start
+
+    def _generate(self, limit: int | None) -> None:
+        asked: set[str] = set()
+        count = 0
+        while not self.stop.is_set() and (limit is None or count < limit):
+            question = self._timed("generate", generate_question, asked)
+            self.questions.put(question)
+            count += 1
+        for _ in range(self.search_workers):
+            self.questions.put(_STOP)
+
+    def _stage(self, name: str, inbox: queue.Queue, outbox: queue.Queue, func, done: list[int],
+               downstream: int) -> None:
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                with self._lock:
+                    done[0] -= 1
+                    last = done[0] == 0
+                if last:
+                    for _ in range(downstream):
+                        outbox.put(_STOP)
+                return
+            try:
+                result = self._timed(name, func, item)
+            except Exception as e:
+                print(f"[Error] {e}")
+                continue
+            outbox.put(result)
+
+    def _search(self, question: str):
+        return question, self.brain.search(question)
+
+    def _answer(self, item):
+        question, found = item
+        state = self.brain.prepare(question, found)
+        return state, self.brain.generate(state)
+
+    def _persist(self) -> None:
         while True:
-            counter += 1
-            question = generate_question(asked_questions)
+            item = self.answered.get()
+            if item is _STOP:
+                return
+            state, answer = item
             try:
-                answer = brain.ask(question)
+                answer = self._timed("persist", self.brain.finish, state, answer)
             except Exception as e:
                 print(f"[Error] {e}")
-                time.sleep(1)
                 continue
-            source = getattr(web_search, "last_used_source", "unknown")
-            print(f"[{counter}] {question} -> {shorten(answer)}")
-            writer.writerow([
+            with self._lock:
+                self.completed += 1
+                counter = self.completed
+            print(f"[{counter}] {state['prompt']} -> {shorten(answer)}")
+            self.log.write([
                 datetime.utcnow().isoformat(),
-                question,
+                state["prompt"],
                 answer,
-                source,
+                state["source"] or "unknown",
             ])
-            time.sleep(random.uniform(1, 2))
-    except KeyboardInterrupt:
-        print("Autotrain interrupted by user.")
+
+    def run(self, limit: int | None = None) -> None:
+        start = time.perf_counter()
+        search_left = [self.search_workers]
+        llm_left = [self.llm_workers]
+        threads = [threading.Thread(target=self._generate, args=(limit,), daemon=True)]
+        threads += [
+            threading.Thread(
+                target=self._stage,
+                args=("search", self.questions, self.searched, self._search, search_left, self.llm_workers),
+                daemon=True,
+            )
+            for _ in range(self.search_workers)
+        ]
+        threads += [
+            threading.Thread(
+                target=self._stage,
+                args=("llm", self.searched, self.answered, self._answer, llm_left, 1),
+                daemon=True,
+            )
+            for _ in range(self.llm_workers)
+        ]
+        persister = threading.Thread(target=self._persist, daemon=True)
+        threads.append(persister)
+        for t in threads:
+            t.start()
+        try:
+            while persister.is_alive():
+                persister.join(0.5)
+        except KeyboardInterrupt:
+            print("Autotrain interrupted by user, finishing in-flight questions...")
+            self.stop.set()
+            try:
+                persister.join()
+            except KeyboardInterrupt:
+                pass
+        finally:
+            self.log.flush()
+            self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed: float) -> None:
+        rate = self.completed / elapsed * 60 if elapsed else 0.0
+        print(f"Autotrain: {self.completed} questions in {elapsed:.1f}s ({rate:.1f} questions/min)")
+        busy = sum(self.stage_time.values())
+        for stage in ("generate", "search", "llm", "persist"):
+            spent = self.stage_time.get(stage, 0.0)
+            share = spent / busy * 100 if busy else 0.0
+            print(f"  {stage:<8} {spent:8.1f}s worker time ({share:4.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ask generated questions to build up knowledge.")
+    parser.add_argument("--limit", type=int, help="stop after this many questions")
+    parser.add_argument("--search-workers", type=int, default=SEARCH_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=LLM_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--search-rate", type=float, default=SEARCH_RATE,
+                        help="max requests per second to each search provider (0 = unlimited)")
+    parser.add_argument("--llm-rate", type=float, default=LLM_RATE,
+                        help="max Ollama generations per second (0 = unlimited)")
+    parser.add_argument("--log-batch", type=int, default=LOG_BATCH)
+    args = parser.parse_args()
+
+    log = BatchedLog(LOG_PATH, args.log_batch)
+    trainer = Autotrainer(
+        AIBrain(),
+        log,
+        search_workers=args.search_workers,
+        llm_workers=args.llm_workers,
+        queue_size=args.queue_size,
+        search_rate=args.search_rate,
+        llm_rate=args.llm_rate,
+    )
+    try:
+        trainer.run(args.limit)
+    finally:
+        log.close()
 
 
 if __name__ == "__main__":
@@ -1,28 +1,36 @@
-import json
 import os
 import sys
-from pathlib import Path
+from datetime import date, datetime, timezone
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from backend.utils.memory import MemoryManager
+from backend.utils.ledger import MEMORY_PATH, TRADE_LEDGER_PATH, TradeLedger
 
 load_dotenv()
 
 
-DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'memory.json')
-
-def generate_report(path: str = DEFAULT_PATH) -> str:
-    if not Path(path).exists():
-        return "No trade data."
-    mem = MemoryManager(path)
-    stats = mem.memory.get("stats", {"wins": 0, "losses": 0})
+def generate_report(path: str = MEMORY_PATH, day: date | None = None,
+                    ledger_path: str = TRADE_LEDGER_PATH) -> str:
+    """Per-ticker totals, the P/L of ``day`` (default today, UTC) and the win rate.
+
+    The figures come from the trade ledger at ``ledger_path``; ``path`` is
+    still the legacy ``memory.json``, whose totals the ledger imports the
+    first time it is opened."""
+    ledger = TradeLedger(ledger_path, path)
+    try:
+        totals = ledger.totals()
+        if not totals:
+            return "No trade data."
+        day = day or datetime.now(timezone.utc).date()
+        today = ledger.pnl_between(day, day)
+        stats = ledger.stats()
+    finally:
+        ledger.close()
     report_lines = ["Daily Report:"]
-    for ticker, info in mem.memory.items():
-        if ticker in ("stats", "cooldowns"):
-            continue
+    for ticker, info in totals.items():
         report_lines.append(f"{ticker}: P/L {info['total_profit']:.2f} from {info['trade_count']} trades")
+    report_lines.append(f"{day.isoformat()}: P/L {today['pnl']:.2f} from {today['trades']} trades")
     wins = stats.get("wins", 0)
     losses = stats.get("losses", 0)
     total = wins + losses
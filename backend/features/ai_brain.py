@@ -1,36 +1,72 @@
+import os
 import re
-import requests
+import time
 from collections import deque
+from typing import Iterator
 
 from backend.utils.memory import MemoryManager
+from backend.features import ollama
 from backend.features.web_search import (
-    web_search,
+    search_with_source,
     _extract_keywords,
     _contains_keyword,
     _keyword_overlap,
 )
 from backend.features.knowledge import KnowledgeBase
+from backend.features.maintenance import MaintenanceScheduler
+
+# conversations whose Ollama context grows beyond this many tokens start over
+OLLAMA_CONTEXT_MAX = int(os.getenv("OLLAMA_CONTEXT_MAX", 8192))
+# contexts of this many conversations are kept, the least recent dropped
+OLLAMA_CONVERSATIONS = int(os.getenv("OLLAMA_CONVERSATIONS", 100))
+
 
 class AIBrain:
     def __init__(self, model="mistral"):
         self.model = model
         self.memory = MemoryManager()
         self.knowledge = KnowledgeBase()
+        # prune/cleanup/deduplicate run in the background, not per question
+        self.maintenance = MaintenanceScheduler(self.knowledge).start()
         self.history = deque(self.memory.memory.get("history", []), maxlen=5)
+        # conversation -> {"model", "context"}: Ollama's token array so far
+        self.contexts = dict(self.memory.memory.get("ollama_contexts") or {})
+        self.memory.memory.pop("ollama_context", None)  # single shared context
+        # time-to-first-token and total time of the last answer, in seconds
+        self.last_timing: dict = {}
+        # one lock for the history and the memory the flush thread writes
+        self._lock = self.memory.lock
+
+    # ask() runs search -> prepare -> generate -> finish; the stages are
+    # public so pipelines (see autotrain.py) can run them concurrently.
+
+    def _conversation(self, conversation):
+        """The context stored for ``conversation`` if the current model made it."""
+        stored = self.contexts.get(conversation) if conversation is not None else None
+        if stored and stored.get("model") == self.model:
+            return stored["context"]
+        return None
+
+    def _keep_context(self, conversation, context) -> None:
+        if conversation is None:
+            return
+        self.contexts.pop(conversation, None)
+        # no new context (cached or fallback answer) or too long: the next
+        # prompt carries the history as text again
+        if context is not None and len(context) <= OLLAMA_CONTEXT_MAX:
+            self.contexts[conversation] = {"model": self.model, "context": context}
+            while len(self.contexts) > OLLAMA_CONVERSATIONS:
+                self.contexts.pop(next(iter(self.contexts)))
+        self.memory.memory["ollama_contexts"] = dict(self.contexts)
 
-    def ask(self, prompt: str) -> str:
-        self.memory.memory["last_prompt"] = prompt
-        self.history.append({"prompt": prompt, "answer": ""})
-        self.knowledge.prune()
-        self.knowledge.cleanup_low_quality()
+    def search(self, prompt: str) -> dict:
+        """Web search for ``prompt`` and store relevant facts."""
         keywords = _extract_keywords(prompt)
         source = None
-
         facts: list[str] = []
         learned = False
         try:
-            search_text = web_search(prompt)
-            source = getattr(web_search, "last_used_source", None)
+            search_text, source = search_with_source(prompt)
             raw_lines = [line.strip() for line in search_text.splitlines() if line.strip()]
             # ignore placeholder lines and filter for relevance
             all_facts = [l for l in raw_lines if not l.startswith('[')]
@@ -40,6 +76,25 @@ class AIBrain:
                     learned = True
         except Exception:
             facts = []  # offline or search failed
+        return {"facts": facts, "source": source, "learned": learned}
+
+    def prepare(self, prompt: str, found: dict | None = None, conversation: str | None = None) -> dict:
+        """Consult the knowledge base and build the enriched prompt.
+
+        With a ``conversation`` id the prompt continues that conversation's
+        Ollama context; without one it stands alone (as in autotrain)."""
+        if found is None:
+            found = self.search(prompt)
+        turn = {"prompt": prompt, "answer": ""}
+        with self._lock:
+            self.memory.memory["last_prompt"] = prompt
+            self.history.append(turn)
+            previous = list(self.history)[-5:-1]
+            context = self._conversation(conversation)
+        keywords = _extract_keywords(prompt)
+        source = found["source"]
+        facts = list(found["facts"])
+        learned = found["learned"]
 
         stored_facts = self.knowledge.get_facts(prompt)
         unique_facts = {}
@@ -60,54 +115,67 @@ class AIBrain:
             learned = True
 
         parts = []
-        if len(self.history) > 1:
-            for h in list(self.history)[-5:-1]:
-                if h.get("prompt") and h.get("answer"):
-                    parts.append(f"Prev Q: {h['prompt']}\nPrev A: {h['answer']}")
+        # with a context Ollama already holds the earlier turns
+        for h in previous if context is None else []:
+            if h.get("prompt") and h.get("answer"):
+                parts.append(f"Prev Q: {h['prompt']}\nPrev A: {h['answer']}")
         if facts:
             parts.append("Web facts:\n" + "\n".join(facts))
         if similar_entry:
             parts.append("Past answer:\n" + similar_entry["answer"])
         parts.append(f"User asked: {prompt}")
-        enriched_prompt = "\n\n".join(parts)
 
-        try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": enriched_prompt,
-                    "stream": False,
-                },
-                timeout=10
-            )
-            answer = response.json().get("response", "").strip()
-            if not answer:
-                raise ValueError("Ollama returned empty response.")
-        except Exception:
-            if similar_entry:
-                answer = similar_entry["answer"]
-            elif facts:
-                answer = "\n".join(facts)
-            else:
-                answer = "[No answer available]"
+        return {
+            "prompt": prompt,
+            "keywords": keywords,
+            "source": source,
+            "facts": facts,
+            "learned": learned,
+            "similar_entry": similar_entry,
+            "enriched_prompt": "\n\n".join(parts),
+            "turn": turn,
+            "context": context,
+            "conversation": conversation,
+        }
+
+    def _fallback_answer(self, state: dict, cache: bool = True) -> str:
+        """Answer used when Ollama fails or returns nothing."""
+        if state["similar_entry"]:
+            answer = state["similar_entry"]["answer"]
+        elif state["facts"]:
+            answer = "\n".join(state["facts"])
+        else:
+            answer = "[No answer available]"
 
         if answer == "[No answer available]":
             try:
-                res = requests.post(
-                    "http://localhost:11434/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": f"Summarize the topic: {prompt}",
-                        "stream": False,
-                    },
-                    timeout=10,
+                summary = ollama.generate(
+                    self.model, f"Summarize the topic: {state['prompt']}", cache=cache
                 )
-                summary = res.json().get("response", "").strip()
                 if summary:
                     answer = f"[Ollama summary] {summary}"
             except Exception:
                 pass
+        return answer
+
+    def generate(self, state: dict, cache: bool = True) -> str:
+        """Answer the enriched prompt with Ollama, or fall back."""
+        try:
+            answer = ollama.generate(
+                self.model, state["enriched_prompt"], cache=cache, context=state["context"],
+                on_context=lambda context: state.update(next_context=context),
+            )
+            if not answer:
+                raise ValueError("Ollama returned empty response.")
+        except Exception:
+            answer = self._fallback_answer(state, cache=cache)
+        return answer
+
+    def finish(self, state: dict, answer: str) -> str:
+        """Persist the answer to memory and knowledge; return the final text."""
+        prompt = state["prompt"]
+        similar_entry = state["similar_entry"]
+        learned = state["learned"]
 
         # Determine if the answer is valid and on-topic
         invalid_markers = [
@@ -119,28 +187,91 @@ class AIBrain:
         ]
         is_valid = not any(m in answer for m in invalid_markers)
         if is_valid:
-            is_valid = _contains_keyword(answer, keywords)
+            is_valid = _contains_keyword(answer, state["keywords"])
 
         # Persist answer
-        self.memory.memory["last_answer"] = answer
-        self.memory.memory.setdefault("knowledge", [])
-        self.memory.memory["knowledge"].append({"prompt": prompt, "answer": answer})
-        if self.history:
-            self.history[-1]["answer"] = answer
-        self.memory.memory["history"] = list(self.history)
-        self.memory.save()
+        with self._lock:
+            self.memory.memory["last_answer"] = answer
+            # appends, so answers from other processes are kept
+            self.memory.append("knowledge", {"prompt": prompt, "answer": answer})
+            state["turn"]["answer"] = answer
+            self.memory.append("history", state["turn"], maxlen=self.history.maxlen)
+            self._keep_context(state.get("conversation"), state.get("next_context"))
+            self.memory.save()
 
         if is_valid:
-            qa_source = source or "ollama"
+            qa_source = state["source"] or "ollama"
             if similar_entry and len(answer) > len(similar_entry.get("answer", "")):
                 self.knowledge.update_answer(similar_entry["question"], answer)
                 learned = True
             else:
                 if self.knowledge.add_qa(prompt, answer, source=qa_source):
                     learned = True
-        self.knowledge.deduplicate()
 
         if learned:
             answer += "\n[Learned Memory]"
 
         return answer
+
+    def ask(self, prompt: str, cache: bool = True, conversation: str | None = "default") -> str:
+        """Answer ``prompt``; ``cache=False`` forces a fresh Ollama generation.
+
+        ``conversation`` identifies whose Ollama context to continue."""
+        state = self.prepare(prompt, conversation=conversation)
+        start = time.perf_counter()
+        answer = self.generate(state, cache=cache)
+        elapsed = time.perf_counter() - start
+        self.last_timing = {"ttft": elapsed, "total": elapsed}
+        return self.finish(state, answer)
+
+    def _drop_turn(self, state: dict) -> None:
+        """Forget the history turn ``prepare`` added for an unfinished answer."""
+        with self._lock:
+            turn = state["turn"]
+            self.history = deque((t for t in self.history if t is not turn), maxlen=self.history.maxlen)
+
+    def ask_stream(self, prompt: str, cache: bool = True,
+                   conversation: str | None = "default") -> Iterator[str]:
+        """Like :meth:`ask` but yield the answer as Ollama generates it.
+
+        The answer is persisted once the stream has been consumed; the
+        final chunk carries the ``[Learned Memory]`` marker if applicable.
+        If Ollama fails before producing anything the fallback answer is
+        yielded as a single chunk. If the stream breaks after that, the
+        partial answer is not stored and the last chunk is an
+        ``[Answer interrupted]`` notice. A consumer that stops early leaves
+        no trace in the history either."""
+        state = self.prepare(prompt, conversation=conversation)
+        finished = False
+        try:
+            start = time.perf_counter()
+            ttft = None
+            chunks: list[str] = []
+            error = None
+            try:
+                for chunk in ollama.generate_stream(
+                    self.model, state["enriched_prompt"], cache=cache, context=state["context"],
+                    on_context=lambda context: state.update(next_context=context),
+                ):
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks.append(chunk)
+                    yield chunk
+            except Exception as e:
+                error = e
+            total = time.perf_counter() - start
+            self.last_timing = {"ttft": ttft if ttft is not None else total, "total": total}
+            answer = "".join(chunks).strip()
+            if answer and error is not None:
+                yield f"\n[Answer interrupted: {error}]"
+                return
+            if not answer:
+                answer = self._fallback_answer(state, cache=cache)
+                yield answer
+            final = self.finish(state, answer)
+            finished = True
+            if len(final) > len(answer):
+                yield final[len(answer):]
+        finally:
+            if not finished:
+                self._drop_turn(state)
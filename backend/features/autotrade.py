@@ -1,12 +1,23 @@
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import pandas as pd
-from alpaca_trade_api import REST, TimeFrame
+from alpaca_trade_api import REST
 
+from backend.utils.ledger import TradeLedger
 from backend.utils.memory import MemoryManager
+from .bar_store import BarStore
+from .fill_reconciler import FillReconciler
+from .market_data import MarketSnapshot, fetch_snapshot
+from .order_executor import OrderExecutor
 from .telegram_alerts import send_telegram_alert
-from .strategies import rsi_strategy, ema_strategy, macd_strategy
+from .strategies import (
+    align_closes,
+    rsi_strategy, ema_strategy, macd_strategy,
+    rsi_signals, ema_signals, macd_signals,
+    rsi_signal_matrix, ema_signal_matrix, macd_signal_matrix,
+    RSISignal, EMASignal, MACDSignal,
+)
 
 # ✅ Use correct environment variable names for Alpaca
 ALPACA_KEY = os.getenv("APCA_API_KEY_ID")
@@ -20,6 +31,8 @@ COOLDOWN = int(os.getenv("TRADE_COOLDOWN", 3600))
 
 aip = REST(ALPACA_KEY, ALPACA_SECRET, base_url=ALPACA_BASE_URL)
 memory = MemoryManager()
+ledger = TradeLedger()
+bar_store = BarStore()
 
 STRATEGIES = {
     "RSI": rsi_strategy,
@@ -27,46 +40,138 @@ STRATEGIES = {
     "MACD": macd_strategy,
 }
 
+BATCH_STRATEGIES = {
+    "RSI": rsi_signals,
+    "EMA": ema_signals,
+    "MACD": macd_signals,
+}
+
+SIGNAL_MATRICES = {
+    "RSI": rsi_signal_matrix,
+    "EMA": ema_signal_matrix,
+    "MACD": macd_signal_matrix,
+}
+
+SIGNAL_STREAMS = {
+    "RSI": RSISignal,
+    "EMA": EMASignal,
+    "MACD": MACDSignal,
+}
+
 def choose_strategy():
     return STRATEGIES.get(STRATEGY, rsi_strategy)
 
+def choose_batch_strategy():
+    return BATCH_STRATEGIES.get(STRATEGY, rsi_signals)
+
+def choose_signal_matrix(name: str | None = None):
+    return SIGNAL_MATRICES.get((name or STRATEGY).upper(), rsi_signal_matrix)
+
+def choose_signal_stream(name: str | None = None):
+    return SIGNAL_STREAMS.get((name or STRATEGY).upper(), RSISignal)
+
 def position_size(price: float, cash: float) -> int:
     budget = min(cash * TRADE_PERCENT, TRADE_CAP)
     return int(budget // price)
 
-def trade_signal(symbol: str) -> str:
-    end = datetime.utcnow()
-    start = end - pd.Timedelta(days=10)
-    bars = aip.get_bars(symbol, TimeFrame.Hour, start, end).df
-    if bars.empty:
+def trade_signal(symbol: str, prices: pd.Series | None = None) -> str:
+    if prices is None:
+        bar_store.update(aip, [symbol])
+        start = datetime.now(timezone.utc) - pd.Timedelta(days=10)
+        prices = bar_store.closes(symbol, start)
+    if prices.empty:
         return "hold"
-    prices = bars.close
     strategy = choose_strategy()
     return strategy(prices)
 
-def execute_trade(symbol: str) -> None:
-    if not memory.should_trade(symbol, COOLDOWN):
+def batch_signals(snapshot: MarketSnapshot, symbols: list[str]) -> dict[str, str]:
+    """Evaluate the strategy for all ``symbols`` in one NumPy pass."""
+    closes = {sym: snapshot.closes_for(sym) for sym in symbols}
+    closes = {sym: c for sym, c in closes.items() if not c.empty}
+    if not closes:
+        return {}
+    strategy = choose_batch_strategy()
+    return strategy(align_closes(closes))
+
+def record_order(order, result, error) -> None:
+    """Persist the cooldown, track the order for its fill and send the alert."""
+    if error is not None:
+        print(f"Autotrade order failed for {order.symbol}: {error}")
         return
-    account = aip.get_account()
-    cash = float(account.cash)
-    last_price = float(aip.get_latest_trade(symbol).price)
-    qty = position_size(last_price, cash)
+    memory.set_cooldown(order.symbol)
+    # the fill is booked when the broker reports it, see fill_reconciler
+    try:
+        ledger.add_order(order.client_order_id, order.symbol, order.side, order.qty)
+        reconciler.book(order.client_order_id, result)
+    except Exception as exc:
+        print(f"[Ledger Error] {exc}")
+    reconciler.start()
+    send_telegram_alert(f"Submitted {order.side} {order.qty} {order.symbol} @ ~{order.price}")
+
+def alert_fill(fill: dict) -> None:
+    verb = "Bought" if fill["side"] == "buy" else "Sold"
+    send_telegram_alert(f"{verb} {fill['qty']:g} {fill['ticker']} @ {fill['price']:.2f}")
+
+executor = OrderExecutor(aip, on_result=record_order)
+reconciler = FillReconciler(aip, ledger, executor.bucket, on_fill=alert_fill)
+
+def execute_trade(symbol: str, snapshot: MarketSnapshot | None = None, action: str | None = None) -> str:
+    """Submit the order for ``symbol`` if the rules allow; return what happened."""
+    if not memory.should_trade(symbol, COOLDOWN):
+        return "cooldown"
+    if executor.in_flight(symbol):
+        return "in flight"
+    if snapshot is None:
+        snapshot = fetch_snapshot(aip, [symbol], store=bar_store)
+    if symbol not in snapshot.prices:
+        print(f"Autotrade: no latest trade for {symbol}")
+        return "no price"
+    last_price = snapshot.prices[symbol]
+    qty = position_size(last_price, snapshot.cash)
     if qty <= 0:
-        return
-    action = trade_signal(symbol)
+        return "no cash"
+    if action is None:
+        action = trade_signal(symbol, snapshot.closes_for(symbol))
+    if action not in ("buy", "sell"):
+        return "hold"
+    # submission, cooldown and alert happen on the executor's threads
+    if not executor.submit(symbol, qty, action, last_price):
+        return "in flight"
     if action == "buy":
-        aip.submit_order(symbol, qty, "buy", "market", "gtc")
-        memory.set_cooldown(symbol)
-        send_telegram_alert(f"Bought {qty} {symbol} @ {last_price}")
-    elif action == "sell":
-        aip.submit_order(symbol, qty, "sell", "market", "gtc")
-        memory.set_cooldown(symbol)
-        send_telegram_alert(f"Sold {qty} {symbol} @ {last_price}")
-
-def run_autotrader(symbols=None):
+        # the account is fetched once per cycle; keep the cash figure honest
+        snapshot.cash -= qty * last_price
+    return action
+
+def run_autotrader(symbols=None) -> dict[str, str]:
+    """One trading cycle; returns the outcome per symbol."""
     symbols = symbols or ["AAPL"]
+    # books fills of orders submitted earlier, also by previous runs
+    reconciler.start()
+    results = {}
+    active = []
     for sym in symbols:
+        if not memory.should_trade(sym, COOLDOWN):
+            results[sym] = "cooldown"
+        elif executor.in_flight(sym):
+            results[sym] = "in flight"
+        else:
+            active.append(sym)
+    if not active:
+        return results
+    try:
+        snapshot = fetch_snapshot(aip, active, store=bar_store)
+    except Exception as exc:
+        print(f"Autotrade error fetching market data: {exc}")
+        return {**results, **{sym: "error" for sym in active}}
+    try:
+        signals = batch_signals(snapshot, active)
+    except Exception as exc:
+        print(f"Autotrade error evaluating signals: {exc}")
+        return {**results, **{sym: "error" for sym in active}}
+    for sym in active:
         try:
-            execute_trade(sym)
+            results[sym] = execute_trade(sym, snapshot, signals.get(sym, "hold"))
         except Exception as exc:
             print(f"Autotrade error for {sym}: {exc}")
+            results[sym] = "error"
+    return results
@@ -0,0 +1,199 @@
+"""Replay stored bars through the autotrader's trading rules.
+
+Signals come from the same strategies as ``run_autotrader``, computed for
+the whole history at once as signal matrices. Order sizes come from
+``position_size`` and the cooldown from ``MemoryManager``, with the bar time
+standing in for the clock. Orders are filled by :class:`SimBroker` at the
+close of the bar that produced the signal. Only the bars with a buy or
+sell signal are visited, so years of hourly bars replay in seconds.
+
+Differences from live trading: indicators see the full stored history
+rather than the last ``BAR_WINDOW_DAYS``, and sells are capped at the
+shares held (no short positions).
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.memory import MemoryManager
+from .autotrade import COOLDOWN, choose_signal_matrix, position_size
+from .bar_store import BarStore
+from .strategies import BUY, align_closes
+
+BACKTEST_BARS_PATH = os.getenv(
+    "BACKTEST_BARS_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'backtest_bars')
+)
+BACKTEST_MEMORY_PATH = os.getenv(
+    "BACKTEST_MEMORY_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'backtest_memory.json')
+)
+BACKTEST_CASH = float(os.getenv("BACKTEST_CASH", 100000))
+# history kept in the backtest bar store; --days only picks the replayed part
+BACKTEST_RETENTION_DAYS = int(os.getenv("BACKTEST_RETENTION_DAYS", 365))
+
+
+class SimBroker:
+    """Fills market orders immediately and tracks cash and positions.
+
+    Closing fills are reported to ``memory.record_trade`` against the
+    average cost of the position."""
+
+    def __init__(self, cash: float, memory: MemoryManager | None = None) -> None:
+        self.initial_cash = cash
+        self.cash = cash
+        self.memory = memory
+        # symbol -> [shares, average cost]
+        self.positions: dict[str, list[float]] = {}
+        self.fills: list[tuple] = []
+        self.traded = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.realized = 0.0
+
+    def submit_order(self, symbol: str, qty: int, side: str, price: float, when=None) -> int:
+        """Fill ``qty`` shares at ``price``; return the shares filled."""
+        position = self.positions.setdefault(symbol, [0, 0.0])
+        if side == "sell":
+            qty = min(qty, position[0])
+            if qty <= 0:
+                return 0
+            cost = position[1]
+            position[0] -= qty
+            self.cash += qty * price
+            if self.memory is not None:
+                self.memory.record_trade(symbol, cost, price, qty)
+            pnl = (price - cost) * qty
+            self.realized += pnl
+            if pnl > 0:
+                self.wins += 1
+            else:
+                self.losses += 1
+        else:
+            shares, cost = position
+            position[0] = shares + qty
+            position[1] = (shares * cost + qty * price) / position[0]
+            self.cash -= qty * price
+        self.traded += qty * price
+        self.fills.append((when, symbol, side, qty, price))
+        return qty
+
+    def equity(self, prices: dict[str, float]) -> float:
+        """Cash plus open positions marked at ``prices``."""
+        held = sum(shares * prices.get(sym, cost) for sym, (shares, cost) in self.positions.items())
+        return self.cash + held
+
+
+def load_prices(store: BarStore, symbols: list[str], start=None) -> pd.DataFrame:
+    """Stored closes of ``symbols`` as a (bars x symbols) frame.
+
+    The index is the union of all bar times; a symbol without a bar at a
+    given time has NaN there."""
+    closes = {sym: store.closes(sym, start) for sym in symbols}
+    closes = {sym: c for sym, c in closes.items() if len(c)}
+    if not closes:
+        return pd.DataFrame()
+    return pd.concat(closes, axis=1).sort_index()
+
+
+def pack(prices: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Return each symbol's own bars end-aligned, and the mask of bars.
+
+    The gaps of the union index are removed per column, so indicators on
+    the packed matrix see the same series the live autotrader would."""
+    values = prices.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    packed = align_closes({j: pd.Series(values[valid[:, j], j]) for j in range(values.shape[1])})
+    return packed.to_numpy(dtype=float), valid
+
+
+def unpack(codes: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Put signal codes of a packed matrix back at the symbols' bar times."""
+    out = np.zeros(valid.shape, dtype=np.int8)
+    for j in range(valid.shape[1]):
+        count = int(valid[:, j].sum())
+        if count:
+            out[valid[:, j], j] = codes[len(codes) - count:, j]
+    return out
+
+
+def signal_matrix(prices: pd.DataFrame, strategy) -> np.ndarray:
+    """Evaluate a signal-matrix function on each symbol's own bars."""
+    packed, valid = pack(prices)
+    return unpack(strategy(packed), valid)
+
+
+def run_backtest(prices: pd.DataFrame, strategy: str | None = None, cash: float = BACKTEST_CASH,
+                 cooldown: int = COOLDOWN, memory: MemoryManager | None = None,
+                 signals: np.ndarray | None = None) -> dict:
+    """Replay ``prices`` through the trading rules and return a report.
+
+    ``signals`` replaces the strategy with a precomputed signal matrix. The
+    memory is written to ``BACKTEST_MEMORY_PATH`` unless one is passed in."""
+    started = time.perf_counter()
+    save = memory is None
+    if memory is None:
+        memory = MemoryManager(BACKTEST_MEMORY_PATH, autosave=False)
+        memory.reset()
+    broker = SimBroker(cash, memory)
+    symbols = list(prices.columns)
+    values = prices.to_numpy(dtype=float)
+    if signals is None:
+        signals = signal_matrix(prices, choose_signal_matrix(strategy))
+    # epoch seconds whatever the index resolution (pandas 3 defaults to us)
+    times = prices.index.as_unit("ns").asi8 / 1e9 if len(prices) else np.empty(0)
+
+    # row-major order: bar by bar, symbols in watchlist order like run_autotrader
+    for i, j in zip(*np.nonzero(signals)):
+        sym, now = symbols[j], float(times[i])
+        if not memory.should_trade(sym, cooldown, now):
+            continue
+        price = values[i, j]
+        qty = position_size(price, broker.cash)
+        if qty <= 0:
+            continue
+        side = "buy" if signals[i, j] == BUY else "sell"
+        if broker.submit_order(sym, qty, side, price, prices.index[i]):
+            memory.set_cooldown(sym, now)
+    if save:
+        memory.save()
+        memory.flush()
+
+    last_prices = prices.ffill().iloc[-1].to_dict() if len(prices) else {}
+    final = broker.equity(last_prices)
+    closed = broker.wins + broker.losses
+    return {
+        "start": prices.index[0] if len(prices) else None,
+        "end": prices.index[-1] if len(prices) else None,
+        "bars": len(prices),
+        "symbols": len(symbols),
+        "signals": int(np.count_nonzero(signals)),
+        "initial_cash": cash,
+        "final_equity": final,
+        "pnl": final - cash,
+        "return_pct": (final - cash) / cash * 100 if cash else 0.0,
+        "realized_pnl": broker.realized,
+        "fills": len(broker.fills),
+        "buys": sum(1 for f in broker.fills if f[2] == "buy"),
+        "sells": sum(1 for f in broker.fills if f[2] == "sell"),
+        "wins": broker.wins,
+        "losses": broker.losses,
+        "win_rate": broker.wins / closed * 100 if closed else 0.0,
+        "turnover": broker.traded / cash if cash else 0.0,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        "Backtest Report:",
+        f"Period: {report['start']} -> {report['end']} ({report['bars']} bars, {report['symbols']} symbols)",
+        f"P/L: {report['pnl']:.2f} ({report['return_pct']:.2f}%), realized {report['realized_pnl']:.2f}",
+        f"Equity: {report['initial_cash']:.2f} -> {report['final_equity']:.2f}",
+        f"Fills: {report['fills']} ({report['buys']} buys, {report['sells']} sells) from {report['signals']} signals",
+        f"Win rate: {report['win_rate']:.2f}% ({report['wins']}W/{report['losses']}L)",
+        f"Turnover: {report['turnover']:.2f}x initial cash",
+        f"Replayed in {report['elapsed']:.2f}s",
+    ]
+    return "\n".join(lines)
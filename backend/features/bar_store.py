@@ -0,0 +1,198 @@
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from alpaca_trade_api import TimeFrame
+
+BAR_STORE_PATH = os.getenv(
+    "BAR_STORE_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'bars')
+)
+BAR_RETENTION_DAYS = int(os.getenv("BAR_RETENTION_DAYS", 30))
+
+_TS_FILE = "timestamp.i8"
+_COVERAGE_FILE = "coverage.i8"
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class BarStore:
+    """Local per-symbol bar cache backed by memory-mapped column files.
+
+    Each ``<root>/<timeframe>/<SYMBOL>/`` directory holds one raw int64 file
+    of UTC timestamps (ns) and one float64 file per OHLCV column. New bars
+    are appended in place, so an update only downloads bars after the last
+    stored timestamp, and reads map the files into ``pd.Series`` without
+    copying. Bars older than ``retention_days`` are dropped on compaction."""
+
+    def __init__(self, root: str = BAR_STORE_PATH, timeframe: TimeFrame = TimeFrame.Hour,
+                 retention_days: int = BAR_RETENTION_DAYS) -> None:
+        self.timeframe = timeframe
+        self.root = os.path.join(os.path.abspath(root), str(timeframe))
+        self.retention = pd.Timedelta(days=retention_days)
+        self._lock = threading.RLock()
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.upper())
+
+    def _map(self, symbol: str, name: str, dtype, mode: str = "r") -> np.ndarray:
+        path = os.path.join(self._dir(symbol), name)
+        if not os.path.exists(path) or os.path.getsize(path) < np.dtype(dtype).itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode=mode)
+
+    def _arrays(self, symbol: str, mode: str = "r") -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        ts = self._map(symbol, _TS_FILE, np.int64, mode)
+        cols = {c: self._map(symbol, f"{c}.f8", np.float64, mode) for c in COLUMNS}
+        # a crash between column and timestamp writes leaves extra column rows
+        n = min([len(ts)] + [len(a) for a in cols.values()])
+        return ts[:n], {c: a[:n] for c, a in cols.items()}
+
+    def coverage_start(self, symbol: str) -> pd.Timestamp | None:
+        """Start of the range that has been requested for ``symbol``."""
+        value = self._map(symbol, _COVERAGE_FILE, np.int64)
+        return pd.Timestamp(int(value[0]), tz="UTC") if len(value) else None
+
+    def _set_coverage_start(self, symbol: str, start: pd.Timestamp) -> None:
+        os.makedirs(self._dir(symbol), exist_ok=True)
+        tmp = os.path.join(self._dir(symbol), _COVERAGE_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(np.int64(_to_ns(start)).tobytes())
+        os.replace(tmp, os.path.join(self._dir(symbol), _COVERAGE_FILE))
+
+    def first_timestamp(self, symbol: str) -> pd.Timestamp | None:
+        ts, _ = self._arrays(symbol)
+        return pd.Timestamp(int(ts[0]), tz="UTC") if len(ts) else None
+
+    def last_timestamp(self, symbol: str) -> pd.Timestamp | None:
+        ts, _ = self._arrays(symbol)
+        return pd.Timestamp(int(ts[-1]), tz="UTC") if len(ts) else None
+
+    def load(self, symbol: str, start: datetime | None = None) -> pd.DataFrame:
+        """Return stored bars at or after ``start`` as a DataFrame."""
+        ts, cols = self._arrays(symbol)
+        lo = self._start_index(ts, start)
+        index = self._index(ts[lo:])
+        return pd.DataFrame({c: a[lo:] for c, a in cols.items()}, index=index, copy=False)
+
+    def closes(self, symbol: str, start: datetime | None = None) -> pd.Series:
+        """Return closes at or after ``start``; the values are a view of the file."""
+        ts, cols = self._arrays(symbol)
+        lo = self._start_index(ts, start)
+        return pd.Series(cols["close"][lo:], index=self._index(ts[lo:]), name="close", copy=False)
+
+    @staticmethod
+    def _index(ts: np.ndarray) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(ts.view("datetime64[ns]")).tz_localize("UTC")
+
+    @staticmethod
+    def _start_index(ts: np.ndarray, start: datetime | None) -> int:
+        if start is None or not len(ts):
+            return 0
+        return int(np.searchsorted(ts, _to_ns(start), side="left"))
+
+    def append(self, symbol: str, bars: pd.DataFrame) -> int:
+        """Store ``bars`` newer than the last stored bar; return rows added.
+
+        A bar with the same timestamp as the last stored one replaces it, so
+        a partially formed last bar gets corrected on the next update."""
+        if bars.empty:
+            return 0
+        with self._lock:
+            os.makedirs(self._dir(symbol), exist_ok=True)
+            bars = bars.sort_index()
+            new_ts = np.asarray([_to_ns(t) for t in bars.index], dtype=np.int64)
+            ts, cols = self._arrays(symbol, mode="r+")
+            if len(ts):
+                last = ts[-1]
+                same = new_ts == last
+                if same.any():
+                    row = bars[same].iloc[-1]
+                    for c in COLUMNS:
+                        cols[c][-1] = float(row.get(c, np.nan))
+                    cols["close"].flush()
+                keep = new_ts > last
+                bars, new_ts = bars[keep], new_ts[keep]
+            if not len(new_ts):
+                return 0
+            del ts, cols
+            for c in COLUMNS:
+                values = bars[c].to_numpy(dtype=np.float64) if c in bars else np.full(len(bars), np.nan)
+                self._append_file(symbol, f"{c}.f8", values)
+            # timestamps last: they decide how many rows are visible
+            self._append_file(symbol, _TS_FILE, new_ts)
+            return len(new_ts)
+
+    def _append_file(self, symbol: str, name: str, values: np.ndarray) -> None:
+        with open(os.path.join(self._dir(symbol), name), "ab") as f:
+            f.write(values.tobytes())
+
+    def _rewrite(self, symbol: str, frame: pd.DataFrame) -> None:
+        directory = self._dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        ts = np.asarray([_to_ns(t) for t in frame.index], dtype=np.int64)
+        files = {_TS_FILE: ts}
+        for c in COLUMNS:
+            files[f"{c}.f8"] = frame[c].to_numpy(dtype=np.float64) if c in frame else np.full(len(frame), np.nan)
+        for name, values in files.items():
+            tmp = os.path.join(directory, name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(values.tobytes())
+            os.replace(tmp, os.path.join(directory, name))
+
+    def compact(self, symbol: str, now: datetime | None = None) -> None:
+        """Drop bars that fell out of the retention window."""
+        with self._lock:
+            cutoff = _utc(now or datetime.now(timezone.utc)) - self.retention
+            covered = self.coverage_start(symbol)
+            if covered is not None and covered < cutoff:
+                self._set_coverage_start(symbol, cutoff)
+            first = self.first_timestamp(symbol)
+            if first is None or first >= cutoff:
+                return
+            frame = self.load(symbol, start=cutoff).copy()
+            self._rewrite(symbol, frame)
+
+    def update(self, api, symbols: list[str], now: datetime | None = None) -> dict[str, int]:
+        """Download missing bars for ``symbols``; return rows added per symbol.
+
+        Symbols whose store ends at the same bar share one multi-symbol
+        request that starts at that bar. New stores, stores that fell
+        behind the retention window and stores whose requested range does
+        not reach back to the window start (the retention was raised) are
+        refilled from the window start."""
+        now = _utc(now or datetime.now(timezone.utc))
+        window_start = now - self.retention
+        groups: dict[pd.Timestamp, list[str]] = defaultdict(list)
+        with self._lock:
+            for sym in symbols:
+                covered, last = self.coverage_start(sym), self.last_timestamp(sym)
+                if covered is None or covered > window_start or (last is not None and last < window_start):
+                    self._rewrite(sym, pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC")))
+                    self._set_coverage_start(sym, window_start)
+                    groups[window_start].append(sym)
+                else:
+                    groups[last if last is not None else window_start].append(sym)
+            added: dict[str, int] = {}
+            for start, group in groups.items():
+                bars = api.get_bars(group, self.timeframe, start.to_pydatetime(), now.to_pydatetime()).df
+                for sym in group:
+                    if bars.empty:
+                        frame = bars
+                    elif "symbol" in bars.columns:
+                        frame = bars[bars["symbol"] == sym]
+                    else:
+                        frame = bars if len(group) == 1 else bars.iloc[0:0]
+                    added[sym] = self.append(sym, frame)
+                    self.compact(sym, now)
+            return added
+
+
+def _utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _to_ns(value) -> int:
+    return _utc(value).value
@@ -0,0 +1,113 @@
+"""Cached trading figures for the dashboards.
+
+:class:`TradingSnapshot` keeps the per-ticker totals and win/loss stats
+from the trade ledger in memory and reloads them only when SQLite's
+``data_version`` says another connection committed, so a render costs one
+pragma instead of a query (and never touches ``memory.json`` with its
+knowledge and history lists).
+
+:meth:`TradingSnapshot.watch` reloads in the background as soon as the
+ledger files change, using ``watchdog`` when it is installed and a cheap
+version poll every ``DASHBOARD_POLL_INTERVAL`` seconds otherwise.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.utils.ledger import TRADE_LEDGER_PATH, TradeLedger
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    FileSystemEventHandler = object
+    Observer = None
+
+DASHBOARD_POLL_INTERVAL = float(os.getenv("DASHBOARD_POLL_INTERVAL", 2))
+
+
+class _LedgerEvents(FileSystemEventHandler):
+    def __init__(self, snapshot: "TradingSnapshot") -> None:
+        self.snapshot = snapshot
+
+    def on_any_event(self, event) -> None:
+        # trades.db, trades.db-wal and trades.db-shm all count
+        if os.path.abspath(event.src_path).startswith(self.snapshot.ledger.path):
+            self.snapshot.refresh()
+
+
+class TradingSnapshot:
+    """Ledger totals cached by change version."""
+
+    def __init__(self, path: str = TRADE_LEDGER_PATH) -> None:
+        self.ledger = TradeLedger(path)
+        self.version: Optional[int] = None
+        self.data: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._observer = None
+        self._stop = threading.Event()
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Reload if the ledger changed; True when it did."""
+        with self._lock:
+            version = self.ledger.version()
+            if version == self.version:
+                return False
+            self.data = {
+                "totals": self.ledger.totals(),
+                "stats": self.ledger.stats(),
+                "loaded_at": time.time(),
+            }
+            self.version = version
+            data = self.data
+        for listener in list(self._listeners):
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"[Dashboard Error] {e}")
+        return True
+
+    def get(self) -> Dict[str, Any]:
+        """The cached figures; reloaded first unless a watcher keeps them current."""
+        if self._observer is None:
+            self.refresh()
+        return self.data
+
+    def pnl_between(self, start, end, ticker: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            return self.ledger.pnl_between(start, end, ticker)
+
+    def watch(self, listener: Optional[Callable[[Dict[str, Any]], None]] = None) -> "TradingSnapshot":
+        """Refresh in the background; ``listener`` gets the new figures."""
+        if listener is not None:
+            self._listeners.append(listener)
+        if self._observer is not None:
+            return self
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_LedgerEvents(self), os.path.dirname(self.ledger.path))
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._observer = threading.Thread(target=self._poll, daemon=True)
+            self._observer.start()
+        return self
+
+    def _poll(self) -> None:
+        while not self._stop.wait(DASHBOARD_POLL_INTERVAL):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[Dashboard Error] {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        if hasattr(self._observer, "stop"):  # watchdog observer
+            self._observer.stop()
+            self._observer.join()
+        self._observer = None
+        self.ledger.close()
@@ -0,0 +1,121 @@
+"""Book the broker's fills for submitted orders.
+
+:class:`~backend.features.order_executor.OrderExecutor` only submits; a
+market order may fill a moment later, in parts, or the next morning when
+it was sent outside market hours. The ledger keeps every submitted order
+open until the broker reports it final, and :class:`FillReconciler` polls
+the open ones with one ``list_orders`` request every
+``ORDER_RECONCILE_INTERVAL`` seconds, taking a token from the executor's
+bucket so polling and submissions share the broker rate limit. New fills,
+partial ones included, are booked by ``client_order_id``.
+"""
+
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from backend.utils.ledger import TradeLedger
+from backend.utils.resilience import TokenBucket
+from .order_executor import _retry_after, _status
+
+ORDER_RECONCILE_INTERVAL = float(os.getenv("ORDER_RECONCILE_INTERVAL", 5))
+
+_LIST_LIMIT = 500
+# orders are listed from a little before the oldest open one (clock skew)
+_LIST_MARGIN = 60
+
+
+def _epoch(value) -> Optional[float]:
+    return pd.Timestamp(value).timestamp() if value else None
+
+
+class FillReconciler:
+    """Poll open orders and book their fills in the ledger."""
+
+    def __init__(self, api, ledger: TradeLedger, bucket: TokenBucket,
+                 interval: float = ORDER_RECONCILE_INTERVAL,
+                 on_fill: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        self.api = api
+        self.ledger = ledger
+        self.bucket = bucket
+        self.interval = interval
+        self.on_fill = on_fill
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> "FillReconciler":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"[Reconcile Error] {e}")
+
+    def _call(self, func, *args, **kwargs):
+        self.bucket.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            if _status(exc) == 429:
+                self.bucket.penalize(_retry_after(exc) or self.interval)
+            raise
+
+    def book(self, client_order_id: str, report) -> Optional[Dict[str, Any]]:
+        """Apply one broker order report; returns the fill it booked, if any."""
+        price = getattr(report, "filled_avg_price", None)
+        fill = self.ledger.update_order(
+            client_order_id,
+            getattr(report, "status", None),
+            float(getattr(report, "filled_qty", None) or 0),
+            float(price) if price else None,
+            ts=_epoch(getattr(report, "filled_at", None)),
+        )
+        if fill is not None and self.on_fill is not None:
+            self.on_fill(fill)
+        return fill
+
+    def reconcile(self) -> int:
+        """One pass over the open orders; returns the number of fills booked."""
+        open_orders = self.ledger.open_orders()
+        if not open_orders:
+            return 0
+        after = datetime.fromtimestamp(open_orders[0]["submitted"] - _LIST_MARGIN, timezone.utc)
+        listed = self._call(
+            self.api.list_orders, status="all", after=after.isoformat(),
+            direction="asc", limit=_LIST_LIMIT, nested=False,
+        )
+        reports = {o.client_order_id: o for o in listed}
+        complete = len(listed) < _LIST_LIMIT
+        booked = 0
+        for order in open_orders:
+            cid = order["client_order_id"]
+            report = reports.get(cid)
+            if report is None:
+                if not complete:
+                    continue  # past the listed page; next pass
+                try:
+                    report = self._call(self.api.get_order_by_client_order_id, cid)
+                except Exception as e:
+                    if _status(e) == 404:
+                        self.ledger.update_order(cid, "not_found", 0, None)
+                    else:
+                        print(f"[Reconcile Error] {cid}: {e}")
+                    continue
+            booked += self.book(cid, report) is not None
+        return booked
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,325 @@
+"""Streaming versions of the indicators in ``strategies.py``.
+
+Each state object consumes one price per :meth:`update` in constant time
+and returns the latest indicator value, replicating the arithmetic of
+pandas' ``rolling().mean()`` and ``ewm(adjust=False).mean()`` step by step
+so the numbers match the batch implementations, NaN handling included.
+``to_dict``/``from_dict`` checkpoint and restore the state as plain
+JSON-serialisable dicts.
+"""
+
+import math
+
+import numpy as np
+
+nan = float("nan")
+
+
+def _div(a: float, b: float) -> float:
+    """``a / b`` with numpy semantics for a zero divisor."""
+    if b == 0:
+        if a != a or a == 0:
+            return nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class RollingMean:
+    """Mean of the last ``window`` values, as ``Series.rolling(window).mean()``.
+
+    Mirrors pandas' running sum with Kahan compensation, its clamping of
+    the mean to the sign of the inputs and its exact result for windows
+    of identical values."""
+
+    def __init__(self, window: int, min_periods: int | None = None) -> None:
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.buffer = [nan] * window
+        self.pos = 0
+        self.seen = 0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev = nan
+        self.value = nan
+
+    def update(self, x: float) -> float:
+        if self.seen == 0:
+            self.prev = x
+        elif self.seen >= self.window:
+            self._remove(self.buffer[self.pos])
+        self._add(x)
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        self.seen += 1
+        self.value = self._mean()
+        return self.value
+
+    def _add(self, x: float) -> None:
+        if x != x:
+            return
+        self.nobs += 1
+        y = x - self.comp_add
+        t = self.sum + y
+        self.comp_add = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_ct += 1
+        if x == self.prev:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev = x
+
+    def _remove(self, x: float) -> None:
+        if x != x:
+            return
+        self.nobs -= 1
+        y = -x - self.comp_remove
+        t = self.sum + y
+        self.comp_remove = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_ct -= 1
+
+    def _mean(self) -> float:
+        if self.nobs < self.min_periods or self.nobs <= 0:
+            return nan
+        result = self.sum / self.nobs
+        if self.same_ct >= self.nobs:
+            result = self.prev
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def to_dict(self) -> dict:
+        return dict(vars(self), buffer=list(self.buffer))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingMean":
+        state = cls(data["window"], data["min_periods"])
+        vars(state).update(data)
+        state.buffer = list(data["buffer"])
+        return state
+
+
+class EMAState:
+    """Exponential moving average, as ``Series.ewm(span=span, adjust=False).mean()``."""
+
+    def __init__(self, span: int) -> None:
+        self.span = span
+        com = (span - 1) / 2
+        self.alpha = 1.0 / (1.0 + com)
+        self.weighted = nan
+        self.old_wt = 1.0
+        self.seen = 0
+        self.nobs = 0
+        self.value = nan
+
+    def update(self, x: float) -> float:
+        observed = x == x
+        if self.seen == 0:
+            self.weighted = x
+            self.nobs = int(observed)
+        else:
+            self.nobs += observed
+            if self.weighted == self.weighted:
+                self.old_wt *= 1.0 - self.alpha
+                if observed:
+                    if self.weighted != x:
+                        self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                    self.old_wt = 1.0
+            elif observed:
+                self.weighted = x
+        self.seen += 1
+        self.value = self.weighted if self.nobs >= 1 else nan
+        return self.value
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EMAState":
+        state = cls(data["span"])
+        vars(state).update(data)
+        return state
+
+
+class RSIState:
+    """Relative strength index, as ``strategies.compute_rsi``."""
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self.last = nan
+        self.seen = 0
+        self.up = RollingMean(period)
+        self.down = RollingMean(period)
+        self.value = nan
+
+    def update(self, price: float) -> float:
+        delta = price - self.last if self.seen else nan
+        self.last = price
+        self.seen += 1
+        # Series.clip keeps NaN; -1 * 0.0 is -0.0 as in the pandas version
+        up = delta if delta != delta or delta >= 0 else 0.0
+        down = -1 * (delta if delta != delta or delta <= 0 else 0.0)
+        rs = _div(self.up.update(up), self.down.update(down))
+        self.value = 100 - _div(100, 1 + rs)
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "last": self.last,
+            "seen": self.seen,
+            "up": self.up.to_dict(),
+            "down": self.down.to_dict(),
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RSIState":
+        state = cls(data["period"])
+        state.last = data["last"]
+        state.seen = data["seen"]
+        state.up = RollingMean.from_dict(data["up"])
+        state.down = RollingMean.from_dict(data["down"])
+        state.value = data["value"]
+        return state
+
+
+class MACDState:
+    """MACD line and its signal line, as in ``strategies.macd_strategy``."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+        self.value = (nan, nan)
+
+    def update(self, price: float) -> tuple[float, float]:
+        macd = self.fast.update(price) - self.slow.update(price)
+        self.value = (macd, self.signal.update(macd))
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+            "value": list(self.value),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MACDState":
+        state = cls()
+        state.fast = EMAState.from_dict(data["fast"])
+        state.slow = EMAState.from_dict(data["slow"])
+        state.signal = EMAState.from_dict(data["signal"])
+        state.value = tuple(data["value"])
+        return state
+
+
+# Column-wise versions for a (time x symbols) float matrix. They run the
+# same recurrences as the state classes, one NumPy step per row for all
+# symbols at once, and return the full indicator matrix.
+
+def rolling_mean_matrix(values, window: int):
+    """``DataFrame.rolling(window).mean()`` on every column of ``values``."""
+    rows, cols = values.shape
+    out = np.full((rows, cols), np.nan)
+    if not rows:
+        return out
+    nobs = np.zeros(cols, dtype=np.int64)
+    neg_ct = np.zeros(cols, dtype=np.int64)
+    total = np.zeros(cols)
+    comp_add = np.zeros(cols)
+    comp_remove = np.zeros(cols)
+    same_ct = np.zeros(cols, dtype=np.int64)
+    prev = values[0].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i in range(rows):
+            if i >= window:
+                x = values[i - window]
+                obs = x == x
+                y = -x - comp_remove
+                t = total + y
+                if obs.all():
+                    nobs -= 1
+                    comp_remove = t - total - y
+                    total = t
+                else:
+                    nobs -= obs
+                    comp_remove = np.where(obs, t - total - y, comp_remove)
+                    total = np.where(obs, t, total)
+                neg_ct -= obs & np.signbit(x)
+            x = values[i]
+            obs = x == x
+            y = x - comp_add
+            t = total + y
+            same = x == prev
+            if obs.all():
+                nobs += 1
+                comp_add = t - total - y
+                total = t
+                same_ct = np.where(same, same_ct + 1, 1)
+                prev = x
+            else:
+                nobs += obs
+                comp_add = np.where(obs, t - total - y, comp_add)
+                total = np.where(obs, t, total)
+                same_ct = np.where(obs, np.where(same, same_ct + 1, 1), same_ct)
+                prev = np.where(obs, x, prev)
+            neg_ct += obs & np.signbit(x)
+            result = total / nobs
+            fix = same_ct >= nobs
+            result[fix] = prev[fix]
+            result[~fix & (neg_ct == 0) & (result < 0)] = 0.0
+            result[~fix & (neg_ct == nobs) & (result > 0)] = 0.0
+            result[nobs < max(window, 1)] = np.nan
+            out[i] = result
+    return out
+
+
+def ewm_matrix(values, span: int):
+    """``DataFrame.ewm(span=span, adjust=False).mean()`` on every column."""
+    rows, cols = values.shape
+    out = np.full((rows, cols), np.nan)
+    if not rows:
+        return out
+    alpha = 1.0 / (1.0 + (span - 1) / 2)
+    weighted = values[0].copy()
+    nobs = (weighted == weighted).astype(np.int64)
+    old_wt = np.ones(cols)
+    out[0] = weighted
+    with np.errstate(invalid="ignore"):
+        for i in range(1, rows):
+            x = values[i]
+            obs = x == x
+            nobs += obs
+            has = weighted == weighted
+            old_wt = np.where(has, old_wt * (1.0 - alpha), old_wt)
+            blended = (old_wt * weighted + alpha * x) / (old_wt + alpha)
+            weighted = np.where(has & obs & (weighted != x), blended, weighted)
+            old_wt = np.where(has & obs, 1.0, old_wt)
+            weighted = np.where(~has & obs, x, weighted)
+            out[i] = np.where(nobs >= 1, weighted, np.nan)
+    return out
+
+
+def rsi_matrix(values, period: int = 14):
+    """``strategies.compute_rsi`` on every column of ``values``."""
+    delta = np.full(values.shape, np.nan)
+    delta[1:] = values[1:] - values[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        up = np.where(np.isnan(delta) | (delta >= 0), delta, 0.0)
+        down = -1 * np.where(np.isnan(delta) | (delta <= 0), delta, 0.0)
+        # one pass over both halves halves the per-row overhead
+        means = rolling_mean_matrix(np.concatenate([up, down], axis=1), period)
+        rs = means[:, : values.shape[1]] / means[:, values.shape[1]:]
+        return 100 - (100 / (1 + rs))
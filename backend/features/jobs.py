@@ -0,0 +1,226 @@
+"""Background trading jobs for the HTTP server.
+
+A job is a batch of symbols traded with one ``run_autotrader`` cycle on a
+bounded thread pool. Jobs and symbol claims live in SQLite so that every
+server process (e.g. several gunicorn workers) sees the same jobs and a
+symbol is only traded by one job at a time: a job claims its symbols when
+it is created, and symbols already claimed by a running job are skipped
+and reported with that job's id. The claim is held until the orders of the
+cycle are recorded and the cooldowns are on disk, so the next job for the
+symbol sees them. While a job is queued or running, its process renews
+the claims every ``JOB_CLAIM_TTL / 3`` seconds; claims of a process that
+died expire after ``JOB_CLAIM_TTL`` seconds.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.utils.db import Database
+from .autotrade import executor, memory, run_autotrader
+
+JOB_DB_PATH = os.getenv(
+    "JOB_DB_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'jobs.db'),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+JOB_CLAIM_TTL = float(os.getenv("JOB_CLAIM_TTL", 300))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", 86400))
+
+DONE_STATES = ("done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    symbols TEXT NOT NULL,
+    status TEXT NOT NULL,
+    results TEXT,
+    skipped TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created);
+CREATE TABLE IF NOT EXISTS claims (
+    symbol TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+_JOB_COLUMNS = ("id", "symbols", "status", "results", "skipped", "error", "created", "updated")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore(Database):
+    """Job rows and symbol claims shared by all server processes."""
+
+    def __init__(self, path: str = JOB_DB_PATH) -> None:
+        super().__init__(path, _SCHEMA)
+
+    def create(self, job_id: str, symbols: List[str], ttl: float = JOB_CLAIM_TTL) -> Dict[str, str]:
+        """Insert a queued job and claim its symbols.
+
+        Returns ``{symbol: job_id}`` for the symbols another job holds."""
+        now = time.time()
+
+        def work(conn):
+            conn.execute("DELETE FROM claims WHERE expires < ?", (now,))
+            skipped = dict(conn.execute(
+                f"SELECT symbol, job_id FROM claims WHERE symbol IN ({', '.join('?' * len(symbols))})",
+                symbols,
+            ).fetchall())
+            conn.executemany(
+                "INSERT INTO claims (symbol, job_id, expires) VALUES (?, ?, ?)",
+                [(sym, job_id, now + ttl) for sym in symbols if sym not in skipped],
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, symbols, status, skipped, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(symbols), "queued", json.dumps(skipped), now, now),
+            )
+            return skipped
+
+        return self._write(work)
+
+    def update(self, job_id: str, status: str, results: Optional[dict] = None,
+               error: Optional[str] = None, ttl: float = JOB_CLAIM_TTL) -> None:
+        """Set the job's status; a terminal status releases its claims,
+        any other renews them."""
+        now = time.time()
+
+        def work(conn):
+            conn.execute(
+                "UPDATE jobs SET status = ?, results = COALESCE(?, results), error = ?, updated = ? WHERE id = ?",
+                (status, None if results is None else json.dumps(results), error, now, job_id),
+            )
+            if status in DONE_STATES:
+                conn.execute("DELETE FROM claims WHERE job_id = ?", (job_id,))
+            else:
+                conn.execute("UPDATE claims SET expires = ? WHERE job_id = ?", (now + ttl, job_id))
+
+        self._write(work)
+
+    def renew(self, job_ids: List[str], ttl: float = JOB_CLAIM_TTL) -> None:
+        """Push back the expiry of the claims held by ``job_ids``."""
+        expires = time.time() + ttl
+        self._write(lambda conn: conn.executemany(
+            "UPDATE claims SET expires = ? WHERE job_id = ?", [(expires, j) for j in job_ids]
+        ))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_JOB_COLUMNS, row))
+        for key in ("symbols", "results", "skipped"):
+            job[key] = json.loads(job[key]) if job[key] else ({} if key != "symbols" else [])
+        return job
+
+    def prune(self, older_than: float = JOB_RETENTION) -> None:
+        cutoff = time.time() - older_than
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM jobs WHERE created < ? AND status IN ('done', 'failed')", (cutoff,)
+        ))
+
+
+def trade_symbols(symbols: List[str]) -> Dict[str, str]:
+    """One autotrader cycle that leaves cooldowns on disk for other processes."""
+    memory.refresh()
+    results = run_autotrader(symbols)
+    # the claim must outlive the orders: wait until they are recorded; the
+    # heartbeat keeps renewing it meanwhile
+    while not executor.wait(symbols, JOB_CLAIM_TTL / 3):
+        print(f"[Job] orders for {', '.join(symbols)} still in flight")
+    memory.flush()
+    return results
+
+
+class JobRunner:
+    """Run jobs from a :class:`JobStore` on a bounded thread pool."""
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS,
+                 queue_size: int = JOB_QUEUE_SIZE,
+                 run: Callable[[List[str]], Dict[str, str]] = trade_symbols,
+                 claim_ttl: float = JOB_CLAIM_TTL) -> None:
+        self.store = store or JobStore()
+        self.store.prune()
+        self.queue_size = queue_size
+        self.run = run
+        self.claim_ttl = claim_ttl
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self._pending = 0
+        # ids of the queued and running jobs whose claims this process renews
+        self._held: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, symbols: List[str]) -> Dict[str, Any]:
+        """Create a job for ``symbols`` and queue it; returns the job."""
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        if not symbols:
+            raise ValueError("no symbols")
+        with self._lock:
+            if self._pending >= self.queue_size:
+                raise JobQueueFull(f"{self._pending} jobs pending")
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        try:
+            skipped = self.store.create(job_id, symbols, self.claim_ttl)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        claimed = [s for s in symbols if s not in skipped]
+        if claimed:
+            with self._lock:
+                self._held.add(job_id)
+            self._pool.submit(self._execute, job_id, claimed)
+        else:
+            self._finish(job_id, "done", {})
+        return self.store.get(job_id)
+
+    def _finish(self, job_id: str, status: str, results: dict, error: Optional[str] = None) -> None:
+        try:
+            self.store.update(job_id, status, results, error)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._held.discard(job_id)
+
+    def _renew(self) -> None:
+        while not self._stop.wait(self.claim_ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                self.store.renew(held, self.claim_ttl)
+            except Exception as e:
+                print(f"[Job Error] renewing claims: {e}")
+
+    def _execute(self, job_id: str, symbols: List[str]) -> None:
+        try:
+            self.store.update(job_id, "running", ttl=self.claim_ttl)
+            results = self.run(symbols)
+        except Exception as e:
+            print(f"[Job Error] {job_id}: {e}")
+            self._finish(job_id, "failed", {}, str(e))
+            return
+        self._finish(job_id, "done", results)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self._stop.set()
@@ -1,37 +1,134 @@
-import json
+import functools
+import heapq
+import itertools
 import os
+import threading
 import time
-from difflib import SequenceMatcher
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Tuple
+
+from .knowledge_store import KnowledgeStore, _norm, make_store
+from .similarity import QuestionIndex
 
 
 def _count_tokens(text: str) -> int:
     return len(text.split())
 
 
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class KnowledgeBase:
-    """Simple JSON-backed knowledge store."""
+    """Knowledge store for facts and QA pairs.
+
+    Entries are kept in memory; persistence goes through a pluggable
+    :class:`KnowledgeStore` (SQLite by default, see ``make_store``).
+    Hash indexes on normalized ``(topic, fact)``, question and topic are
+    built in :meth:`load` and kept up to date by every mutating method.
 
-    def __init__(self, path: Optional[str] = None) -> None:
+    Entries added or updated since the last :meth:`run_maintenance` are
+    remembered so the maintenance pass only has to look at those, and
+    ``on_mutation`` (if set) is called after every change."""
+
+    def __init__(self, path: Optional[str] = None, store: Optional[KnowledgeStore] = None) -> None:
         if path is None:
             path = os.path.join(os.path.dirname(__file__), '..', 'data', 'knowledge.json')
         self.path = os.path.abspath(path)
+        self.store = store or make_store(self.path)
         self.data: Dict[str, Any] = {"facts": [], "qa": []}
+        self._fact_index: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._topic_index: Dict[str, List[Dict[str, Any]]] = {}
+        self._qa_index: Dict[str, Dict[str, Any]] = {}
+        self._similar = QuestionIndex()
+        self._lock = threading.RLock()
+        self._touched_facts: Dict[int, Dict[str, Any]] = {}
+        self._touched_qa: Dict[int, Dict[str, Any]] = {}
+        self._fact_ages: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = itertools.count()
+        self._full_pass_needed = True
+        self.on_mutation: Optional[Callable[[], None]] = None
         self.load()
 
+    @_locked
     def load(self) -> None:
-        if os.path.exists(self.path):
-            with open(self.path, 'r') as f:
-                try:
-                    self.data = json.load(f)
-                except json.JSONDecodeError:
-                    self.data = {"facts": [], "qa": []}
+        self.data = self.store.load()
+        self.data.setdefault("facts", [])
+        self.data.setdefault("qa", [])
+        self._rebuild_indexes()
+        self._touched_facts = {}
+        self._touched_qa = {}
+        self._full_pass_needed = True
+
+    def _rebuild_indexes(self) -> None:
+        self._fact_index = {}
+        self._topic_index = {}
+        self._qa_index = {}
+        self._similar = QuestionIndex()
+        for f in self.data["facts"]:
+            self._index_fact(f)
+        for qa in self.data["qa"]:
+            self._index_qa(qa)
+        self._rebuild_ages()
+
+    def _rebuild_ages(self) -> None:
+        """Age heap with one item per fact, dropping stale ones."""
+        self._fact_ages = [
+            (f.get("timestamp", 0), next(self._seq), f) for f in self.data["facts"]
+        ]
+        heapq.heapify(self._fact_ages)
+
+    @staticmethod
+    def _fact_key(entry: Dict[str, Any]) -> Tuple[str, str]:
+        return _norm(entry.get("topic", "")), _norm(entry.get("fact", ""))
+
+    def _index_fact(self, entry: Dict[str, Any]) -> None:
+        key = self._fact_key(entry)
+        self._fact_index.setdefault(key, entry)
+        self._topic_index.setdefault(key[0], []).append(entry)
+
+    def _unindex_fact(self, entry: Dict[str, Any]) -> None:
+        key = self._fact_key(entry)
+        if self._fact_index.get(key) is entry:
+            del self._fact_index[key]
+        same_topic = [f for f in self._topic_index.get(key[0], []) if f is not entry]
+        if same_topic:
+            self._topic_index[key[0]] = same_topic
+        else:
+            self._topic_index.pop(key[0], None)
+
+    def _index_qa(self, entry: Dict[str, Any]) -> None:
+        self._qa_index.setdefault(_norm(entry.get("question", "")), entry)
+        self._similar.add(entry.get("question", ""), entry)
 
+    def _unindex_qa(self, entry: Dict[str, Any]) -> None:
+        key = _norm(entry.get("question", ""))
+        if self._qa_index.get(key) is entry:
+            del self._qa_index[key]
+        self._similar.remove(entry.get("question", ""), entry)
+
+    def _touch(self, facts=(), qa=()) -> None:
+        for f in facts:
+            self._touched_facts[id(f)] = f
+            heapq.heappush(self._fact_ages, (f.get("timestamp", 0), next(self._seq), f))
+        # every update of a fact leaves its old item behind; skipped when
+        # popped, but the heap must not grow with the number of updates
+        if len(self._fact_ages) > 2 * len(self.data["facts"]) + 16:
+            self._rebuild_ages()
+        for q in qa:
+            self._touched_qa[id(q)] = q
+        if self.on_mutation:
+            self.on_mutation()
+
+    @_locked
     def save(self) -> None:
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        with open(self.path, 'w') as f:
-            json.dump(self.data, f, indent=4)
+        """Rewrite the whole store."""
+        self.store.save(self.data)
 
+    @_locked
     def add_facts(self, topic: str, facts: List[str], source: str | None = None) -> bool:
         """Store new facts for a topic with timestamp.
 
@@ -39,22 +136,17 @@ class KnowledgeBase:
         have their count increased."""
 
         ts = time.time()
-        learned = False
+        changed: List[Dict[str, Any]] = []
         self.data.setdefault("facts", [])
         for fact in facts:
             if not fact:
                 continue
-            key = (topic.strip().lower(), fact.strip().lower())
-            existing = None
-            for f in self.data["facts"]:
-                if key == (f.get("topic", "").lower(), f.get("fact", "").lower()):
-                    existing = f
-                    break
+            existing = self._fact_index.get((_norm(topic), _norm(fact)))
             if existing:
                 existing["count"] = existing.get("count", 1) + 1
                 existing["timestamp"] = ts
                 existing["confidence"] = existing.get("confidence", 1.0) + 0.1
-                learned = True
+                changed.append(existing)
                 continue
             entry = {
                 "topic": topic,
@@ -67,21 +159,22 @@ class KnowledgeBase:
             if source:
                 entry["source"] = source
             self.data["facts"].append(entry)
-            learned = True
-        if learned:
-            self.save()
-        return learned
+            self._index_fact(entry)
+            changed.append(entry)
+        if changed:
+            self.store.upsert(self.data, facts=changed)
+            self._touch(facts=changed)
+        return bool(changed)
 
+    @_locked
     def add_qa(self, question: str, answer: str, source: str | None = None) -> bool:
         """Store a new question/answer pair.
 
         Returns True if it was a new entry."""
         ts = time.time()
         self.data.setdefault("qa", [])
-        normalized = question.strip().lower()
-        for qa in self.data["qa"]:
-            if qa.get("question", "").strip().lower() == normalized:
-                return False
+        if _norm(question) in self._qa_index:
+            return False
         entry = {
             "question": question.strip(),
             "answer": answer.strip(),
@@ -92,82 +185,181 @@ class KnowledgeBase:
         if source:
             entry["source"] = source
         self.data["qa"].append(entry)
-        self.save()
+        self._index_qa(entry)
+        self.store.upsert(self.data, qa=[entry])
+        self._touch(qa=[entry])
         return True
 
-    def find_similar_question(self, question: str, threshold: float = 0.6) -> Optional[Dict[str, str]]:
-        """Return the most similar past QA pair if above threshold."""
-        question = question.lower().strip()
-        best_score = 0.0
-        best_entry = None
-        for entry in self.data.get("qa", []):
-            q = entry.get("question", "").lower().strip()
-            score = SequenceMatcher(None, question, q).ratio()
-            if score > best_score and score >= threshold:
-                best_score = score
-                best_entry = entry
-        return best_entry
+    @_locked
+    def find_similar_question(self, question: str, threshold: float = 0.6,
+                              exact: bool = False) -> Optional[Dict[str, str]]:
+        """Return the most similar past QA pair if above threshold.
 
+        Only the closest candidates from the trigram index are compared;
+        pass ``exact=True`` to compare against every stored question."""
+        return self._similar.best_match(question, threshold, exact=exact)
+
+    @_locked
     def update_answer(self, question: str, new_answer: str, confidence: float | None = None) -> None:
         """Replace the stored answer for an existing question."""
-        normalized = question.strip().lower()
-        for qa in self.data.get("qa", []):
-            if qa.get("question", "").strip().lower() == normalized:
-                qa["answer"] = new_answer.strip()
-                qa["timestamp"] = time.time()
-                qa["tokens"] = _count_tokens(new_answer)
-                if confidence is not None:
-                    qa["confidence"] = confidence
-                self.save()
-                break
+        qa = self._qa_index.get(_norm(question))
+        if qa is None:
+            return
+        qa["answer"] = new_answer.strip()
+        qa["timestamp"] = time.time()
+        qa["tokens"] = _count_tokens(new_answer)
+        if confidence is not None:
+            qa["confidence"] = confidence
+        self.store.upsert(self.data, qa=[qa])
+        self._touch(qa=[qa])
 
+    @_locked
     def get_facts(self, topic: str) -> List[Dict[str, Any]]:
         """Return all facts stored for a topic."""
-        return [f for f in self.data.get("facts", []) if f.get("topic", "").lower() == topic.strip().lower()]
+        return list(self._topic_index.get(_norm(topic), []))
 
+    @_locked
     def prune(self, max_age_days: int = 30, min_count: int = 1) -> None:
         """Remove facts older than `max_age_days` with low count."""
         cutoff = time.time() - max_age_days * 86400
-        new_facts = [
-            f for f in self.data.get("facts", [])
-            if f.get("timestamp", 0) >= cutoff or f.get("count", 1) > min_count
-        ]
-        if len(new_facts) != len(self.data.get("facts", [])):
+        new_facts = []
+        removed = []
+        for f in self.data.get("facts", []):
+            if f.get("timestamp", 0) >= cutoff or f.get("count", 1) > min_count:
+                new_facts.append(f)
+            else:
+                removed.append(f)
+        if removed:
             self.data["facts"] = new_facts
-            self.save()
+            for f in removed:
+                self._unindex_fact(f)
+            self.store.delete(self.data, facts=removed)
 
+    @_locked
     def cleanup_low_quality(self, min_tokens: int = 3) -> None:
         """Remove entries with too few tokens."""
-        changed = False
-        facts = [f for f in self.data.get("facts", []) if f.get("tokens", _count_tokens(f.get("fact", ""))) >= min_tokens]
-        if len(facts) != len(self.data.get("facts", [])):
+        facts, removed_facts = [], []
+        for f in self.data.get("facts", []):
+            ok = f.get("tokens", _count_tokens(f.get("fact", ""))) >= min_tokens
+            (facts if ok else removed_facts).append(f)
+        qa, removed_qa = [], []
+        for q in self.data.get("qa", []):
+            ok = q.get("tokens", _count_tokens(q.get("answer", ""))) >= min_tokens
+            (qa if ok else removed_qa).append(q)
+        if removed_facts or removed_qa:
             self.data["facts"] = facts
-            changed = True
-        qa = [q for q in self.data.get("qa", []) if q.get("tokens", _count_tokens(q.get("answer", ""))) >= min_tokens]
-        if len(qa) != len(self.data.get("qa", [])):
             self.data["qa"] = qa
-            changed = True
-        if changed:
-            self.save()
+            for f in removed_facts:
+                self._unindex_fact(f)
+            for q in removed_qa:
+                self._unindex_qa(q)
+            self.store.delete(self.data, facts=removed_facts, qa=removed_qa)
 
+    @_locked
     def deduplicate(self) -> None:
         """Remove duplicate facts and questions."""
-        seen_facts = set()
+        seen_facts: Dict[tuple, Dict[str, Any]] = {}
         unique_facts = []
+        dup_facts = []
         for f in self.data.get("facts", []):
-            key = (f.get("topic", "").lower(), f.get("fact", "").strip().lower())
+            key = self._fact_key(f)
             if key not in seen_facts:
-                seen_facts.add(key)
+                seen_facts[key] = f
                 unique_facts.append(f)
-        self.data["facts"] = unique_facts
+            else:
+                dup_facts.append(seen_facts[key])
 
-        seen_q = set()
+        seen_q: Dict[str, Dict[str, Any]] = {}
         unique_qa = []
+        dup_qa = []
         for qa in self.data.get("qa", []):
-            q = qa.get("question", "").strip().lower()
+            q = _norm(qa.get("question", ""))
             if q not in seen_q:
-                seen_q.add(q)
+                seen_q[q] = qa
                 unique_qa.append(qa)
-        self.data["qa"] = unique_qa
+            else:
+                dup_qa.append(seen_q[q])
+
+        if dup_facts or dup_qa:
+            self.data["facts"] = unique_facts
+            self.data["qa"] = unique_qa
+            self._rebuild_indexes()
+            # duplicates share a row key, so re-write the surviving entries
+            self.store.upsert(self.data, facts=dup_facts, qa=dup_qa)
+
+    def _remove(self, facts: List[Dict[str, Any]], qa: List[Dict[str, Any]]) -> None:
+        if facts:
+            gone = {id(f) for f in facts}
+            self.data["facts"] = [f for f in self.data["facts"] if id(f) not in gone]
+            for f in facts:
+                self._unindex_fact(f)
+        if qa:
+            gone = {id(q) for q in qa}
+            self.data["qa"] = [q for q in self.data["qa"] if id(q) not in gone]
+            for q in qa:
+                self._unindex_qa(q)
+        if facts or qa:
+            self.store.delete(self.data, facts=facts, qa=qa)
+
+    @_locked
+    def run_maintenance(self, max_age_days: int = 30, min_count: int = 1,
+                        min_tokens: int = 3) -> Dict[str, Any]:
+        """Incremental prune/cleanup/deduplicate pass.
+
+        The first pass after :meth:`load` runs the full methods. Later passes
+        only pop expired facts from an age heap and check entries touched
+        since the previous pass. Returns statistics about the pass."""
+        start = time.perf_counter()
+        stats: Dict[str, Any] = {
+            "full": self._full_pass_needed,
+            "facts_checked": 0,
+            "qa_checked": 0,
+            "pruned": 0,
+            "low_quality": 0,
+            "duplicates": 0,
+        }
+        if self._full_pass_needed:
+            n_facts, n_qa = len(self.data["facts"]), len(self.data["qa"])
+            stats["facts_checked"], stats["qa_checked"] = n_facts, n_qa
+            self.prune(max_age_days, min_count)
+            stats["pruned"] = n_facts - len(self.data["facts"])
+            n_facts = len(self.data["facts"])
+            self.cleanup_low_quality(min_tokens)
+            stats["low_quality"] = n_facts - len(self.data["facts"]) + n_qa - len(self.data["qa"])
+            n_total = len(self.data["facts"]) + len(self.data["qa"])
+            self.deduplicate()
+            stats["duplicates"] = n_total - len(self.data["facts"]) - len(self.data["qa"])
+            self._full_pass_needed = False
+        else:
+            # facts are unique by key once indexed, so only age and size checks remain
+            cutoff = time.time() - max_age_days * 86400
+            expired: Dict[int, Dict[str, Any]] = {}
+            while self._fact_ages and self._fact_ages[0][0] < cutoff:
+                ts, _, f = heapq.heappop(self._fact_ages)
+                stats["facts_checked"] += 1
+                if f.get("timestamp", 0) != ts or self._fact_index.get(self._fact_key(f)) is not f:
+                    continue  # stale heap item: entry was updated or removed
+                if f.get("count", 1) <= min_count:
+                    expired[id(f)] = f
+            stats["pruned"] = len(expired)
 
-        self.save()
+            low_facts = []
+            for f in self._touched_facts.values():
+                stats["facts_checked"] += 1
+                if id(f) in expired or self._fact_index.get(self._fact_key(f)) is not f:
+                    continue
+                if f.get("tokens", _count_tokens(f.get("fact", ""))) < min_tokens:
+                    low_facts.append(f)
+            low_qa = []
+            for q in self._touched_qa.values():
+                stats["qa_checked"] += 1
+                if self._qa_index.get(_norm(q.get("question", ""))) is not q:
+                    continue
+                if q.get("tokens", _count_tokens(q.get("answer", ""))) < min_tokens:
+                    low_qa.append(q)
+            stats["low_quality"] = len(low_facts) + len(low_qa)
+            self._remove(list(expired.values()) + low_facts, low_qa)
+        self._touched_facts = {}
+        self._touched_qa = {}
+        stats["duration"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,206 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+
+def _norm(text: str) -> str:
+    return (text or "").strip().lower()
+
+
+class KnowledgeStore(abc.ABC):
+    """Persistence backend used by :class:`KnowledgeBase`.
+
+    ``upsert`` and ``delete`` receive the full in-memory data plus the
+    entries that changed, so row-oriented backends only touch those rows
+    while file backends can simply rewrite everything."""
+
+    @abc.abstractmethod
+    def load(self) -> Dict[str, Any]:
+        ...
+
+    @abc.abstractmethod
+    def save(self, data: Dict[str, Any]) -> None:
+        ...
+
+    def upsert(self, data: Dict[str, Any], facts: Iterable[Dict[str, Any]] = (),
+               qa: Iterable[Dict[str, Any]] = ()) -> None:
+        self.save(data)
+
+    def delete(self, data: Dict[str, Any], facts: Iterable[Dict[str, Any]] = (),
+               qa: Iterable[Dict[str, Any]] = ()) -> None:
+        self.save(data)
+
+
+class JSONStore(KnowledgeStore):
+    """Original storage format: the whole store in a single JSON file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+
+    def load(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    pass
+        return {"facts": [], "qa": []}
+
+    def save(self, data: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(data, f, indent=4)
+
+
+_FACT_COLUMNS = ("topic", "fact", "timestamp", "count", "tokens", "confidence", "source")
+_QA_COLUMNS = ("question", "answer", "timestamp", "tokens", "confidence", "source")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY,
+    topic_norm TEXT NOT NULL,
+    fact_norm TEXT NOT NULL,
+    topic TEXT,
+    fact TEXT,
+    timestamp REAL,
+    count INTEGER,
+    tokens INTEGER,
+    confidence REAL,
+    source TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS facts_key ON facts (topic_norm, fact_norm);
+CREATE INDEX IF NOT EXISTS facts_topic ON facts (topic_norm);
+CREATE TABLE IF NOT EXISTS qa (
+    id INTEGER PRIMARY KEY,
+    question_norm TEXT NOT NULL UNIQUE,
+    question TEXT,
+    answer TEXT,
+    timestamp REAL,
+    tokens INTEGER,
+    confidence REAL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteStore(KnowledgeStore):
+    """SQLite backend with one row per fact / QA pair.
+
+    Facts are unique on normalized ``(topic, fact)`` and QA pairs on the
+    normalized question, so updates are single-row upserts instead of a full
+    rewrite. The first time the database is opened with an existing
+    ``json_path``, the JSON store is migrated into it; a ``meta`` row records
+    that, so a store emptied by pruning is not re-filled from stale JSON."""
+
+    def __init__(self, path: str, json_path: Optional[str] = None) -> None:
+        self.path = os.path.abspath(path)
+        self.json_path = json_path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        if not self.json_path or not os.path.exists(self.json_path):
+            return
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)",
+                              (str(time.time()),))
+            # databases from before the marker existed were already migrated
+            if self.conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM facts) OR EXISTS (SELECT 1 FROM qa)"
+            ).fetchone()[0]:
+                return
+            data = JSONStore(self.json_path).load()
+            self._upsert_rows(data.get("facts", []), data.get("qa", []))
+
+    @staticmethod
+    def _row_to_entry(columns, row) -> Dict[str, Any]:
+        return {k: v for k, v in zip(columns, row) if v is not None}
+
+    def load(self) -> Dict[str, Any]:
+        with self._lock:
+            facts = self.conn.execute(
+                f"SELECT {', '.join(_FACT_COLUMNS)} FROM facts ORDER BY id"
+            ).fetchall()
+            qa = self.conn.execute(
+                f"SELECT {', '.join(_QA_COLUMNS)} FROM qa ORDER BY id"
+            ).fetchall()
+        return {
+            "facts": [self._row_to_entry(_FACT_COLUMNS, r) for r in facts],
+            "qa": [self._row_to_entry(_QA_COLUMNS, r) for r in qa],
+        }
+
+    def save(self, data: Dict[str, Any]) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM facts")
+            self.conn.execute("DELETE FROM qa")
+            self._upsert_rows(data.get("facts", []), data.get("qa", []))
+
+    def upsert(self, data: Dict[str, Any], facts: Iterable[Dict[str, Any]] = (),
+               qa: Iterable[Dict[str, Any]] = ()) -> None:
+        with self._lock, self.conn:
+            self._upsert_rows(facts, qa)
+
+    def delete(self, data: Dict[str, Any], facts: Iterable[Dict[str, Any]] = (),
+               qa: Iterable[Dict[str, Any]] = ()) -> None:
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM facts WHERE topic_norm = ? AND fact_norm = ?",
+                [(_norm(f.get("topic", "")), _norm(f.get("fact", ""))) for f in facts],
+            )
+            self.conn.executemany(
+                "DELETE FROM qa WHERE question_norm = ?",
+                [(_norm(q.get("question", "")),) for q in qa],
+            )
+
+    def _upsert_rows(self, facts: Iterable[Dict[str, Any]], qa: Iterable[Dict[str, Any]]) -> None:
+        fact_updates = ", ".join(f"{c} = excluded.{c}" for c in _FACT_COLUMNS)
+        self.conn.executemany(
+            f"INSERT INTO facts (topic_norm, fact_norm, {', '.join(_FACT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(_FACT_COLUMNS) + 2))}) "
+            f"ON CONFLICT (topic_norm, fact_norm) DO UPDATE SET {fact_updates}",
+            [
+                (_norm(f.get("topic", "")), _norm(f.get("fact", "")),
+                 *(f.get(c) for c in _FACT_COLUMNS))
+                for f in facts
+            ],
+        )
+        qa_updates = ", ".join(f"{c} = excluded.{c}" for c in _QA_COLUMNS)
+        self.conn.executemany(
+            f"INSERT INTO qa (question_norm, {', '.join(_QA_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(_QA_COLUMNS) + 1))}) "
+            f"ON CONFLICT (question_norm) DO UPDATE SET {qa_updates}",
+            [
+                (_norm(q.get("question", "")), *(q.get(c) for c in _QA_COLUMNS))
+                for q in qa
+            ],
+        )
+
+
+def make_store(json_path: str, backend: Optional[str] = None) -> KnowledgeStore:
+    """Build the store selected by ``backend`` or ``KNOWLEDGE_BACKEND``.
+
+    ``json`` keeps the legacy file, ``sqlite`` (default) stores rows in a
+    ``.db`` file next to it and imports the JSON file on first use."""
+    backend = (backend or os.getenv("KNOWLEDGE_BACKEND", "sqlite")).lower()
+    if backend == "json":
+        return JSONStore(json_path)
+    if backend == "sqlite":
+        db_path = os.path.splitext(json_path)[0] + ".db"
+        return SQLiteStore(db_path, json_path=json_path)
+    raise ValueError(f"Unknown knowledge backend: {backend}")
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .knowledge import KnowledgeBase
+
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", 300))
+MAINTENANCE_EVERY = int(os.getenv("MAINTENANCE_EVERY", 50))
+
+
+class MaintenanceScheduler:
+    """Run :meth:`KnowledgeBase.run_maintenance` in a background thread.
+
+    A pass runs every ``interval`` seconds, or earlier once ``every``
+    mutations have been made to the knowledge base since the last pass."""
+
+    def __init__(self, knowledge: KnowledgeBase, interval: float = MAINTENANCE_INTERVAL,
+                 every: int = MAINTENANCE_EVERY, **options: Any) -> None:
+        self.knowledge = knowledge
+        self.interval = interval
+        self.every = every
+        self.options = options
+        self.pending = 0
+        self.runs = 0
+        self.last_run: Optional[float] = None
+        self.last_stats: Dict[str, Any] = {}
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        knowledge.on_mutation = self.notify
+
+    def notify(self) -> None:
+        """Record a mutation and wake the worker after ``every`` of them."""
+        self.pending += 1
+        if self.every and self.pending >= self.every:
+            self._wake.set()
+
+    def run_once(self) -> Dict[str, Any]:
+        self.pending = 0
+        stats = self.knowledge.run_maintenance(**self.options)
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_stats = stats
+        return stats
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[Maintenance Error] {e}")
+
+    def start(self) -> "MaintenanceScheduler":
+        """Start the worker; the first (full) pass runs right away."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._wake.set()
+            self._thread = threading.Thread(target=self._loop, name="knowledge-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
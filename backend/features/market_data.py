@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from alpaca_trade_api import TimeFrame
+
+BAR_WINDOW_DAYS = 10
+
+
+class MarketSnapshot:
+    """Account cash, latest prices and recent closes for one trading cycle."""
+
+    def __init__(self, cash: float, prices: dict[str, float], closes: dict[str, pd.Series]) -> None:
+        self.cash = cash
+        self.prices = prices
+        self.closes = closes
+
+    def closes_for(self, symbol: str) -> pd.Series:
+        return self.closes.get(symbol, pd.Series(dtype=float))
+
+
+def split_bars(bars: pd.DataFrame, symbols: list[str]) -> dict[str, pd.Series]:
+    """Split a multi-symbol bars frame into one close series per symbol."""
+    if bars.empty:
+        return {}
+    if "symbol" not in bars.columns:
+        # single-symbol responses carry no symbol column
+        return {symbols[0]: bars["close"]} if len(symbols) == 1 else {}
+    return {sym: group["close"] for sym, group in bars.groupby("symbol", sort=False)}
+
+
+def fetch_snapshot(api, symbols: list[str], days: int = BAR_WINDOW_DAYS, store=None) -> MarketSnapshot:
+    """Fetch everything a trading cycle needs in three requests.
+
+    One account request, one multi-symbol latest-trade request and one
+    multi-symbol bars request, instead of three requests per symbol.
+    With a :class:`~backend.features.bar_store.BarStore` only bars newer
+    than the stored ones are requested and the closes are read from it."""
+    account = api.get_account()
+    if not symbols:
+        return MarketSnapshot(float(account.cash), {}, {})
+    trades = api.get_latest_trades(symbols)
+    prices = {sym: float(trade.price) for sym, trade in trades.items()}
+    end = datetime.utcnow()
+    start = end - pd.Timedelta(days=days)
+    if store is not None:
+        store.update(api, symbols)
+        start = start.replace(tzinfo=timezone.utc)
+        return MarketSnapshot(float(account.cash), prices, {sym: store.closes(sym, start) for sym in symbols})
+    bars = api.get_bars(symbols, TimeFrame.Hour, start, end).df
+    return MarketSnapshot(float(account.cash), prices, split_bars(bars, symbols))
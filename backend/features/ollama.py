@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from typing import Iterator
+
+import requests
+
+from backend.utils.cache import PersistentCache
+from backend.utils.resilience import TokenBucket
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# generations per second sent to Ollama (0 = unlimited); cache hits are free
+OLLAMA_RATE = float(os.getenv("OLLAMA_RATE", 0))
+limit = TokenBucket(OLLAMA_RATE)
+
+# Completions are cached by model + prompt hash; pass cache=False to bypass
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", 7 * 86400))
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", 2000))
+GENERATION_CACHE_PATH = os.getenv(
+    "GENERATION_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'generation_cache.db'),
+)
+
+generation_cache = PersistentCache(
+    GENERATION_CACHE_PATH, max_entries=GENERATION_CACHE_SIZE, ttl=GENERATION_CACHE_TTL
+)
+
+
+def cache_key(model: str, prompt: str, context: list[int] | None = None) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8"))
+    if context:
+        # the same prompt continues a different conversation
+        digest.update(json.dumps(context).encode("utf-8"))
+    return f"{model}:{digest.hexdigest()}"
+
+
+def _payload(model: str, prompt: str, stream: bool, context: list[int] | None) -> dict:
+    payload = {"model": model, "prompt": prompt, "stream": stream}
+    if context:
+        payload["context"] = context
+    return payload
+
+
+def generate(model: str, prompt: str, timeout: float = 10, cache: bool = True,
+             context: list[int] | None = None, on_context=None) -> str:
+    """Return the full completion for ``prompt`` from ``/api/generate``.
+
+    ``context`` is the token array a previous response returned; Ollama then
+    continues that conversation without re-reading it. ``on_context`` is
+    called with the new array (not for cached completions)."""
+    key = cache_key(model, prompt, context)
+    if cache:
+        cached = generation_cache.get(key)
+        if cached is not None:
+            return cached
+    limit.acquire()
+    res = requests.post(
+        f"{OLLAMA_URL}/api/generate",
+        json=_payload(model, prompt, False, context),
+        timeout=timeout,
+    )
+    body = res.json()
+    text = body.get("response", "").strip()
+    if on_context is not None and body.get("context"):
+        on_context(body["context"])
+    if cache and text:
+        generation_cache.set(key, text)
+    return text
+
+
+def generate_stream(model: str, prompt: str, timeout: float = 10, cache: bool = True,
+                    context: list[int] | None = None, on_context=None) -> Iterator[str]:
+    """Yield completion chunks as Ollama produces them.
+
+    Ollama streams NDJSON objects with a ``response`` fragment each and a
+    final ``done`` object. ``timeout`` applies to the wait for each chunk,
+    not to the whole generation, so long answers no longer time out.
+    A cached completion is yielded as a single chunk; a fresh one is
+    cached once the stream finishes. ``context`` and ``on_context`` work as
+    in :func:`generate`; the new context arrives with the final chunk."""
+    key = cache_key(model, prompt, context)
+    if cache:
+        cached = generation_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    parts: list[str] = []
+    limit.acquire()
+    with requests.post(
+        f"{OLLAMA_URL}/api/generate",
+        json=_payload(model, prompt, True, context),
+        timeout=timeout,
+        stream=True,
+    ) as res:
+        res.raise_for_status()
+        for line in res.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            text = chunk.get("response", "")
+            if text:
+                parts.append(text)
+                yield text
+            if chunk.get("done"):
+                if on_context is not None and chunk.get("context"):
+                    on_context(chunk["context"])
+                break
+    text = "".join(parts).strip()
+    if cache and text:
+        generation_cache.set(key, text)
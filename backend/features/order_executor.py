@@ -0,0 +1,172 @@
+"""Asynchronous order submission for the autotrader.
+
+:meth:`OrderExecutor.submit` only enqueues: a pool of worker threads sends
+the orders to the broker, throttled by a shared :class:`TokenBucket`. A 429
+response pauses the whole bucket (for ``Retry-After`` when the broker sends
+it) and the order is retried with exponential backoff, as are 5xx responses
+and connection errors. Every order carries a ``client_order_id`` so a retry
+of a request that did reach the broker cannot place it twice.
+
+Results are handed to ``on_result`` on a separate recorder thread, so
+cooldown writes and alerts never hold up a worker or the signal loop. A
+symbol stays in flight until its result has been recorded.
+"""
+
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from backend.utils.resilience import TokenBucket
+
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", 4))
+ORDER_RATE = float(os.getenv("ORDER_RATE", 3))
+ORDER_RETRIES = int(os.getenv("ORDER_RETRIES", 5))
+ORDER_BACKOFF = float(os.getenv("ORDER_BACKOFF", 0.5))
+ORDER_BACKOFF_MAX = float(os.getenv("ORDER_BACKOFF_MAX", 30))
+
+
+class Order:
+    def __init__(self, symbol: str, qty: int, side: str, price: float | None = None) -> None:
+        self.symbol = symbol
+        self.qty = qty
+        self.side = side
+        self.price = price
+        self.client_order_id = uuid.uuid4().hex
+        self.attempts = 0
+
+    def __repr__(self) -> str:
+        return f"Order({self.side} {self.qty} {self.symbol} @ {self.price})"
+
+
+def _status(exc: Exception) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status = _status(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class OrderExecutor:
+    """Submit orders concurrently with rate limiting and retries."""
+
+    def __init__(self, api, workers: int = ORDER_WORKERS, rate: float = ORDER_RATE,
+                 retries: int = ORDER_RETRIES, backoff: float = ORDER_BACKOFF,
+                 on_result=None) -> None:
+        self.api = api
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.on_result = on_result
+        self.stats = {"submitted": 0, "failed": 0, "retries": 0, "throttled": 0}
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="order")
+        self._results: queue.Queue = queue.Queue()
+        self._recorder: threading.Thread | None = None
+        self._in_flight: set[str] = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        atexit.register(self.close)
+
+    def in_flight(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol in self._in_flight
+
+    def wait(self, symbols, timeout: float | None = None) -> bool:
+        """Block until none of ``symbols`` is in flight; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight.isdisjoint(symbols), timeout)
+
+    def submit(self, symbol: str, qty: int, side: str, price: float | None = None) -> Future | None:
+        """Queue an order; None if one for ``symbol`` is still in flight."""
+        with self._lock:
+            if symbol in self._in_flight:
+                return None
+            self._in_flight.add(symbol)
+            if self._recorder is None:
+                self._recorder = threading.Thread(target=self._record, daemon=True)
+                self._recorder.start()
+        return self._pool.submit(self._run, Order(symbol, qty, side, price))
+
+    def _send(self, order: Order):
+        try:
+            return self.api.submit_order(
+                order.symbol, order.qty, order.side, "market", "gtc",
+                client_order_id=order.client_order_id,
+            )
+        except Exception as exc:
+            # an earlier attempt reached the broker after all
+            if order.attempts > 1 and "client_order_id" in str(exc):
+                return self.api.get_order_by_client_order_id(order.client_order_id)
+            raise
+
+    def _run(self, order: Order):
+        result, error = None, None
+        try:
+            while True:
+                self.bucket.acquire()
+                order.attempts += 1
+                try:
+                    result = self._send(order)
+                    with self._lock:
+                        self.stats["submitted"] += 1
+                    return result
+                except Exception as exc:
+                    if not _retryable(exc) or order.attempts > self.retries:
+                        error = exc
+                        with self._lock:
+                            self.stats["failed"] += 1
+                        raise
+                    delay = min(ORDER_BACKOFF_MAX, self.backoff * 2 ** (order.attempts - 1))
+                    delay *= 0.5 + random.random() / 2
+                    with self._lock:
+                        self.stats["retries"] += 1
+                    if _status(exc) == 429:
+                        with self._lock:
+                            self.stats["throttled"] += 1
+                        # slow every worker down, not just this one
+                        self.bucket.penalize(_retry_after(exc) or delay)
+                    time.sleep(delay)
+        finally:
+            self._results.put((order, result, error))
+
+    def _record(self) -> None:
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            if self.on_result is not None:
+                try:
+                    self.on_result(*item)
+                except Exception as exc:
+                    print(f"[Order Record Error] {exc}")
+            with self._idle:
+                self._in_flight.discard(item[0].symbol)
+                self._idle.notify_all()
+
+    def close(self) -> None:
+        """Wait for queued orders and their recording to finish."""
+        self._pool.shutdown(wait=True)
+        if self._recorder is not None:
+            self._results.put(None)
+            self._recorder.join()
+            self._recorder = None
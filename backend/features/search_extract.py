@@ -0,0 +1,202 @@
+"""Extraction of search results from DuckDuckGo and Bing HTML pages.
+
+Each backend returns ``(title, url, snippet)`` tuples for the first
+``limit`` result containers, with text collapsed like BeautifulSoup's
+``get_text(" ", strip=True)``. Pages are passed as raw bytes with the
+charset from the Content-Type header, so the C parsers only need a decoded
+copy of the document when selectolax gets a charset other than UTF-8.
+
+Backends, fastest first: ``selectolax`` (lexbor), ``lxml`` and ``bs4``.
+The first two are optional; ``bs4`` uses ``html.parser`` restricted by a
+``SoupStrainer`` to the result containers. ``SEARCH_PARSER`` forces one.
+"""
+
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional dependency
+    LexborHTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:  # optional dependency
+    lxml_html = None
+
+Result = Tuple[str, str, str]
+
+
+def _join(strings: Iterable[str]) -> str:
+    return " ".join(s.strip() for s in strings if s and s.strip())
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class BS4Backend:
+    name = "bs4"
+
+    @staticmethod
+    def _soup(content: bytes, tag: str, cls: str, encoding: Optional[str]) -> BeautifulSoup:
+        def has_class(value) -> bool:
+            if not value:
+                return False
+            return cls in (value.split() if isinstance(value, str) else value)
+
+        only = SoupStrainer(tag, class_=has_class)
+        return BeautifulSoup(content, "html.parser", parse_only=only, from_encoding=encoding)
+
+    def duckduckgo(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        soup = self._soup(content, "div", "result", encoding)
+        out = []
+        for r in soup.find_all("div", class_="result", limit=limit):
+            title = r.find("a", class_="result__a")
+            snippet = (
+                r.find("a", class_="result__snippet")
+                or r.find("div", class_="result__snippet")
+                or r.find("span", class_="result__snippet")
+            )
+            out.append((
+                title.get_text(" ", strip=True) if title else "",
+                (title.get("href") or "") if title else "",
+                snippet.get_text(" ", strip=True) if snippet else "",
+            ))
+        return out
+
+    def bing(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        soup = self._soup(content, "li", "b_algo", encoding)
+        out = []
+        for r in soup.find_all("li", class_="b_algo", limit=limit):
+            a_tag = r.find("a")
+            snippet = r.find("p")
+            out.append((
+                a_tag.get_text(" ", strip=True) if a_tag else "",
+                (a_tag.get("href") or "") if a_tag else "",
+                snippet.get_text(" ", strip=True) if snippet else "",
+            ))
+        return out
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    _DDG_SNIPPETS = [f".//{tag}[{_has_class('result__snippet')}]" for tag in ("a", "div", "span")]
+
+    @staticmethod
+    def _root(content: bytes, encoding: Optional[str]):
+        parser = lxml_html.HTMLParser(encoding=encoding)
+        return lxml_html.document_fromstring(content, parser=parser)
+
+    @staticmethod
+    def _first(node, *paths):
+        for path in paths:
+            found = node.xpath(path)
+            if found:
+                return found[0]
+        return None
+
+    def duckduckgo(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        root = self._root(content, encoding)
+        out = []
+        for r in root.xpath(f"//div[{_has_class('result')}]")[:limit]:
+            title = self._first(r, f".//a[{_has_class('result__a')}]")
+            snippet = self._first(r, *self._DDG_SNIPPETS)
+            out.append((
+                _join(title.itertext()) if title is not None else "",
+                (title.get("href") or "") if title is not None else "",
+                _join(snippet.itertext()) if snippet is not None else "",
+            ))
+        return out
+
+    def bing(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        root = self._root(content, encoding)
+        out = []
+        for r in root.xpath(f"//li[{_has_class('b_algo')}]")[:limit]:
+            a_tag = self._first(r, ".//a")
+            snippet = self._first(r, ".//p")
+            out.append((
+                _join(a_tag.itertext()) if a_tag is not None else "",
+                (a_tag.get("href") or "") if a_tag is not None else "",
+                _join(snippet.itertext()) if snippet is not None else "",
+            ))
+        return out
+
+
+class SelectolaxBackend:
+    name = "selectolax"
+
+    @staticmethod
+    def _tree(content: bytes, encoding: Optional[str]):
+        # lexbor reads bytes as UTF-8; other declared charsets are decoded first
+        if encoding and encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            try:
+                content = content.decode(encoding, errors="replace")
+            except LookupError:
+                pass
+        return LexborHTMLParser(content)
+
+    @staticmethod
+    def _text(node) -> str:
+        if node is None:
+            return ""
+        return _join(n.text_content for n in node.traverse(include_text=True) if n.tag == "-text")
+
+    @staticmethod
+    def _href(node) -> str:
+        return (node.attributes.get("href") or "") if node is not None else ""
+
+    def duckduckgo(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        tree = self._tree(content, encoding)
+        out = []
+        for r in tree.css("div.result")[:limit]:
+            title = r.css_first("a.result__a")
+            snippet = (
+                r.css_first("a.result__snippet")
+                or r.css_first("div.result__snippet")
+                or r.css_first("span.result__snippet")
+            )
+            out.append((self._text(title), self._href(title), self._text(snippet)))
+        return out
+
+    def bing(self, content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+        tree = self._tree(content, encoding)
+        out = []
+        for r in tree.css("li.b_algo")[:limit]:
+            a_tag = r.css_first("a")
+            out.append((self._text(a_tag), self._href(a_tag), self._text(r.css_first("p"))))
+        return out
+
+
+BACKENDS = {"bs4": BS4Backend()}
+if lxml_html is not None:
+    BACKENDS["lxml"] = LxmlBackend()
+if LexborHTMLParser is not None:
+    BACKENDS["selectolax"] = SelectolaxBackend()
+
+
+def get_backend(name: Optional[str] = None):
+    """Return the named backend, or the fastest available one."""
+    name = name or os.getenv("SEARCH_PARSER")
+    if name:
+        if name not in BACKENDS:
+            print(f"[Search parser] {name} not available, using bs4")
+            return BACKENDS["bs4"]
+        return BACKENDS[name]
+    for preferred in ("selectolax", "lxml", "bs4"):
+        if preferred in BACKENDS:
+            return BACKENDS[preferred]
+
+
+_backend = get_backend()
+
+
+def extract_duckduckgo(content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+    return _backend.duckduckgo(content, limit, encoding)
+
+
+def extract_bing(content: bytes, limit: int = 5, encoding: Optional[str] = None) -> List[Result]:
+    return _backend.bing(content, limit, encoding)
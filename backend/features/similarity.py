@@ -0,0 +1,117 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+def _grams(text: str, n: int = 3) -> Set[str]:
+    padded = f"{' ' * (n - 1)}{text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _length_bound(a: str, b: str) -> float:
+    """Upper bound of ``SequenceMatcher.ratio`` from the string lengths."""
+    total = len(a) + len(b)
+    return 2.0 * min(len(a), len(b)) / total if total else 1.0
+
+
+class QuestionIndex:
+    """Trigram inverted index for fuzzy question lookup.
+
+    Questions are normalized with ``lower().strip()`` as in the original
+    brute-force scan. :meth:`best_match` ranks entries sharing character
+    trigrams with the query, keeps the ``max_candidates`` best by Dice
+    coefficient and re-ranks only those with ``SequenceMatcher.ratio``.
+    ``exact=True`` re-ranks every stored question instead, giving the same
+    result as the full scan (useful to measure recall of the fast path).
+
+    Trigrams found in more than ``max_df`` of the questions (e.g. "wha")
+    are too common to find candidates with and their posting lists are not
+    walked; the Dice coefficient of each candidate still counts them."""
+
+    def __init__(self, n: int = 3, max_candidates: int = 100, max_df: float = 0.05) -> None:
+        self.n = n
+        self.max_candidates = max_candidates
+        self.max_df = max_df
+        self._entries: Dict[str, Any] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._counter = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return (text or "").lower().strip()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, question: str, entry: Any) -> None:
+        """Index ``entry`` under ``question``; the first entry for a key wins."""
+        key = self.normalize(question)
+        if key in self._entries:
+            return
+        grams = _grams(key, self.n)
+        self._entries[key] = entry
+        self._grams[key] = grams
+        self._order[key] = self._counter
+        self._counter += 1
+        for g in grams:
+            self._postings[g].add(key)
+
+    def remove(self, question: str, entry: Any = None) -> None:
+        key = self.normalize(question)
+        if key not in self._entries or (entry is not None and self._entries[key] is not entry):
+            return
+        del self._entries[key]
+        del self._order[key]
+        for g in self._grams.pop(key):
+            keys = self._postings[g]
+            keys.discard(key)
+            if not keys:
+                del self._postings[g]
+
+    def candidates(self, question: str) -> List[str]:
+        """Return up to ``max_candidates`` keys sharing the most trigrams."""
+        key = self.normalize(question)
+        grams = _grams(key, self.n)
+        postings = sorted(
+            (self._postings[g] for g in grams if g in self._postings), key=len
+        )
+        if not postings:
+            return []
+        common = max(self.max_candidates, int(len(self._entries) * self.max_df))
+        # the rarest trigram is always used, so a query of common ones still matches
+        found: Set[str] = set(postings[0])
+        for keys in postings[1:]:
+            if len(keys) > common:
+                break
+            found.update(keys)
+        scored = sorted(found, key=lambda k: (
+            -2.0 * len(grams & self._grams[k]) / (len(grams) + len(self._grams[k])),
+            self._order[k],
+        ))
+        return scored[:self.max_candidates]
+
+    def best_match(self, question: str, threshold: float = 0.6, exact: bool = False) -> Optional[Any]:
+        """Return the entry with the highest ratio >= ``threshold``."""
+        query = self.normalize(question)
+        if exact:
+            keys: Iterable[str] = self._entries
+        else:
+            # keep insertion order so ties resolve like the linear scan
+            keys = sorted(self.candidates(query), key=self._order.__getitem__)
+        best_score = 0.0
+        best_entry = None
+        matcher = SequenceMatcher(None, query)
+        for key in keys:
+            floor = max(threshold, best_score)
+            if _length_bound(query, key) < floor:
+                continue
+            matcher.set_seq2(key)
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            score = matcher.ratio()
+            if score > best_score and score >= threshold:
+                best_score = score
+                best_entry = self._entries[key]
+        return best_entry
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from .indicators import EMAState, MACDState, RSIState, ewm_matrix, rsi_matrix
+
 
 def compute_rsi(series: pd.Series, period: int = 14) -> pd.Series:
     delta = series.diff()
@@ -12,32 +15,166 @@ def compute_rsi(series: pd.Series, period: int = 14) -> pd.Series:
     return rsi
 
 
+def align_closes(closes: dict[str, pd.Series]) -> pd.DataFrame:
+    """Stack close series into a (bars x symbols) frame aligned at the end.
+
+    Shorter series are padded with leading NaN, which the indicators skip,
+    so every column gives the same result as its series on its own."""
+    rows = max((len(s) for s in closes.values()), default=0)
+    values = np.full((rows, len(closes)), np.nan)
+    for j, series in enumerate(closes.values()):
+        if len(series):
+            values[rows - len(series):, j] = series.to_numpy(dtype=float)
+    return pd.DataFrame(values, columns=list(closes))
+
+
+def _values(prices: pd.DataFrame) -> np.ndarray:
+    return prices.to_numpy(dtype=float)
+
+
+# Signal matrices hold one code per bar and symbol; the signal in row i
+# is what the strategy returns for the prices up to and including row i.
+HOLD, BUY, SELL = 0, 1, -1
+LABELS = {HOLD: "hold", BUY: "buy", SELL: "sell"}
+
+
+def crossing_matrix(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    out = np.zeros(fast.shape, dtype=np.int8)
+    out[1:][(fast[1:] > slow[1:]) & (fast[:-1] <= slow[:-1])] = BUY
+    out[1:][(fast[1:] < slow[1:]) & (fast[:-1] >= slow[:-1])] = SELL
+    return out
+
+
+def threshold_matrix(rsi: np.ndarray, lower: float = 30, upper: float = 70) -> np.ndarray:
+    out = np.zeros(rsi.shape, dtype=np.int8)
+    out[rsi < lower] = BUY
+    out[rsi > upper] = SELL
+    return out
+
+
+def rsi_signal_matrix(values: np.ndarray, period: int = 14, lower: float = 30, upper: float = 70) -> np.ndarray:
+    return threshold_matrix(rsi_matrix(values, period), lower, upper)
+
+
+def ema_signal_matrix(values: np.ndarray, short: int = 12, long: int = 26) -> np.ndarray:
+    return crossing_matrix(ewm_matrix(values, short), ewm_matrix(values, long))
+
+
+def macd_signal_matrix(values: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> np.ndarray:
+    macd = ewm_matrix(values, fast) - ewm_matrix(values, slow)
+    return crossing_matrix(macd, ewm_matrix(macd, signal))
+
+
+def _last_signals(prices: pd.DataFrame, matrix: np.ndarray) -> dict[str, str]:
+    if not len(matrix):
+        return {sym: "hold" for sym in prices.columns}
+    return {sym: LABELS[int(code)] for sym, code in zip(prices.columns, matrix[-1])}
+
+
+def rsi_signals(prices: pd.DataFrame, period: int = 14, lower: float = 30, upper: float = 70) -> dict[str, str]:
+    """RSI signal for every column of a (bars x symbols) price frame."""
+    return _last_signals(prices, rsi_signal_matrix(_values(prices), period, lower, upper))
+
+
+def ema_signals(prices: pd.DataFrame, short: int = 12, long: int = 26) -> dict[str, str]:
+    """EMA crossover signal for every column of a price frame."""
+    return _last_signals(prices, ema_signal_matrix(_values(prices), short, long))
+
+
+def macd_signals(prices: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> dict[str, str]:
+    """MACD/signal-line crossover for every column of a price frame."""
+    return _last_signals(prices, macd_signal_matrix(_values(prices), fast, slow, signal))
+
+
 def rsi_strategy(prices: pd.Series) -> str:
-    rsi = compute_rsi(prices).iloc[-1]
-    if rsi < 30:
-        return "buy"
-    if rsi > 70:
-        return "sell"
-    return "hold"
+    return rsi_signals(prices.to_frame("price"))["price"]
 
 
 def ema_strategy(prices: pd.Series, short: int = 12, long: int = 26) -> str:
-    ema_short = prices.ewm(span=short, adjust=False).mean()
-    ema_long = prices.ewm(span=long, adjust=False).mean()
-    if ema_short.iloc[-1] > ema_long.iloc[-1] and ema_short.iloc[-2] <= ema_long.iloc[-2]:
-        return "buy"
-    if ema_short.iloc[-1] < ema_long.iloc[-1] and ema_short.iloc[-2] >= ema_long.iloc[-2]:
-        return "sell"
-    return "hold"
+    return ema_signals(prices.to_frame("price"), short, long)["price"]
 
 
 def macd_strategy(prices: pd.Series) -> str:
-    ema12 = prices.ewm(span=12, adjust=False).mean()
-    ema26 = prices.ewm(span=26, adjust=False).mean()
-    macd = ema12 - ema26
-    signal = macd.ewm(span=9, adjust=False).mean()
-    if macd.iloc[-1] > signal.iloc[-1] and macd.iloc[-2] <= signal.iloc[-2]:
+    return macd_signals(prices.to_frame("price"))["price"]
+
+
+def _cross(fast: float, slow: float, prev_fast: float, prev_slow: float) -> str:
+    if fast > slow and prev_fast <= prev_slow:
         return "buy"
-    if macd.iloc[-1] < signal.iloc[-1] and macd.iloc[-2] >= signal.iloc[-2]:
+    if fast < slow and prev_fast >= prev_slow:
         return "sell"
     return "hold"
+
+
+# Streaming counterparts of the strategies above: feed one close per bar to
+# update() and get the same signal the batch function would return for the
+# series seen so far. State is checkpointed with to_dict()/from_dict().
+
+class RSISignal:
+    def __init__(self, period: int = 14) -> None:
+        self.rsi = RSIState(period)
+
+    def update(self, price: float) -> str:
+        rsi = self.rsi.update(price)
+        if rsi < 30:
+            return "buy"
+        if rsi > 70:
+            return "sell"
+        return "hold"
+
+    def to_dict(self) -> dict:
+        return {"rsi": self.rsi.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RSISignal":
+        signal = cls()
+        signal.rsi = RSIState.from_dict(data["rsi"])
+        return signal
+
+
+class EMASignal:
+    def __init__(self, short: int = 12, long: int = 26) -> None:
+        self.short = EMAState(short)
+        self.long = EMAState(long)
+        self.prev = (float("nan"), float("nan"))
+
+    def update(self, price: float) -> str:
+        prev_short, prev_long = self.prev
+        first = self.short.seen == 0
+        self.prev = (self.short.update(price), self.long.update(price))
+        if first:
+            return "hold"
+        return _cross(*self.prev, prev_short, prev_long)
+
+    def to_dict(self) -> dict:
+        return {"short": self.short.to_dict(), "long": self.long.to_dict(), "prev": list(self.prev)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EMASignal":
+        signal = cls()
+        signal.short = EMAState.from_dict(data["short"])
+        signal.long = EMAState.from_dict(data["long"])
+        signal.prev = tuple(data["prev"])
+        return signal
+
+
+class MACDSignal:
+    def __init__(self) -> None:
+        self.macd = MACDState()
+
+    def update(self, price: float) -> str:
+        prev = self.macd.value
+        first = self.macd.fast.seen == 0
+        current = self.macd.update(price)
+        if first:
+            return "hold"
+        return _cross(*current, *prev)
+
+    def to_dict(self) -> dict:
+        return {"macd": self.macd.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MACDSignal":
+        signal = cls()
+        signal.macd = MACDState.from_dict(data["macd"])
+        return signal
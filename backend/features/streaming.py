@@ -0,0 +1,236 @@
+"""Event-driven trading on a stream of hourly bars.
+
+A source calls :meth:`StreamTrader.on_bar` for every completed bar. The
+symbol's streaming signal (see ``strategies.RSISignal`` and friends) is
+updated in constant time, so the strategy only runs for symbols whose bars
+changed. Decisions go through a :class:`LatestQueue` to the execution
+thread: while a symbol waits there, a newer decision replaces the queued
+one (drop-to-latest), and when too many symbols are waiting the source is
+blocked (backpressure) instead of the queue growing without bound.
+
+:class:`ReplaySource` feeds stored bars and stands in for the live feed
+in tests; :class:`AlpacaStreamSource` aggregates Alpaca's minute bars.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .autotrade import aip, bar_store, choose_signal_stream, execute_trade
+from .market_data import BAR_WINDOW_DAYS, MarketSnapshot
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 1000))
+STREAM_ACCOUNT_TTL = float(os.getenv("STREAM_ACCOUNT_TTL", 60))
+ALPACA_DATA_FEED = os.getenv("ALPACA_DATA_FEED", "iex")
+
+BarEvent = namedtuple("BarEvent", "symbol timestamp close")
+
+
+class LatestQueue:
+    """FIFO of keys where each key holds only its latest item.
+
+    ``put`` on a key that is already waiting replaces the item in place and
+    counts it in ``dropped``. ``put`` on a new key blocks while ``maxsize``
+    keys are waiting (0 means unbounded)."""
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: OrderedDict = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, key, item, timeout: float | None = None) -> bool:
+        with self._cond:
+            if key in self._items:
+                self._items[key] = item
+                self.dropped += 1
+                return True
+            ready = self._cond.wait_for(
+                lambda: self._closed or not self.maxsize or len(self._items) < self.maxsize, timeout
+            )
+            if not ready or self._closed:
+                return False
+            self._items[key] = item
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float | None = None):
+        """Return the oldest ``(key, item)``, or None once closed and empty."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            pair = self._items.popitem(last=False)
+            self._cond.notify_all()
+            return pair
+
+    def __contains__(self, key) -> bool:
+        with self._cond:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def close(self) -> None:
+        """Wake everyone up; ``get`` drains what is left, ``put`` refuses."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class ReplaySource:
+    """Replay close series as bar events in time order.
+
+    ``speed`` > 0 sleeps between bars so that one hour of bars takes
+    ``3600 / speed`` seconds; 0 replays as fast as possible."""
+
+    def __init__(self, closes: dict[str, pd.Series], speed: float = 0) -> None:
+        self.closes = closes
+        self.speed = speed
+
+    def run(self, handler, stop: threading.Event) -> None:
+        frame = pd.concat({sym: c for sym, c in self.closes.items() if len(c)}, axis=1).sort_index()
+        previous = None
+        for timestamp, row in zip(frame.index, frame.to_numpy(dtype=float)):
+            if stop.is_set():
+                return
+            if self.speed and previous is not None:
+                time.sleep((timestamp - previous).total_seconds() / self.speed)
+            previous = timestamp
+            for sym, close in zip(frame.columns, row):
+                if close == close:
+                    handler(BarEvent(sym, timestamp, float(close)))
+
+
+class AlpacaStreamSource:
+    """Hourly bars built from Alpaca's real-time minute bars.
+
+    A symbol's hour is emitted when its first minute bar of the next hour
+    arrives, stamped with the hour start like the REST hourly bars."""
+
+    def __init__(self, symbols: list[str], key_id: str | None = None, secret_key: str | None = None,
+                 feed: str = ALPACA_DATA_FEED) -> None:
+        self.symbols = symbols
+        self.key_id = key_id or os.getenv("APCA_API_KEY_ID")
+        self.secret_key = secret_key or os.getenv("APCA_API_SECRET_KEY")
+        self.feed = feed
+        self._hours: dict[str, tuple[pd.Timestamp, float]] = {}
+
+    def _on_minute(self, handler, symbol: str, timestamp, close: float) -> None:
+        hour = pd.Timestamp(timestamp).tz_convert("UTC").floor("h")
+        current = self._hours.get(symbol)
+        if current is not None and hour > current[0]:
+            handler(BarEvent(symbol, current[0], current[1]))
+        self._hours[symbol] = (hour, float(close))
+
+    def run(self, handler, stop: threading.Event) -> None:
+        from alpaca_trade_api.stream import Stream
+
+        stream = Stream(self.key_id, self.secret_key, data_feed=self.feed)
+
+        async def on_bar(bar):
+            self._on_minute(handler, bar.symbol, bar.timestamp, bar.close)
+
+        stream.subscribe_bars(on_bar, *self.symbols)
+        watcher = threading.Thread(target=lambda: (stop.wait(), stream.stop()), daemon=True)
+        watcher.start()
+        stream.run()
+
+
+class StreamTrader:
+    """Keep per-symbol signal state current and act on changed signals."""
+
+    def __init__(self, source, symbols: list[str], strategy: str | None = None,
+                 execute=None, maxsize: int = STREAM_QUEUE_SIZE) -> None:
+        self.source = source
+        self.symbols = [s.upper() for s in symbols]
+        factory = choose_signal_stream(strategy)
+        self.signals = {sym: factory() for sym in self.symbols}
+        self.last_bar: dict[str, pd.Timestamp] = {}
+        self.queue = LatestQueue(maxsize)
+        self.execute = execute or self._execute
+        self.stop_event = threading.Event()
+        self.stats = {"bars": 0, "signals": 0, "executed": 0, "errors": 0}
+        self._snapshot = MarketSnapshot(0.0, {}, {})
+        self._account_at = 0.0
+
+    def warm_up(self, closes: dict[str, pd.Series]) -> None:
+        """Feed historical closes through the signals without trading."""
+        for sym, series in closes.items():
+            signal = self.signals.get(sym)
+            if signal is None or not len(series):
+                continue
+            for close in series.to_numpy(dtype=float):
+                signal.update(float(close))
+            self.last_bar[sym] = series.index[-1]
+
+    def warm_up_from_store(self, days: int = BAR_WINDOW_DAYS) -> None:
+        """Warm up from the bar store, leaving out the unfinished hour."""
+        bar_store.update(aip, self.symbols)
+        now = datetime.now(timezone.utc)
+        start = now - pd.Timedelta(days=days)
+        hour = pd.Timestamp(now).floor("h")
+        closes = {}
+        for sym in self.symbols:
+            series = bar_store.closes(sym, start)
+            closes[sym] = series[series.index < hour]
+        self.warm_up(closes)
+
+    def on_bar(self, event: BarEvent) -> None:
+        signal = self.signals.get(event.symbol)
+        last = self.last_bar.get(event.symbol)
+        if signal is None or (last is not None and event.timestamp <= last):
+            return
+        self.last_bar[event.symbol] = event.timestamp
+        self.stats["bars"] += 1
+        action = signal.update(event.close)
+        if action != "hold":
+            # crossovers fire once, so a later hold must not cancel a queued
+            # decision; only a newer buy/sell replaces it
+            self.stats["signals"] += 1
+            self.queue.put(event.symbol, (action, event.close, event.timestamp))
+
+    def _execute(self, symbol: str, action: str, price: float) -> None:
+        if time.monotonic() - self._account_at > STREAM_ACCOUNT_TTL:
+            self._snapshot.cash = float(aip.get_account().cash)
+            self._account_at = time.monotonic()
+        self._snapshot.prices[symbol] = price
+        execute_trade(symbol, self._snapshot, action)
+
+    def _consume(self) -> None:
+        while True:
+            pair = self.queue.get()
+            if pair is None:
+                return
+            symbol, (action, price, _) = pair
+            try:
+                self.execute(symbol, action, price)
+                self.stats["executed"] += 1
+            except Exception as exc:
+                self.stats["errors"] += 1
+                print(f"[Stream Error] {symbol}: {exc}")
+
+    def run(self) -> dict:
+        """Run until the source ends or :meth:`stop` is called."""
+        consumer = threading.Thread(target=self._consume, daemon=True)
+        consumer.start()
+        try:
+            self.source.run(self.on_bar, self.stop_event)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.queue.close()
+            consumer.join()
+        self.stats["coalesced"] = self.queue.dropped
+        return self.stats
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.queue.close()
@@ -0,0 +1,205 @@
+"""Parameter sweeps of the strategies over stored bars.
+
+Every grid point is replayed with :func:`backtest.run_backtest` and the
+results are ranked by return. The work is spread over a process pool:
+the price arrays are placed in shared memory once and the workers map
+them instead of receiving a pickled copy per task. Grid points that share
+an intermediate (the RSI of one period, the EMA of one span, the MACD
+line of one fast/slow pair) are grouped into the same task, and each
+worker keeps the most recent intermediates in an LRU cache.
+"""
+
+import itertools
+import math
+import os
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.memory import MemoryManager
+from .autotrade import COOLDOWN
+from .backtest import BACKTEST_CASH, BACKTEST_MEMORY_PATH, pack, run_backtest, unpack
+from .indicators import ewm_matrix, rsi_matrix
+from .strategies import crossing_matrix, threshold_matrix
+
+SWEEP_CACHE_SIZE = int(os.getenv("SWEEP_CACHE_SIZE", 16))
+
+DEFAULT_GRID = {
+    "RSI": {"period": [7, 14, 21], "lower": [20, 25, 30], "upper": [70, 75, 80]},
+    "EMA": {"short": [5, 8, 12], "long": [20, 26, 50]},
+    "MACD": {"fast": [8, 12], "slow": [21, 26], "signal": [7, 9]},
+}
+
+
+def grid_points(grid: dict = DEFAULT_GRID) -> list[tuple[str, dict]]:
+    """Expand ``{strategy: {param: values}}`` into valid grid points."""
+    points = []
+    for strategy, axes in grid.items():
+        names = list(axes)
+        for values in itertools.product(*(axes[n] for n in names)):
+            params = dict(zip(names, values))
+            if strategy == "RSI" and params["lower"] >= params["upper"]:
+                continue
+            if strategy == "EMA" and params["short"] >= params["long"]:
+                continue
+            if strategy == "MACD" and params["fast"] >= params["slow"]:
+                continue
+            points.append((strategy, params))
+    return points
+
+
+def _task_key(strategy: str, params: dict) -> tuple:
+    if strategy == "RSI":
+        return (strategy, params["period"])
+    if strategy == "EMA":
+        return (strategy, params["short"])
+    return (strategy, params["fast"], params["slow"])
+
+
+def make_tasks(points: list[tuple[str, dict]], workers: int) -> list[list[tuple[str, dict]]]:
+    """Group points by shared intermediate, split so every worker stays busy."""
+    groups = defaultdict(list)
+    for strategy, params in points:
+        groups[_task_key(strategy, params)].append((strategy, params))
+    size = max(1, math.ceil(len(points) / (workers * 4)))
+    tasks = [g[i:i + size] for g in groups.values() for i in range(0, len(g), size)]
+    # largest first so the pool does not end on a long task
+    return sorted(tasks, key=len, reverse=True)
+
+
+class SharedArrays:
+    """NumPy arrays copied once into named shared memory blocks."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+# per-process state set up by _attach()
+_worker: dict = {}
+_cache: OrderedDict = OrderedDict()
+
+
+def _attach(specs: dict, columns: list, tz, cash: float, cooldown: int) -> None:
+    blocks = []
+    for name, (block_name, shape, dtype) in specs.items():
+        try:
+            block = shared_memory.SharedMemory(name=block_name, track=False)
+        except TypeError:  # Python < 3.13 has no track argument
+            block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        _worker[name] = np.ndarray(shape, dtype, buffer=block.buf)
+    index = pd.DatetimeIndex(_worker["times"].view("datetime64[ns]"))
+    if tz is not None:
+        index = index.tz_localize(tz)
+    _worker["blocks"] = blocks
+    _worker["prices"] = pd.DataFrame(_worker["values"], index=index, columns=columns, copy=False)
+    _worker["cash"] = cash
+    _worker["cooldown"] = cooldown
+    _worker["memory"] = MemoryManager(BACKTEST_MEMORY_PATH, autosave=False)
+    _cache.clear()
+
+
+def _detach() -> None:
+    """Drop the views of the shared arrays and close the attached blocks."""
+    blocks = _worker.pop("blocks", [])
+    _worker.clear()
+    _cache.clear()
+    for block in blocks:
+        block.close()
+
+
+def _cached(key: tuple, compute):
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    value = compute()
+    _cache[key] = value
+    if len(_cache) > SWEEP_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return value
+
+
+def _ema(span: int) -> np.ndarray:
+    return _cached(("ema", span), lambda: ewm_matrix(_worker["packed"], span))
+
+
+def _codes(strategy: str, params: dict) -> np.ndarray:
+    if strategy == "RSI":
+        period = params["period"]
+        rsi = _cached(("rsi", period), lambda: rsi_matrix(_worker["packed"], period))
+        return threshold_matrix(rsi, params["lower"], params["upper"])
+    if strategy == "EMA":
+        return crossing_matrix(_ema(params["short"]), _ema(params["long"]))
+    fast, slow = params["fast"], params["slow"]
+    macd = _cached(("macd", fast, slow), lambda: _ema(fast) - _ema(slow))
+    return crossing_matrix(macd, ewm_matrix(macd, params["signal"]))
+
+
+def _evaluate(points: list[tuple[str, dict]]) -> list[dict]:
+    rows = []
+    memory = _worker["memory"]
+    for strategy, params in points:
+        memory.reset()
+        signals = unpack(_codes(strategy, params), _worker["valid"])
+        report = run_backtest(
+            _worker["prices"], cash=_worker["cash"], cooldown=_worker["cooldown"],
+            memory=memory, signals=signals,
+        )
+        rows.append({
+            "strategy": strategy,
+            "params": " ".join(f"{k}={v}" for k, v in params.items()),
+            "return_pct": report["return_pct"],
+            "pnl": report["pnl"],
+            "win_rate": report["win_rate"],
+            "fills": report["fills"],
+            "turnover": report["turnover"],
+        })
+    return rows
+
+
+def sweep(prices: pd.DataFrame, grid: dict = DEFAULT_GRID, workers: int | None = None,
+          cash: float = BACKTEST_CASH, cooldown: int = COOLDOWN) -> pd.DataFrame:
+    """Backtest every grid point and return the results ranked by return."""
+    workers = workers or os.cpu_count() or 1
+    packed, valid = pack(prices)
+    shared = SharedArrays({
+        "packed": packed,
+        "valid": valid,
+        "values": prices.to_numpy(dtype=float),
+        # the workers view this as datetime64[ns]
+        "times": prices.index.as_unit("ns").asi8,
+    })
+    initargs = (shared.specs, list(prices.columns), prices.index.tz, cash, cooldown)
+    tasks = make_tasks(grid_points(grid), workers)
+    rows = []
+    try:
+        if workers == 1:
+            _attach(*initargs)
+            for task in tasks:
+                rows.extend(_evaluate(task))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_attach, initargs=initargs) as pool:
+                for future in as_completed([pool.submit(_evaluate, task) for task in tasks]):
+                    rows.extend(future.result())
+    finally:
+        _detach()
+        shared.close()
+    if not rows:
+        return pd.DataFrame()
+    table = pd.DataFrame(rows).sort_values(["return_pct", "win_rate"], ascending=False)
+    table.index = pd.RangeIndex(1, len(table) + 1, name="rank")
+    return table
@@ -1,14 +1,287 @@
+"""Telegram alerts sent from a background thread.
+
+``send_telegram_alert`` only enqueues. The dispatcher thread collects the
+messages that arrive within ``TELEGRAM_COALESCE_WINDOW`` seconds into one
+message per chat, sends it over a keep-alive ``requests.Session`` and
+limits each chat to ``TELEGRAM_RATE`` messages per second. Messages that
+cannot be delivered (network errors, 429s, a full queue, shutdown) are
+appended to a JSONL spool on disk and retried later, also across restarts.
+
+Several processes may share the spool, so it is only touched under an
+advisory lock on ``<spool>.lock``. A retry moves the spool to a
+``<spool>.<pid>.sending`` file under the lock and sends outside it; what
+still fails goes back in front of the spool. Sending files left by a
+process that died are picked up by the next retry.
+"""
+
+import atexit
+import glob
+import json
 import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
 import requests
 
+from backend.utils.resilience import TokenBucket
 
-def send_telegram_alert(message: str) -> None:
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+TELEGRAM_COALESCE_WINDOW = float(os.getenv("TELEGRAM_COALESCE_WINDOW", 2))
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", 1000))
+TELEGRAM_RATE = float(os.getenv("TELEGRAM_RATE", 1))
+TELEGRAM_RETRY_INTERVAL = float(os.getenv("TELEGRAM_RETRY_INTERVAL", 60))
+TELEGRAM_SPOOL_PATH = os.getenv(
+    "TELEGRAM_SPOOL_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'telegram_spool.jsonl'),
+)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+MAX_MESSAGE_LENGTH = 4096
+_STOP = object()
+
+
+def _chunks(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Split ``text`` at line breaks into pieces Telegram accepts."""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_spool(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_spool(path: str, entries: list[dict]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, path)
+
+
+class TelegramDispatcher:
+    def __init__(self, token: str, chat_id: str, window: float = TELEGRAM_COALESCE_WINDOW,
+                 queue_size: int = TELEGRAM_QUEUE_SIZE, rate: float = TELEGRAM_RATE,
+                 spool_path: str = TELEGRAM_SPOOL_PATH,
+                 retry_interval: float = TELEGRAM_RETRY_INTERVAL) -> None:
+        self.url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.window = window
+        self.rate = rate
+        self.spool_path = spool_path
+        self.retry_interval = retry_interval
+        self.session = requests.Session()
+        self.stats = {"queued": 0, "sent": 0, "coalesced": 0, "spooled": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._spool_lock = threading.Lock()
+        self._last_retry = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, message: str, chat_id: str | None = None) -> None:
+        chat_id = chat_id or self.chat_id
+        try:
+            self._queue.put_nowait((chat_id, message))
+            self.stats["queued"] += 1
+        except queue.Full:
+            self._spool([(chat_id, message)])
+
+    # delivery
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(self.rate)
+        return self._buckets[chat_id]
+
+    def _send(self, chat_id: str, text: str) -> bool:
+        """Send one message; False means retry later."""
+        bucket = self._bucket(chat_id)
+        bucket.acquire()
+        try:
+            res = self.session.post(self.url, json={"chat_id": chat_id, "text": text}, timeout=5)
+        except requests.RequestException as e:
+            print(f"[Telegram Error] {e}")
+            return False
+        if res.status_code == 429 or res.status_code >= 500:
+            try:
+                retry_after = res.json().get("parameters", {}).get("retry_after")
+            except ValueError:
+                retry_after = None
+            bucket.penalize(float(retry_after or 1))
+            return False
+        if not res.ok:
+            # a bad token or chat id will not get better by retrying
+            print(f"[Telegram Error] {res.status_code} {res.text[:200]}")
+        else:
+            self.stats["sent"] += 1
+        return True
+
+    def _deliver(self, chat_id: str, text: str) -> bool:
+        chunks = _chunks(text)
+        for i, chunk in enumerate(chunks):
+            if not self._send(chat_id, chunk):
+                self._spool([(chat_id, c) for c in chunks[i:]])
+                return False
+        return True
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.retry_interval)
+            except queue.Empty:
+                self._retry_spool()
+                continue
+            if item is _STOP:
+                break
+            batch = defaultdict(list)
+            batch[item[0]].append(item[1])
+            deadline = time.monotonic() + self.window
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch[item[0]].append(item[1])
+            for chat_id, texts in batch.items():
+                self.stats["coalesced"] += len(texts) - 1
+                self._deliver(chat_id, "\n".join(texts))
+            if time.monotonic() - self._last_retry > self.retry_interval:
+                self._retry_spool()
+
+    # spool
+
+    def _locked(self):
+        """Exclusive advisory lock on ``<spool>.lock``; a no-op without fcntl."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.spool_path)), exist_ok=True)
+        lock = open(self.spool_path + ".lock", "a")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _spool(self, items: list[tuple[str, str]]) -> None:
+        with self._spool_lock, self._locked():
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for chat_id, text in items:
+                    f.write(json.dumps({"chat_id": chat_id, "text": text, "ts": time.time()}) + "\n")
+        self.stats["spooled"] += len(items)
+
+    def _claim(self, sending: str) -> list[dict]:
+        """Move the spool and orphaned sending files to ``sending``."""
+        orphans = []
+        for path in sorted(glob.glob(glob.escape(self.spool_path) + ".*.sending")):
+            pid = path[len(self.spool_path) + 1:-len(".sending")]
+            if path == sending or (pid.isdigit() and not _alive(int(pid))):
+                orphans.append(path)
+        entries = [e for path in orphans for e in _read_spool(path)]
+        entries += _read_spool(self.spool_path)
+        if entries:
+            _write_spool(sending, entries)
+        for path in orphans:
+            if path != sending:
+                os.remove(path)
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+        return entries
+
+    def _retry_spool(self) -> None:
+        """Resend spooled messages in order, keeping whatever still fails."""
+        self._last_retry = time.monotonic()
+        sending = f"{self.spool_path}.{os.getpid()}.sending"
+        with self._spool_lock, self._locked():
+            entries = self._claim(sending)
+        if not entries:
+            return
+        sent = 0
+        for entry in entries:
+            if not self._send(entry["chat_id"], entry["text"]):
+                break
+            sent += 1
+        with self._spool_lock, self._locked():
+            remaining = entries[sent:]
+            if remaining:
+                # older than anything spooled while we were sending
+                _write_spool(self.spool_path, remaining + _read_spool(self.spool_path))
+            os.remove(sending)
+
+    def close(self, timeout: float = 10) -> None:
+        """Deliver what is queued; spool anything left after ``timeout``."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._spool(leftover)
+
+
+_dispatcher: TelegramDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> TelegramDispatcher | None:
+    """The shared dispatcher, or None when Telegram is not configured."""
+    global _dispatcher
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
     if not token or not chat_id:
-        return
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    try:
-        requests.post(url, json={"chat_id": chat_id, "text": message}, timeout=5)
-    except Exception:
-        pass
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher(token, chat_id)
+        return _dispatcher
+
+
+def send_telegram_alert(message: str) -> None:
+    dispatcher = get_dispatcher()
+    if dispatcher is not None:
+        dispatcher.enqueue(message)
@@ -1,12 +1,39 @@
+import os
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+
+from backend.features import ollama
+from backend.features.search_extract import extract_bing, extract_duckduckgo
+from backend.utils.cache import PersistentCache
+from backend.utils.resilience import CircuitBreaker, LatencyHistogram, TokenBucket
 
 # Track which source successfully provided results
 last_used_source: str | None = None
 
+# Results from the web providers are cached by normalized query + keywords
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 86400))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1000))
+SEARCH_CACHE_PATH = os.getenv(
+    "SEARCH_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'search_cache.db'),
+)
+_CACHED_SOURCES = ("duckduckgo", "bing")
+
+# HTML providers; "race" queries them concurrently, "sequential" one by one
+DUCKDUCKGO_URL = os.getenv("DUCKDUCKGO_URL", "https://html.duckduckgo.com/html/")
+BING_URL = os.getenv("BING_URL", "https://www.bing.com/search")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "race").lower()
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", 5))
+_BREAKER_FAILURES = int(os.getenv("SEARCH_BREAKER_FAILURES", 3))
+_BREAKER_COOLDOWN = float(os.getenv("SEARCH_BREAKER_COOLDOWN", 120))
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+search_cache = PersistentCache(SEARCH_CACHE_PATH, max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
 # Very small list of stopwords for naive keyword filtering
 _STOPWORDS = {
     "the", "is", "a", "an", "and", "or", "of", "to", "in", "on",
@@ -57,122 +84,180 @@ def _domain_score(url: str) -> float:
 
 _MIN_SNIPPET_LEN = 30
 
-def web_search(query: str) -> str:
+def _cache_key(query: str, keywords: list[str]) -> str:
+    return " ".join(query.lower().split()) + "|" + ",".join(sorted(set(keywords)))
+
+def cache_stats() -> dict:
+    """Return hit/miss counters of the search result cache."""
+    return search_cache.stats()
+
+def web_search(query: str, use_cache: bool = True) -> str:
     """Return relevant search snippets for a query using DuckDuckGo, with
     fallback to Bing or local Ollama. Results are filtered by keyword
-    overlap, minimum length and domain relevance."""
+    overlap, minimum length and domain relevance.
+
+    Web results are served from ``search_cache`` when possible; the cached
+    provider name is restored into ``last_used_source`` on a hit."""
 
     global last_used_source
-    last_used_source = None
+    text, last_used_source = search_with_source(query, use_cache)
+    return text
 
-    headers = {"User-Agent": "Mozilla/5.0"}
+def search_with_source(query: str, use_cache: bool = True) -> tuple[str, str | None]:
+    """Like :func:`web_search` but return ``(text, source)`` instead of
+    setting the module-level ``last_used_source``; safe to call from
+    several threads at once."""
     keywords = _extract_keywords(query)
+    key = _cache_key(query, keywords)
+    if use_cache:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached["text"], cached["source"]
 
-    # 1. DuckDuckGo Primary Search
-    try:
-        res = requests.get(
-            "https://html.duckduckgo.com/html/",
-            params={"q": query},
-            headers=headers,
-            timeout=5
-        )
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
-        results = soup.find_all("div", class_="result", limit=5)
-        snippets: list[tuple[float, str]] = []
-
-        for r in results:
-            title = r.find("a", class_="result__a")
-            snippet = (
-                r.find("a", class_="result__snippet")
-                or r.find("div", class_="result__snippet")
-                or r.find("span", class_="result__snippet")
-            )
-            url = title.get("href") if title else ""
-            text_parts = []
-            if title and title.get_text():
-                text_parts.append(title.get_text(" ", strip=True))
-            if snippet and snippet.get_text():
-                text_parts.append(snippet.get_text(" ", strip=True))
-            if text_parts:
-                combined = " - ".join(text_parts)
-                if len(combined) < _MIN_SNIPPET_LEN:
-                    continue
-                overlap = _keyword_overlap(combined, keywords)
-                domain_ok = _domain_relevant(url, keywords)
-                if not keywords or overlap >= 0.3 or domain_ok:
-                    score = overlap + _domain_score(url)
-                    print(f"[DuckDuckGo snippet] {combined}")
-                    snippets.append((score, combined))
-
-        if snippets:
-            snippets.sort(key=lambda x: x[0], reverse=True)
-            last_used_source = "duckduckgo"
-            return "\n".join([s for _, s in snippets[:3]])
+    text, source = _search(query, keywords)
+    if use_cache and source in _CACHED_SOURCES:
+        search_cache.set(key, {"text": text, "source": source})
+    return text, source
 
-    except Exception as e:
-        print(f"[DuckDuckGo Error] {e}")
+def _rank(results, keywords: list[str], label: str) -> list[tuple[float, str]]:
+    """Filter extracted ``(title, url, snippet)`` results and score them."""
+    snippets: list[tuple[float, str]] = []
+    for title, url, snippet in results:
+        text_parts = [t for t in (title, snippet) if t]
+        if text_parts:
+            combined = " - ".join(text_parts)
+            if len(combined) < _MIN_SNIPPET_LEN:
+                continue
+            overlap = _keyword_overlap(combined, keywords)
+            domain_ok = _domain_relevant(url, keywords)
+            if not keywords or overlap >= 0.3 or domain_ok:
+                score = overlap + _domain_score(url)
+                print(f"[{label} snippet] {combined}")
+                snippets.append((score, combined))
+    return snippets
 
-    # 2. Bing Fallback
-    try:
-        res = requests.get(
-            f"https://www.bing.com/search?q={query}",
-            headers=headers,
-            timeout=5
-        )
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "html.parser")
-        results = soup.find_all("li", class_="b_algo", limit=5)
-        links: list[tuple[float, str]] = []
-
-        for r in results:
-            a_tag = r.find("a")
-            snippet = r.find("p")
-            url = a_tag.get("href") if a_tag else ""
-            text_parts = []
-            if a_tag and a_tag.get_text():
-                text_parts.append(a_tag.get_text(" ", strip=True))
-            if snippet and snippet.get_text():
-                text_parts.append(snippet.get_text(" ", strip=True))
-            if text_parts:
-                combined = " - ".join(text_parts)
-                if len(combined) < _MIN_SNIPPET_LEN:
-                    continue
-                overlap = _keyword_overlap(combined, keywords)
-                domain_ok = _domain_relevant(url, keywords)
-                if not keywords or overlap >= 0.3 or domain_ok:
-                    score = overlap + _domain_score(url)
-                    print(f"[Bing snippet] {combined}")
-                    links.append((score, combined))
-
-        if links:
-            links.sort(key=lambda x: x[0], reverse=True)
-            last_used_source = "bing"
-            return "\n".join([s for _, s in links[:3]])
+def _charset(res: requests.Response) -> str | None:
+    """Charset declared in the Content-Type header, if any."""
+    match = re.search(r"charset=([\w.:-]+)", res.headers.get("content-type", ""), re.I)
+    return match.group(1) if match else None
+
+def _search_duckduckgo(query: str, keywords: list[str]) -> list[tuple[float, str]]:
+    limits["duckduckgo"].acquire()
+    res = requests.get(
+        DUCKDUCKGO_URL,
+        params={"q": query},
+        headers=_HEADERS,
+        timeout=SEARCH_TIMEOUT
+    )
+    res.raise_for_status()
+    results = extract_duckduckgo(res.content, limit=5, encoding=_charset(res))
+    return _rank(results, keywords, "DuckDuckGo")
 
+def _search_bing(query: str, keywords: list[str]) -> list[tuple[float, str]]:
+    limits["bing"].acquire()
+    res = requests.get(
+        BING_URL,
+        params={"q": query},
+        headers=_HEADERS,
+        timeout=SEARCH_TIMEOUT
+    )
+    res.raise_for_status()
+    results = extract_bing(res.content, limit=5, encoding=_charset(res))
+    return _rank(results, keywords, "Bing")
+
+_PROVIDERS = {
+    "duckduckgo": (_search_duckduckgo, "DuckDuckGo"),
+    "bing": (_search_bing, "Bing"),
+}
+
+breakers = {name: CircuitBreaker(_BREAKER_FAILURES, _BREAKER_COOLDOWN) for name in _PROVIDERS}
+# requests per second per provider (DUCKDUCKGO_RATE / BING_RATE, 0 = unlimited);
+# the Ollama fallback is limited by ollama.limit
+limits = {name: TokenBucket(float(os.getenv(f"{name.upper()}_RATE", 0))) for name in _PROVIDERS}
+latencies = {name: LatencyHistogram() for name in _PROVIDERS}
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+
+def provider_stats() -> dict:
+    """Return circuit breaker state and latency statistics per provider."""
+    return {
+        name: {"breaker": breakers[name].state, **latencies[name].stats()}
+        for name in _PROVIDERS
+    }
+
+def _provider_order() -> list[str]:
+    """Available providers, fastest median latency first."""
+    names = [n for n in _PROVIDERS if breakers[n].allow()]
+    return sorted(names, key=lambda n: latencies[n].quantile(0.5) or 0.0)
+
+def _call_provider(name: str, query: str, keywords: list[str]) -> list[tuple[float, str]]:
+    func, label = _PROVIDERS[name]
+    start = time.monotonic()
+    try:
+        snippets = func(query, keywords)
     except Exception as e:
-        print(f"[Bing Error] {e}")
+        breakers[name].record_failure()
+        print(f"[{label} Error] {e}")
+        raise
+    latencies[name].record(time.monotonic() - start)
+    breakers[name].record_success()
+    return snippets
+
+def _hedged_search(names: list[str], query: str, keywords: list[str]) -> tuple[str | None, list[tuple[float, str]]]:
+    """Query providers concurrently and return the first usable result set.
+
+    The fastest provider starts immediately; each next one starts once the
+    previous has been running for its p90 latency (or at once without
+    history), so a slow or blocked provider never costs the full timeout."""
+    pending = {}
+    remaining = list(names)
+    while remaining or pending:
+        if remaining:
+            name = remaining.pop(0)
+            pending[_executor.submit(_call_provider, name, query, keywords)] = name
+            hedge = latencies[name].quantile(0.9) or 0.0
+            delay = min(hedge, SEARCH_TIMEOUT) if remaining else None
+        else:
+            delay = None
+        done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+        for fut in done:
+            name = pending.pop(fut)
+            try:
+                snippets = fut.result()
+            except Exception:
+                continue
+            if snippets:
+                return name, snippets
+    return None, []
+
+def _search(query: str, keywords: list[str]) -> tuple[str, str | None]:
+    names = _provider_order()
+    if SEARCH_MODE == "sequential":
+        # Original behaviour: DuckDuckGo, then Bing
+        source, snippets = None, []
+        for name in sorted(names, key=list(_PROVIDERS).index):
+            try:
+                snippets = _call_provider(name, query, keywords)
+            except Exception:
+                continue
+            if snippets:
+                source = name
+                break
+    else:
+        source, snippets = _hedged_search(names, query, keywords)
+
+    if snippets:
+        snippets.sort(key=lambda x: x[0], reverse=True)
+        return "\n".join([s for _, s in snippets[:3]]), source
 
     # 3. Local Ollama Fallback
     try:
-        res = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "mistral",
-                "prompt": f"Explain this in detail: {query}",
-                "stream": False
-            },
-            timeout=10
-        )
-        text = res.json().get("response", "").strip()
+        text = ollama.generate("mistral", f"Explain this in detail: {query}")
         if not text:
             raise ValueError("Empty response from Ollama")
-        last_used_source = "ollama"
         if keywords and not _contains_keyword(text, keywords):
-            return f"[No web access \u2013 Ollama fallback] {text}"
-        return f"[No web access \u2013 Ollama fallback] {text}"
+            return f"[No web access \u2013 Ollama fallback] {text}", "ollama"
+        return f"[No web access \u2013 Ollama fallback] {text}", "ollama"
     except Exception as e:
-        last_used_source = "ollama"
         print(f"[Ollama Error] {e}")
-        return "[No web access \u2013 Ollama fallback]"
+        return "[No web access \u2013 Ollama fallback]", "ollama"
 
@@ -28,16 +28,20 @@ def main():
         if online_mode and prompt.lower().startswith("search:"):
             query = prompt.split("search:", 1)[-1].strip()
             response = web_search(query)
+            print(f"🤖 JARVIS: {response}")
 
         elif prompt.lower().startswith("trade"):
             _, *symbols = prompt.split()
             run_autotrader(symbols or None)
             response = "✅ Trade executed."
+            print(f"🤖 JARVIS: {response}")
 
         else:
-            response = brain.ask(prompt)
-
-        print(f"🤖 JARVIS: {response}")
+            # print tokens as they are generated
+            print("🤖 JARVIS: ", end="", flush=True)
+            for chunk in brain.ask_stream(prompt):
+                print(chunk, end="", flush=True)
+            print()
 
         try:
             feedback = input("Feedback (✅ correct/❌ wrong)? ").strip()
@@ -1,23 +1,171 @@
 from dotenv import load_dotenv
+import json
 import os
+import re
 import sys
+import threading
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, request, jsonify
-from backend.features.autotrade import run_autotrader
+from flask import Flask, Response, request, jsonify, stream_with_context
+from backend.features.jobs import DONE_STATES, JobQueueFull, JobRunner
+from backend.utils.resilience import ConcurrencyLimit, KeyedLimit, Overloaded, SingleFlight
 
 load_dotenv()
 
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 0.5))
+ASK_CONCURRENCY = int(os.getenv("ASK_CONCURRENCY", 2))
+ASK_QUEUE_SIZE = int(os.getenv("ASK_QUEUE_SIZE", 16))
+ASK_QUEUE_TIMEOUT = float(os.getenv("ASK_QUEUE_TIMEOUT", 60))
+ASK_PER_CLIENT = int(os.getenv("ASK_PER_CLIENT", 2))
+
 app = Flask(__name__)
+jobs = JobRunner()
+
+# /ask: identical questions share one answer, at most ASK_CONCURRENCY are
+# answered at once and ASK_QUEUE_SIZE wait; anything beyond is refused
+ask_flight = SingleFlight()
+ask_limit = ConcurrencyLimit(ASK_CONCURRENCY, ASK_QUEUE_SIZE, ASK_QUEUE_TIMEOUT)
+client_limit = KeyedLimit(ASK_PER_CLIENT)
+_brain = None
+_brain_lock = threading.Lock()
+
+
+def get_brain():
+    """The AIBrain shared by all requests, created on first use."""
+    global _brain
+    with _brain_lock:
+        if _brain is None:
+            from backend.features.ai_brain import AIBrain
+            _brain = AIBrain()
+        return _brain
+
+
+_FLAGS = {"1": True, "true": True, "yes": True, "on": True,
+          "0": False, "false": False, "no": False, "off": False}
+
+
+def _flag(value, default: bool):
+    """A JSON boolean or a 1/0, true/false, yes/no, on/off string; None if invalid."""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return _FLAGS.get(value.strip().lower())
+    return None
+
+
+def _question_key(question: str) -> str:
+    return re.sub(r"[\s?!.]+$", "", " ".join(question.lower().split()))
+
+
+def _submit(symbols):
+    try:
+        job = jobs.submit(symbols)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({"error": f"busy: {e}"}), 503
+    return jsonify(job), 202, {"Location": f"/jobs/{job['id']}"}
 
 
 @app.route("/trade")
 def trade():
-    symbol = request.args.get("symbol", "AAPL")
-    run_autotrader([symbol])
-    return jsonify({"status": "ok"})
+    """Queue one cycle for ``symbol`` (or comma-separated ``symbols``)."""
+    symbols = request.args.get("symbols") or request.args.get("symbol", "AAPL")
+    return _submit(symbols.split(","))
+
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    symbols = body.get("symbols", [])
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    if not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols):
+        return jsonify({"error": "symbols must be a list of strings"}), 400
+    return _submit(symbols)
+
+
+@app.route("/jobs/<job_id>")
+def get_job(job_id):
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job)
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-sent events with the job each time its status changes."""
+    if jobs.store.get(job_id) is None:
+        return jsonify({"error": "unknown job"}), 404
+
+    def stream():
+        last = None
+        while True:
+            # the job may be running in another server process
+            job = jobs.store.get(job_id)
+            if job is None:
+                # pruned (finished long ago) while we were polling
+                yield f"event: gone\ndata: {json.dumps({'id': job_id})}\n\n"
+                return
+            if job["updated"] != last:
+                last = job["updated"]
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in DONE_STATES:
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/ask", methods=["GET", "POST"])
+def ask():
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    question = body.get("question", request.args.get("q"))
+    if not isinstance(question, str) or not question.strip():
+        return jsonify({"error": "question must be a non-empty string"}), 400
+    question = question.strip()
+    cache = _flag(body.get("cache", request.args.get("cache")), True)
+    if cache is None:
+        return jsonify({"error": "cache must be a boolean"}), 400
+    # questions without a conversation stand alone and can share answers
+    conversation = body.get("conversation", request.args.get("conversation"))
+    if conversation is not None and not isinstance(conversation, str):
+        return jsonify({"error": "conversation must be a string"}), 400
+    client = request.headers.get("X-Client-Id") or request.remote_addr
+    start = time.perf_counter()
+
+    def answer():
+        with ask_limit.slot():
+            return get_brain().ask(question, cache=cache, conversation=conversation)
+
+    try:
+        with client_limit.slot(client):
+            try:
+                key = (_question_key(question), cache, conversation)
+                text, shared = ask_flight.do(key, answer)
+            except Overloaded as e:
+                return jsonify({"error": f"busy: {e}"}), 503, {"Retry-After": "5"}
+    except Overloaded as e:
+        return jsonify({"error": f"too many requests: {e}"}), 429
+    return jsonify({
+        "question": question,
+        "answer": text,
+        "shared": shared,
+        "seconds": round(time.perf_counter() - start, 3),
+    })
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000)
+    app.run(host="0.0.0.0", port=8000, threaded=True)
@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class PersistentCache:
+    """Size-bounded LRU cache with a TTL and an optional SQLite backing file.
+
+    Values must be JSON serialisable. Entries older than ``ttl`` seconds are
+    treated as missing; once more than ``max_entries`` are stored the least
+    recently used ones are evicted. With a ``path`` every write is mirrored
+    to SQLite so the cache survives restarts (recency is restored from the
+    last write time)."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000,
+                 ttl: Optional[float] = 86400) -> None:
+        self.path = os.path.abspath(path) if path else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+                )
+            self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute("SELECT key, value, created FROM cache ORDER BY created").fetchall()
+        now = time.time()
+        expired = []
+        for key, value, created in rows:
+            if self._expired(created, now):
+                expired.append(key)
+                continue
+            self._entries[key] = (json.loads(value), created)
+        if expired:
+            self._delete_rows(expired)
+        self._evict()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _delete_rows(self, keys) -> None:
+        if self._conn is not None and keys:
+            with self._conn:
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+
+    def _evict(self) -> None:
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            evicted.append(key)
+        self._delete_rows(evicted)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self._expired(item[1], time.time()):
+                del self._entries[key]
+                self._delete_rows([key])
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            created = time.time()
+            self._entries[key] = (value, created)
+            self._entries.move_to_end(key)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), created),
+                    )
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
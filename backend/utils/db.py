@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import threading
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open ``path`` for use from several threads and processes.
+
+    The connection is in autocommit mode with WAL journaling; writes open
+    their own transaction through :meth:`Database._write`."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class Database:
+    """Base for stores kept in one SQLite file shared between processes."""
+
+    def __init__(self, path: str, schema: str) -> None:
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self.conn = connect(self.path)
+        self.conn.executescript(schema)
+
+    def _write(self, work):
+        """Run ``work(conn)`` in a transaction other processes wait for."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
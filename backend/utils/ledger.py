@@ -0,0 +1,334 @@
+"""Append-only trade ledger in SQLite.
+
+Every fill is one row in ``fills``. The same transaction updates the
+running position and realized P/L of the ticker in ``ticker_totals`` and of
+the (UTC) day in ``daily_totals``, so reports read one row per ticker and
+"P/L between two dates" reads one row per day and ticker instead of the
+whole history.
+
+Realized P/L uses the average cost of the open position: a sell closes up
+to the held quantity, and each sell that closes shares counts as one trade.
+
+Submitted orders are kept in ``orders`` by ``client_order_id`` until the
+broker reports them final. :meth:`TradeLedger.update_order` books whatever
+was filled since the last report as one fill, so late and partial fills
+are booked exactly once.
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .db import Database
+
+TRADE_LEDGER_PATH = os.getenv(
+    "TRADE_LEDGER_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'trades.db'),
+)
+MEMORY_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'memory.json')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL NOT NULL,
+    pnl REAL,
+    order_id TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS fills_ts ON fills (ts);
+CREATE INDEX IF NOT EXISTS fills_ticker_ts ON fills (ticker, ts);
+CREATE TABLE IF NOT EXISTS ticker_totals (
+    ticker TEXT PRIMARY KEY,
+    position REAL NOT NULL DEFAULT 0,
+    avg_cost REAL NOT NULL DEFAULT 0,
+    total_profit REAL NOT NULL DEFAULT 0,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    last_ts REAL
+);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    pnl REAL NOT NULL DEFAULT 0,
+    trades INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    fills INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, ticker)
+);
+CREATE TABLE IF NOT EXISTS orders (
+    client_order_id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    submitted REAL NOT NULL,
+    status TEXT,
+    filled_qty REAL NOT NULL DEFAULT 0,
+    filled_avg_price REAL,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS orders_open ON orders (done, submitted);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_ORDER_COLUMNS = ("client_order_id", "ticker", "side", "qty", "submitted", "status",
+                  "filled_qty", "filled_avg_price")
+# order states after which the filled quantity no longer changes;
+# "not_found" marks orders the broker does not know
+FINAL_ORDER_STATUSES = ("filled", "canceled", "expired", "rejected", "done_for_day", "not_found")
+
+_TOTAL_COLUMNS = ("ticker", "position", "avg_cost", "total_profit", "trade_count", "wins", "losses", "last_ts")
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).date().isoformat()
+
+
+def _as_day(value) -> str:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class TradeLedger(Database):
+    """Fills plus per-ticker and per-day aggregates.
+
+    On first use the legacy per-ticker totals and win/loss stats from
+    ``memory.json`` are imported, so reports keep their history."""
+
+    def __init__(self, path: str = TRADE_LEDGER_PATH, memory_path: Optional[str] = MEMORY_PATH) -> None:
+        super().__init__(path, _SCHEMA)
+        self.memory_path = memory_path
+        self._migrate()
+
+    def _migrate(self) -> None:
+        if not self.memory_path or not os.path.exists(self.memory_path):
+            return
+
+        def work(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(time.time()),))
+            if conn.execute("SELECT 1 FROM ticker_totals").fetchone():
+                return
+            try:
+                with open(self.memory_path, 'r') as f:
+                    memory = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[Ledger Error] {e}")
+                return
+            rows = [
+                (ticker, float(info.get("total_profit", 0)), int(info.get("trade_count", 0)))
+                for ticker, info in memory.items()
+                if isinstance(info, dict) and "total_profit" in info
+            ]
+            conn.executemany(
+                "INSERT INTO ticker_totals (ticker, total_profit, trade_count) VALUES (?, ?, ?)", rows
+            )
+            # legacy stats were only kept overall, not per ticker
+            stats = memory.get("stats") or {}
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("legacy_wins", str(int(stats.get("wins", 0)))),
+                 ("legacy_losses", str(int(stats.get("losses", 0))))],
+            )
+
+        self._write(work)
+
+    # writing
+
+    def record_fill(self, ticker: str, side: str, qty: float, price: float,
+                    ts: Optional[float] = None, order_id: Optional[str] = None) -> Optional[float]:
+        """Append a fill and return the P/L it realized (None for buys).
+
+        A fill whose ``order_id`` is already recorded is ignored."""
+        ts = time.time() if ts is None else ts
+        return self._write(lambda conn: self._apply_fill(conn, ticker, side, qty, price, ts, order_id))
+
+    @staticmethod
+    def _apply_fill(conn, ticker: str, side: str, qty: float, price: float,
+                    ts: float, order_id: Optional[str]) -> Optional[float]:
+        day = _day(ts)
+        if order_id is not None and conn.execute(
+            "SELECT 1 FROM fills WHERE order_id = ?", (order_id,)
+        ).fetchone():
+            return None
+        row = conn.execute(
+            "SELECT position, avg_cost FROM ticker_totals WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        position, avg_cost = row if row else (0.0, 0.0)
+        pnl = None
+        if side == "buy":
+            avg_cost = (position * avg_cost + qty * price) / (position + qty)
+            position += qty
+        else:
+            closed = min(qty, position)
+            if closed > 0:
+                pnl = (price - avg_cost) * closed
+            position -= closed
+            if position <= 0:
+                position, avg_cost = 0.0, 0.0
+        trade = int(pnl is not None)
+        win = int(pnl is not None and pnl > 0)
+        loss = trade - win
+        conn.execute(
+            "INSERT INTO fills (ts, day, ticker, side, qty, price, pnl, order_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts, day, ticker, side, qty, price, pnl, order_id),
+        )
+        conn.execute(
+            "INSERT INTO ticker_totals (ticker, position, avg_cost, total_profit, trade_count, wins, losses, last_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (ticker) DO UPDATE SET position = excluded.position, "
+            "avg_cost = excluded.avg_cost, total_profit = total_profit + excluded.total_profit, "
+            "trade_count = trade_count + excluded.trade_count, wins = wins + excluded.wins, "
+            "losses = losses + excluded.losses, last_ts = MAX(COALESCE(last_ts, 0), excluded.last_ts)",
+            (ticker, position, avg_cost, pnl or 0.0, trade, win, loss, ts),
+        )
+        conn.execute(
+            "INSERT INTO daily_totals (day, ticker, pnl, trades, wins, losses, fills) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT (day, ticker) DO UPDATE SET pnl = pnl + excluded.pnl, "
+            "trades = trades + excluded.trades, wins = wins + excluded.wins, "
+            "losses = losses + excluded.losses, fills = fills + 1",
+            (day, ticker, pnl or 0.0, trade, win, loss),
+        )
+        return pnl
+
+    def add_order(self, client_order_id: str, ticker: str, side: str, qty: float,
+                  ts: Optional[float] = None) -> None:
+        """Track a submitted order until the broker reports it final."""
+        self._write(lambda conn: conn.execute(
+            "INSERT OR IGNORE INTO orders (client_order_id, ticker, side, qty, submitted) VALUES (?, ?, ?, ?, ?)",
+            (client_order_id, ticker, side, qty, time.time() if ts is None else ts),
+        ))
+
+    def update_order(self, client_order_id: str, status: Optional[str], filled_qty: float,
+                     filled_avg_price: Optional[float], ts: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Apply the broker's report for an order.
+
+        The quantity filled since the previous report is booked as one fill
+        at the price that makes the booked average equal the broker's.
+        Returns that fill (ticker, side, qty, price, pnl) or None."""
+        ts = time.time() if ts is None else ts
+
+        def work(conn):
+            row = conn.execute(
+                "SELECT ticker, side, filled_qty, filled_avg_price, done FROM orders WHERE client_order_id = ?",
+                (client_order_id,),
+            ).fetchone()
+            if row is None or row[4]:
+                return None
+            ticker, side, booked_qty, booked_price = row[:4]
+            fill = None
+            if filled_qty > booked_qty and filled_avg_price is not None:
+                qty = filled_qty - booked_qty
+                price = (filled_qty * filled_avg_price - booked_qty * (booked_price or 0.0)) / qty
+                pnl = self._apply_fill(conn, ticker, side, qty, price, ts, f"{client_order_id}:{filled_qty:g}")
+                fill = {"ticker": ticker, "side": side, "qty": qty, "price": price, "pnl": pnl}
+                booked_qty, booked_price = filled_qty, filled_avg_price
+            conn.execute(
+                "UPDATE orders SET status = ?, filled_qty = ?, filled_avg_price = ?, done = ? "
+                "WHERE client_order_id = ?",
+                (status, booked_qty, booked_price, int(status in FINAL_ORDER_STATUSES), client_order_id),
+            )
+            return fill
+
+        return self._write(work)
+
+    def open_orders(self) -> List[Dict[str, Any]]:
+        """Orders not yet final, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(_ORDER_COLUMNS)} FROM orders WHERE done = 0 ORDER BY submitted"
+            ).fetchall()
+        return [dict(zip(_ORDER_COLUMNS, row)) for row in rows]
+
+    # reading
+
+    def version(self) -> int:
+        """Changes whenever another connection commits to the ledger."""
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def totals(self) -> Dict[str, Dict[str, Any]]:
+        """Per-ticker position and realized P/L, one row per ticker."""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(_TOTAL_COLUMNS)} FROM ticker_totals ORDER BY ticker"
+            ).fetchall()
+        return {row[0]: dict(zip(_TOTAL_COLUMNS[1:], row[1:])) for row in rows}
+
+    def stats(self) -> Dict[str, int]:
+        """Overall wins and losses, including those imported from memory.json."""
+        with self._lock:
+            wins, losses = self.conn.execute(
+                "SELECT COALESCE(SUM(wins), 0), COALESCE(SUM(losses), 0) FROM ticker_totals"
+            ).fetchone()
+            legacy = dict(self.conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('legacy_wins', 'legacy_losses')"
+            ).fetchall())
+        return {
+            "wins": wins + int(legacy.get("legacy_wins", 0)),
+            "losses": losses + int(legacy.get("legacy_losses", 0)),
+        }
+
+    def daily(self, start, end, ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day totals for the days from ``start`` to ``end`` inclusive."""
+        query = ("SELECT day, SUM(pnl), SUM(trades), SUM(wins), SUM(losses), SUM(fills) "
+                 "FROM daily_totals WHERE day BETWEEN ? AND ?")
+        params = [_as_day(start), _as_day(end)]
+        if ticker is not None:
+            query += " AND ticker = ?"
+            params.append(ticker)
+        with self._lock:
+            rows = self.conn.execute(query + " GROUP BY day ORDER BY day", params).fetchall()
+        columns = ("day", "pnl", "trades", "wins", "losses", "fills")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def pnl_between(self, start, end, ticker: Optional[str] = None) -> Dict[str, Any]:
+        """Realized P/L, trades, wins and losses from ``start`` to ``end``
+        (dates, datetimes or ISO day strings, both days included)."""
+        query = ("SELECT COALESCE(SUM(pnl), 0), COALESCE(SUM(trades), 0), "
+                 "COALESCE(SUM(wins), 0), COALESCE(SUM(losses), 0) "
+                 "FROM daily_totals WHERE day BETWEEN ? AND ?")
+        params = [_as_day(start), _as_day(end)]
+        if ticker is not None:
+            query += " AND ticker = ?"
+            params.append(ticker)
+        with self._lock:
+            pnl, trades, wins, losses = self.conn.execute(query, params).fetchone()
+        return {"pnl": pnl, "trades": trades, "wins": wins, "losses": losses}
+
+    def fills(self, start: Optional[float] = None, end: Optional[float] = None,
+              ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Fills with ``start <= ts < end`` (epoch seconds), oldest first."""
+        clauses, params = [], []
+        if ticker is not None:
+            clauses.append("ticker = ?")
+            params.append(ticker)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ("ts", "ticker", "side", "qty", "price", "pnl", "order_id")
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(columns)} FROM fills{where} ORDER BY ts, id", params
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
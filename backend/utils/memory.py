@@ -1,46 +1,274 @@
+"""Trading and assistant state shared through ``memory.json``.
 
+Several processes (the server, the CLI, ``autotrain.py``, the dashboards)
+keep their own :class:`MemoryManager` on the same file, so a write never
+replaces the file with this process's copy. :meth:`MemoryManager.flush`
+takes an advisory lock, re-reads the file and merges:
+
+* cooldowns keep the latest time per ticker,
+* ``record_trade`` profit, trade counts and win/loss stats are applied as
+  increments on top of what other processes recorded,
+* items added with :meth:`MemoryManager.append` (the assistant's
+  ``knowledge`` and ``history``) are appended to the stored list, which is
+  then cut to the list's length bound,
+* any other top-level key this process changed replaces the stored one.
+
+The merged state is written to a temporary file and renamed over
+``memory.json``, so readers never see a torn file. ``save()`` only marks the
+state dirty; the write happens ``MEMORY_FLUSH_DELAY`` seconds later, on
+``flush()`` or at exit.
+"""
+
+import atexit
+import copy
 import json
-import time
 import os
+import tempfile
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes stay atomic
+    fcntl = None
+
+MEMORY_FLUSH_DELAY = float(os.getenv("MEMORY_FLUSH_DELAY", 1))
+MEMORY_REFRESH_INTERVAL = float(os.getenv("MEMORY_REFRESH_INTERVAL", 1))
+
+_MISSING = object()
+# one exit hook for all managers, without keeping them alive
+_instances: "weakref.WeakSet[MemoryManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    for manager in list(_instances):
+        manager.flush()
+
 
 class MemoryManager:
-    def __init__(self, path=None):
+    def __init__(self, path=None, autosave=True):
         if path is None:
             path = os.path.join(os.path.dirname(__file__), '..', 'data', 'memory.json')
         self.path = path
+        # with autosave off, changes are written only by an explicit save()
+        self.autosave = autosave
         self.memory = {}
+        # guards self.memory; callers that edit it directly should hold it too
+        self.lock = threading.RLock()
+        self._base = {}
+        self._deltas = {}
+        self._appends = {}
+        self._limits = {}
+        self._replace = False
+        self._dirty = False
+        self._timer = None
+        self._seen = None
+        self._checked = 0.0
         self.load()
+        _instances.add(self)
+
+    # file access
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _locked(self):
+        """Exclusive advisory lock on ``<path>.lock``; a no-op without fcntl."""
+        lock = open(self.path + '.lock', 'a')
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.memory-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # merging
+
+    def _merge(self, disk):
+        """Combine the stored state with the changes made in this process."""
+        merged = dict(disk)
+        for key in set(self.memory) | set(self._base):
+            if key == "cooldowns" or key in self._deltas or key in self._appends:
+                continue
+            value = self.memory.get(key, _MISSING)
+            if value is _MISSING:
+                merged.pop(key, None)
+            elif value != self._base.get(key, _MISSING):
+                merged[key] = copy.deepcopy(value)
+        cooldowns = dict(disk.get("cooldowns", {}))
+        for ticker, when in self.memory.get("cooldowns", {}).items():
+            cooldowns[ticker] = max(when, cooldowns.get(ticker, 0))
+        if cooldowns:
+            merged["cooldowns"] = cooldowns
+        for key, delta in self._deltas.items():
+            entry = dict(disk.get(key) or {})
+            for field, change in delta.items():
+                entry[field] = entry.get(field, 0) + change
+            merged[key] = entry
+        for key, items in self._appends.items():
+            stored = disk.get(key)
+            combined = (list(stored) if isinstance(stored, list) else []) + copy.deepcopy(items)
+            limit = self._limits.get(key)
+            merged[key] = combined[-limit:] if limit else combined
+        return merged
+
+    def _sync(self, disk, merged):
+        self.memory.clear()
+        self.memory.update(merged)
+        self._base = copy.deepcopy(disk)
 
     def load(self):
-        if os.path.exists(self.path):
-            with open(self.path, 'r') as f:
-                self.memory = json.load(f)
+        with self.lock:
+            data = self._read()
+            self.memory.clear()
+            self.memory.update(data)
+            self._base = copy.deepcopy(data)
+            self._deltas = {}
+            self._appends = {}
+            self._replace = False
+            self._seen = self._stat()
+
+    def refresh(self):
+        """Pick up changes other processes wrote, keeping unsaved local ones."""
+        with self.lock:
+            stamp = self._stat()
+            if stamp == self._seen:
+                return
+            disk = self._read()
+            if self._replace:
+                self._seen = stamp
+                return
+            self._sync(disk, self._merge(disk))
+            self._seen = stamp
+
+    def reset(self):
+        """Start from an empty state; the next flush overwrites the file."""
+        with self.lock:
+            self.memory.clear()
+            self._base = {}
+            self._deltas = {}
+            self._appends = {}
+            self._replace = True
 
     def save(self):
-        with open(self.path, 'w') as f:
-            json.dump(self.memory, f, indent=4)
+        """Mark the state dirty and schedule a debounced flush."""
+        with self.lock:
+            self._dirty = True
+            if MEMORY_FLUSH_DELAY <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(MEMORY_FLUSH_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
 
-    def should_trade(self, ticker: str, cooldown: int) -> bool:
-        """Return True if the ticker is not in cooldown period."""
-        cooldowns = self.memory.setdefault("cooldowns", {})
-        last = cooldowns.get(ticker, 0)
-        return time.time() - last > cooldown
+    def flush(self):
+        """Merge and write pending changes now."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                with self._locked():
+                    if self._replace:
+                        disk = merged = copy.deepcopy(self.memory)
+                    else:
+                        disk = self._read()
+                        merged = self._merge(disk)
+                    self._write(merged)
+                    self._seen = self._stat()
+            except (OSError, ValueError) as e:
+                print(f"[Memory Error] {e}")
+                return
+            self._sync(merged, merged)
+            self._deltas = {}
+            self._appends = {}
+            self._replace = False
+            self._dirty = False
 
-    def set_cooldown(self, ticker: str) -> None:
-        self.memory.setdefault("cooldowns", {})[ticker] = time.time()
-        self.save()
+    def append(self, key: str, item, maxlen: int | None = None) -> None:
+        """Append ``item`` to the list ``key``, keeping the last ``maxlen``.
+
+        Unlike replacing the list, appends from other processes survive."""
+        with self.lock:
+            items = self.memory.get(key)
+            if not isinstance(items, list):
+                items = self.memory[key] = []
+            items.append(item)
+            if maxlen:
+                del items[:-maxlen]
+                self._limits[key] = maxlen
+            self._appends.setdefault(key, []).append(copy.deepcopy(item))
+        if self.autosave:
+            self.save()
+
+    # trading state
+
+    def should_trade(self, ticker: str, cooldown: int, now: float | None = None) -> bool:
+        """Return True if the ticker is not in cooldown period.
+
+        ``now`` (epoch seconds) defaults to the current time; backtests pass
+        the bar time instead."""
+        if self.autosave and time.monotonic() - self._checked > MEMORY_REFRESH_INTERVAL:
+            # another process may have traded this ticker
+            self._checked = time.monotonic()
+            try:
+                self.refresh()
+            except (OSError, ValueError) as e:
+                print(f"[Memory Error] {e}")
+        last = self.memory.get("cooldowns", {}).get(ticker, 0)
+        return (time.time() if now is None else now) - last > cooldown
+
+    def set_cooldown(self, ticker: str, now: float | None = None) -> None:
+        with self.lock:
+            self.memory.setdefault("cooldowns", {})[ticker] = time.time() if now is None else now
+        if self.autosave:
+            self.save()
+
+    def _add(self, key: str, **changes) -> None:
+        delta = self._deltas.setdefault(key, {})
+        for field, change in changes.items():
+            delta[field] = delta.get(field, 0) + change
 
     def record_trade(self, ticker: str, buy_price: float, sell_price: float, quantity: float) -> float:
         """Update profit/loss for a completed trade and persist it."""
         pnl = (sell_price - buy_price) * quantity
-        data = self.memory.setdefault(ticker, {"total_profit": 0.0, "trade_count": 0})
-        data["total_profit"] += pnl
-        data["trade_count"] += 1
-        if pnl > 0:
-            stats = self.memory.setdefault("stats", {"wins": 0, "losses": 0})
-            stats["wins"] += 1
-        else:
+        with self.lock:
+            data = self.memory.setdefault(ticker, {"total_profit": 0.0, "trade_count": 0})
+            data["total_profit"] += pnl
+            data["trade_count"] += 1
             stats = self.memory.setdefault("stats", {"wins": 0, "losses": 0})
-            stats["losses"] += 1
-        self.save()
+            if pnl > 0:
+                stats["wins"] += 1
+            else:
+                stats["losses"] += 1
+            self._add(ticker, total_profit=pnl, trade_count=1)
+            self._add("stats", wins=int(pnl > 0), losses=int(pnl <= 0))
+        if self.autosave:
+            self.save()
         return pnl
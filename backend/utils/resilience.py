@@ -0,0 +1,255 @@
+import bisect
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class CircuitBreaker:
+    """Skip a dependency that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    :meth:`allow` returns False for ``cooldown`` seconds. After that one
+    trial call is let through per cooldown window (half-open) until a
+    success closes the breaker again."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open":
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_LATENCY_BUCKETS = [0.05 * 1.5 ** i for i in range(16)]  # 50ms .. ~22s
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds) with quantile estimates."""
+
+    def __init__(self, buckets: Optional[List[float]] = None) -> None:
+        self.buckets = list(buckets or _LATENCY_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the upper bound of the bucket holding quantile ``q``."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+        }
+
+
+class TokenBucket:
+    """Token bucket rate limiter: ``rate`` tokens per second, bursts up to
+    ``capacity``. A non-positive ``rate`` disables limiting."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def penalize(self, seconds: float) -> None:
+        """Hold every caller back for ``seconds``, e.g. after an HTTP 429.
+
+        The bucket is emptied and refills only once the pause is over."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` if available and return 0, else return the wait time."""
+        with self._lock:
+            blocked = self.blocked_until - time.monotonic()
+            if blocked > 0:
+                return blocked
+            if self.rate <= 0:
+                return 0.0
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until ``tokens`` are available; False if ``timeout`` expires."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None) -> None:
+        """Change the rate (and capacity) of a bucket other code already holds."""
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = capacity if capacity is not None else max(1.0, rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+
+class SingleFlight:
+    """Run one call per key at a time and share its result.
+
+    Callers that arrive while a call for the same key is running wait for
+    it and get its result (or exception) instead of starting their own."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0
+        self._running: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``fn()``, or the result of the running call for ``key``,
+        and whether the result was shared."""
+        with self._lock:
+            future = self._running.get(key)
+            leader = future is None
+            if leader:
+                future = self._running[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._running[key]
+        return future.result(), False
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing more work than a limiter allows."""
+
+
+class ConcurrencyLimit:
+    """At most ``limit`` holders at once and ``queue_size`` waiting.
+
+    A caller that finds the queue full, or waits longer than ``timeout``,
+    gets :class:`Overloaded` so load is shed instead of piling up."""
+
+    def __init__(self, limit: int, queue_size: int = 0, timeout: Optional[float] = None) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue_size:
+                    self.rejected += 1
+                    raise Overloaded("queue full")
+                self.waiting += 1
+                try:
+                    ready = self._cond.wait_for(lambda: self.active < self.limit, self.timeout)
+                finally:
+                    self.waiting -= 1
+                if not ready:
+                    self.rejected += 1
+                    raise Overloaded("timed out waiting")
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+
+class KeyedLimit:
+    """At most ``limit`` concurrent holders per key (e.g. per client)."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.rejected = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            count = self._counts.get(key, 0)
+            if count >= self.limit:
+                self.rejected += 1
+                raise Overloaded(f"more than {self.limit} requests in progress")
+            self._counts[key] = count + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._counts[key] -= 1
+                if not self._counts[key]:
+                    del self._counts[key]
@@ -0,0 +1,44 @@
+import argparse
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from backend.features.autotrade import STRATEGY, SIGNAL_MATRICES
+from backend.features.backtest import (
+    BACKTEST_BARS_PATH,
+    BACKTEST_CASH,
+    BACKTEST_RETENTION_DAYS,
+    format_report,
+    load_prices,
+    run_backtest,
+)
+from backend.features.bar_store import BarStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay stored hourly bars through the autotrader.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--days", type=int, default=BACKTEST_RETENTION_DAYS, help="history to replay")
+    parser.add_argument("--strategy", choices=sorted(SIGNAL_MATRICES), default=STRATEGY)
+    parser.add_argument("--cash", type=float, default=BACKTEST_CASH, help="starting cash")
+    parser.add_argument("--bars", default=BACKTEST_BARS_PATH, help="bar store directory")
+    parser.add_argument("--download", action="store_true",
+                        help="fetch missing bars from Alpaca into the bar store first")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    store = BarStore(args.bars, retention_days=BACKTEST_RETENTION_DAYS)
+    if args.download:
+        from backend.features.autotrade import aip
+
+        store.update(aip, symbols)
+    start = datetime.now(timezone.utc) - pd.Timedelta(days=args.days)
+    prices = load_prices(store, symbols, start)
+    if prices.empty:
+        print("No stored bars; run with --download first.")
+        return
+    print(format_report(run_backtest(prices, args.strategy, args.cash)))
+
+
+if __name__ == "__main__":
+    main()
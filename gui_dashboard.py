@@ -1,18 +1,12 @@
 import tkinter as tk
-from backend.utils.memory import MemoryManager
+from backend.features.dashboard import TradingSnapshot
 
 
-def build_gui():
-    mem = MemoryManager()
-    root = tk.Tk()
-    root.title("JARVIS Dashboard")
-    text = tk.Text(root, width=60, height=20)
-    text.pack()
-    for ticker, info in mem.memory.items():
-        if ticker in ("stats", "cooldowns"):
-            continue
+def render(text, data):
+    text.delete("1.0", tk.END)
+    for ticker, info in data["totals"].items():
         text.insert(tk.END, f"{ticker}: {info['total_profit']:.2f} P/L\n")
-    stats = mem.memory.get("stats", {})
+    stats = data["stats"]
     if stats:
         wins = stats.get('wins',0)
         losses = stats.get('losses',0)
@@ -20,7 +14,27 @@ def build_gui():
         if total:
             win_rate = wins/total*100
             text.insert(tk.END, f"Win rate: {win_rate:.2f}%\n")
+
+
+def build_gui():
+    snapshot = TradingSnapshot()
+    root = tk.Tk()
+    root.title("JARVIS Dashboard")
+    text = tk.Text(root, width=60, height=20)
+    text.pack()
+    shown = {"version": None}
+
+    def update():
+        # the watcher thread refreshes the snapshot; Tk is only touched here
+        if snapshot.version != shown["version"]:
+            shown["version"] = snapshot.version
+            render(text, snapshot.data)
+        root.after(250, update)
+
+    snapshot.watch()
+    update()
     root.mainloop()
+    snapshot.close()
 
 
 if __name__ == "__main__":
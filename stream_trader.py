@@ -0,0 +1,38 @@
+import argparse
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from backend.features.autotrade import STRATEGY, SIGNAL_STREAMS
+from backend.features.backtest import BACKTEST_BARS_PATH
+from backend.features.bar_store import BarStore
+from backend.features.streaming import AlpacaStreamSource, ReplaySource, StreamTrader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trade on a live stream of bars, or replay stored ones.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--strategy", choices=sorted(SIGNAL_STREAMS), default=STRATEGY)
+    parser.add_argument("--replay", type=int, metavar="DAYS",
+                        help="replay this many days of stored bars and print the decisions instead of trading")
+    parser.add_argument("--bars", default=BACKTEST_BARS_PATH, help="bar store used by --replay")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed-up (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.replay:
+        store = BarStore(args.bars, retention_days=args.replay)
+        start = datetime.now(timezone.utc) - pd.Timedelta(days=args.replay)
+        source = ReplaySource({sym: store.closes(sym, start) for sym in symbols}, speed=args.speed)
+        trader = StreamTrader(
+            source, symbols, args.strategy,
+            execute=lambda sym, action, price: print(f"{action} {sym} @ {price}"),
+        )
+    else:
+        trader = StreamTrader(AlpacaStreamSource(symbols), symbols, args.strategy)
+        trader.warm_up_from_store()
+    print(trader.run())
+
+
+if __name__ == "__main__":
+    main()
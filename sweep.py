@@ -0,0 +1,51 @@
+import argparse
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from backend.features.backtest import (
+    BACKTEST_BARS_PATH,
+    BACKTEST_CASH,
+    BACKTEST_RETENTION_DAYS,
+    load_prices,
+)
+from backend.features.bar_store import BarStore
+from backend.features.sweep import DEFAULT_GRID, sweep
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest a grid of strategy parameters on stored bars.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--days", type=int, default=BACKTEST_RETENTION_DAYS, help="history to replay")
+    parser.add_argument("--bars", default=BACKTEST_BARS_PATH, help="bar store directory")
+    parser.add_argument("--cash", type=float, default=BACKTEST_CASH, help="starting cash")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--strategies", nargs="+", choices=sorted(DEFAULT_GRID), default=sorted(DEFAULT_GRID))
+    for strategy, axes in DEFAULT_GRID.items():
+        for name, values in axes.items():
+            kind = float if strategy == "RSI" and name in ("lower", "upper") else int
+            parser.add_argument(f"--{strategy.lower()}-{name}", type=kind, nargs="+", default=values)
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    parser.add_argument("--csv", help="also write the full table to this file")
+    args = parser.parse_args()
+
+    grid = {
+        strategy: {name: getattr(args, f"{strategy.lower()}_{name}") for name in axes}
+        for strategy, axes in DEFAULT_GRID.items()
+        if strategy in args.strategies
+    }
+    store = BarStore(args.bars, retention_days=BACKTEST_RETENTION_DAYS)
+    start = datetime.now(timezone.utc) - pd.Timedelta(days=args.days)
+    prices = load_prices(store, [s.upper() for s in args.symbols], start)
+    if prices.empty:
+        print("No stored bars; fetch them with backtest.py --download first.")
+        return
+    table = sweep(prices, grid, workers=args.workers, cash=args.cash)
+    print(table.head(args.top).to_string(float_format=lambda v: f"{v:.2f}"))
+    if args.csv:
+        table.to_csv(args.csv)
+
+
+if __name__ == "__main__":
+    main()
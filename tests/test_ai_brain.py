@@ -0,0 +1,147 @@
+from collections import deque
+
+import pytest
+
+from backend.features import ai_brain
+from backend.utils.memory import MemoryManager
+
+
+class _Knowledge:
+    def __init__(self):
+        self.stored = []
+
+    def add_facts(self, *args, **kwargs):
+        return False
+
+    def get_facts(self, *args):
+        return []
+
+    def find_similar_question(self, *args):
+        return None
+
+    def add_qa(self, question, answer, **kwargs):
+        self.stored.append(("add_qa", question, answer))
+        return True
+
+    def update_answer(self, question, answer):
+        self.stored.append(("update_answer", question, answer))
+        return True
+
+
+@pytest.fixture
+def brain(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_brain, "search_with_source", lambda prompt: ("", None))
+    brain = object.__new__(ai_brain.AIBrain)
+    brain.model = "mistral"
+    brain.memory = MemoryManager(str(tmp_path / "memory.json"), autosave=False)
+    brain.knowledge = _Knowledge()
+    brain.history = deque(maxlen=5)
+    brain.contexts = {}
+    brain.last_timing = {}
+    brain._lock = brain.memory.lock
+    return brain
+
+
+def _stream(chunks, error=None):
+    def generate_stream(model, prompt, **kwargs):
+        yield from chunks
+        if error is not None:
+            raise error
+    return generate_stream
+
+
+def test_ask_stream_complete(brain, monkeypatch):
+    monkeypatch.setattr(ai_brain.ollama, "generate_stream", _stream(["Paris is ", "the capital"]))
+    text = "".join(brain.ask_stream("What is the capital of France?"))
+    assert text.startswith("Paris is the capital")
+    assert brain.history[-1]["answer"] == "Paris is the capital"
+    assert brain.knowledge.stored
+
+
+def test_ask_stream_interrupted(brain, monkeypatch):
+    monkeypatch.setattr(ai_brain.ollama, "generate_stream",
+                        _stream(["Paris is "], ConnectionError("reset")))
+    chunks = list(brain.ask_stream("What is the capital of France?"))
+    assert chunks[0] == "Paris is "
+    assert chunks[-1].strip().startswith("[Answer interrupted")
+    assert brain.knowledge.stored == []
+    assert list(brain.history) == []
+    assert "knowledge" not in brain.memory.memory
+
+
+def test_ask_stream_closed_early(brain, monkeypatch):
+    monkeypatch.setattr(ai_brain.ollama, "generate_stream", _stream(["Paris ", "is ", "the capital"]))
+    stream = brain.ask_stream("What is the capital of France?")
+    assert next(stream) == "Paris "
+    assert len(brain.history) == 1
+    stream.close()
+    assert list(brain.history) == []
+    assert brain.knowledge.stored == []
+
+
+def _generate(contexts, answer="Paris is the capital of France"):
+    """ollama.generate stand-in; records the context it was given and
+    returns the next entry of ``contexts`` (None: a cache hit)."""
+    given = []
+
+    def generate(model, prompt, cache=True, context=None, on_context=None, **kwargs):
+        given.append((prompt, context))
+        new = contexts.pop(0)
+        if new is not None and on_context is not None:
+            on_context(new)
+        return answer
+    return generate, given
+
+
+def test_contexts_are_kept_per_conversation(brain, monkeypatch):
+    generate, given = _generate([[1, 2], [3, 4], [5, 6]])
+    monkeypatch.setattr(ai_brain.ollama, "generate", generate)
+    brain.ask("What is the capital of France?", conversation="a")
+    brain.ask("What is the capital of France?", conversation="b")
+    brain.ask("And of Italy?", conversation="a")
+    assert [context for _, context in given] == [None, None, [1, 2]]
+    assert brain.contexts["a"]["context"] == [5, 6]
+    assert brain.contexts["b"]["context"] == [3, 4]
+    assert "Prev Q" not in given[2][0]
+
+
+def test_turn_without_new_context_falls_back_to_text_history(brain, monkeypatch):
+    generate, given = _generate([[1, 2], None, [3, 4]])
+    monkeypatch.setattr(ai_brain.ollama, "generate", generate)
+    brain.ask("What is the capital of France?", conversation="a")
+    brain.ask("Is Paris in France?", conversation="a")  # cached: no new context
+    assert "a" not in brain.contexts
+    brain.ask("And of Italy?", conversation="a")
+    assert given[2][1] is None
+    assert "Prev Q: Is Paris in France?" in given[2][0]
+
+
+def test_standalone_questions_do_not_use_contexts(brain, monkeypatch):
+    generate, given = _generate([[3, 4]])
+    monkeypatch.setattr(ai_brain.ollama, "generate", generate)
+    brain.contexts["default"] = {"model": brain.model, "context": [1, 2]}
+    state = brain.prepare("What is the capital of France?")
+    brain.finish(state, brain.generate(state))
+    assert given[0][1] is None
+    assert brain.contexts == {"default": {"model": brain.model, "context": [1, 2]}}
+
+
+def test_answers_from_two_processes_are_both_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.utils.memory.MEMORY_FLUSH_DELAY", 0)
+    path = str(tmp_path / "memory.json")
+    first, second = MemoryManager(path), MemoryManager(path)
+    first.append("knowledge", {"prompt": "a"})
+    second.append("knowledge", {"prompt": "b"})
+    for i in range(7):
+        (first if i % 2 else second).append("history", {"prompt": str(i)}, maxlen=5)
+    stored = MemoryManager(path).memory
+    assert stored["knowledge"] == [{"prompt": "a"}, {"prompt": "b"}]
+    assert [h["prompt"] for h in stored["history"]] == ["2", "3", "4", "5", "6"]
+
+
+def test_memory_managers_are_not_kept_alive_until_exit(tmp_path):
+    import gc
+    import weakref
+    ref = weakref.ref(MemoryManager(str(tmp_path / "memory.json")))
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.features.backtest import run_backtest
+from backend.utils.memory import MemoryManager
+
+
+def _prices(unit: str) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    index = pd.date_range("2024-01-01", periods=3000, freq="h", tz="UTC").as_unit(unit)
+    walks = {sym: 12 + np.cumsum(rng.normal(0, 0.15, len(index))) for sym in ("AAA", "BBB", "CCC")}
+    return pd.DataFrame(walks, index=index).clip(lower=1)
+
+
+@pytest.mark.parametrize("strategy", ["RSI", "EMA", "MACD"])
+def test_fills_do_not_depend_on_index_unit(tmp_path, strategy):
+    reports = []
+    for unit in ("s", "ms", "us", "ns"):
+        memory = MemoryManager(str(tmp_path / f"{unit}.json"), autosave=False)
+        memory.reset()
+        report = run_backtest(_prices(unit), strategy, cash=10000, cooldown=3600, memory=memory)
+        reports.append({k: v for k, v in report.items() if k not in ("elapsed", "start", "end")})
+    assert reports[0]["fills"] > 0
+    assert all(r == reports[0] for r in reports[1:])
+
+
+class _NoNewBars:
+    def get_bars(self, symbols, timeframe, start, end):
+        return type("Bars", (), {"df": pd.DataFrame()})()
+
+
+def test_cli_download_keeps_history_beyond_days(tmp_path, monkeypatch, capsys):
+    import backtest
+    from backend.features import autotrade
+    from backend.features.backtest import BACKTEST_RETENTION_DAYS
+    from backend.features.bar_store import BarStore
+
+    store = BarStore(str(tmp_path))
+    end = pd.Timestamp.now(tz="UTC").floor("h")
+    index = pd.date_range(end=end, periods=24 * 60, freq="h")
+    store.append("AAA", pd.DataFrame({"close": np.linspace(10, 20, len(index))}, index=index))
+    store._set_coverage_start("AAA", end - pd.Timedelta(days=BACKTEST_RETENTION_DAYS))
+    monkeypatch.setattr(autotrade, "aip", _NoNewBars())
+    monkeypatch.setattr("sys.argv", ["backtest.py", "AAA", "--days", "5", "--bars", str(tmp_path), "--download"])
+    backtest.main()
+    assert "fills" in capsys.readouterr().out.lower()
+    assert store.first_timestamp("AAA") == index[0]
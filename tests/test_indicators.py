@@ -0,0 +1,129 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.features import strategies
+from backend.features.indicators import (
+    EMAState,
+    MACDState,
+    RSIState,
+    ewm_matrix,
+    rolling_mean_matrix,
+    rsi_matrix,
+)
+from backend.features.strategies import compute_rsi
+
+
+def _series_cases(length: int = 2000, seed: int = 7) -> dict:
+    """Price series that exercise the edge cases of the pandas versions."""
+    rng = np.random.default_rng(seed)
+    walk = 100 + np.cumsum(rng.normal(0, 1, length))
+    gaps = walk.copy()
+    gaps[rng.choice(length, length // 20, replace=False)] = np.nan
+    gaps[:5] = np.nan
+    flat = np.round(walk / 5) * 5  # long runs of unchanged prices
+    return {
+        "random walk": pd.Series(walk),
+        "with NaN": pd.Series(gaps),
+        "flat runs": pd.Series(flat),
+        "rising": pd.Series(np.arange(length, dtype=float)),
+        "constant": pd.Series(np.full(length, 42.0)),
+    }
+
+
+CASES = _series_cases()
+
+
+def _stream(factory, prices):
+    """Feed ``prices`` one by one, checkpointing through JSON halfway."""
+    state, out = factory(), []
+    for i, p in enumerate(prices):
+        if i == len(prices) // 2:
+            state = type(state).from_dict(json.loads(json.dumps(state.to_dict())))
+        out.append(state.update(float(p)))
+    return np.asarray(out, dtype=float)
+
+
+def _assert_close(expected, got):
+    np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_streaming_indicators_match_pandas(case):
+    prices = CASES[case]
+    ema12 = prices.ewm(span=12, adjust=False).mean()
+    ema26 = prices.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    signal = macd.ewm(span=9, adjust=False).mean()
+    macd_stream = _stream(MACDState, prices)
+    _assert_close(compute_rsi(prices).to_numpy(), _stream(RSIState, prices))
+    _assert_close(ema12.to_numpy(), _stream(lambda: EMAState(12), prices))
+    _assert_close(ema26.to_numpy(), _stream(lambda: EMAState(26), prices))
+    _assert_close(macd.to_numpy(), macd_stream[:, 0])
+    _assert_close(signal.to_numpy(), macd_stream[:, 1])
+
+
+def test_matrix_indicators_match_pandas_exactly():
+    frame = pd.DataFrame(CASES)
+    values = frame.to_numpy(dtype=float)
+    np.testing.assert_array_equal(rsi_matrix(values), frame.apply(compute_rsi).to_numpy())
+    np.testing.assert_array_equal(ewm_matrix(values, 12), frame.ewm(span=12, adjust=False).mean().to_numpy())
+    np.testing.assert_array_equal(rolling_mean_matrix(values, 14), frame.rolling(14).mean().to_numpy())
+
+
+def _reference_rsi(prices):
+    rsi = compute_rsi(prices).iloc[-1]
+    if rsi < 30:
+        return "buy"
+    if rsi > 70:
+        return "sell"
+    return "hold"
+
+
+def _cross(fast, slow):
+    if fast.iloc[-1] > slow.iloc[-1] and fast.iloc[-2] <= slow.iloc[-2]:
+        return "buy"
+    if fast.iloc[-1] < slow.iloc[-1] and fast.iloc[-2] >= slow.iloc[-2]:
+        return "sell"
+    return "hold"
+
+
+def _reference_ema(prices):
+    return _cross(prices.ewm(span=12, adjust=False).mean(), prices.ewm(span=26, adjust=False).mean())
+
+
+def _reference_macd(prices):
+    macd = prices.ewm(span=12, adjust=False).mean() - prices.ewm(span=26, adjust=False).mean()
+    return _cross(macd, macd.ewm(span=9, adjust=False).mean())
+
+
+# the pandas strategies as they were before the NumPy versions
+SIGNALS = {
+    "RSI": (_reference_rsi, strategies.RSISignal, strategies.rsi_strategy, strategies.rsi_signals),
+    "EMA": (_reference_ema, strategies.EMASignal, strategies.ema_strategy, strategies.ema_signals),
+    "MACD": (_reference_macd, strategies.MACDSignal, strategies.macd_strategy, strategies.macd_signals),
+}
+SIGNAL_CASES = _series_cases(150)
+
+
+@pytest.mark.parametrize("case", sorted(SIGNAL_CASES))
+@pytest.mark.parametrize("strategy", sorted(SIGNALS))
+def test_signals_match_pandas_on_every_prefix(strategy, case):
+    reference, factory, single, _ = SIGNALS[strategy]
+    prices = SIGNAL_CASES[case]
+    signal = factory()
+    streamed = [signal.update(float(p)) for p in prices][1:]
+    expected = [reference(prices.iloc[: i + 1]) for i in range(1, len(prices))]
+    assert streamed == expected
+    assert [single(prices.iloc[: i + 1]) for i in range(1, len(prices))] == expected
+
+
+@pytest.mark.parametrize("strategy", sorted(SIGNALS))
+def test_batch_signals_over_ragged_histories(strategy):
+    reference, _, _, batch = SIGNALS[strategy]
+    # each column is a different prefix
+    closes = {f"{name}:{n}": prices.iloc[:n] for name, prices in SIGNAL_CASES.items() for n in (2, 40, 150)}
+    got = batch(strategies.align_closes(closes))
+    assert got == {sym: reference(series) for sym, series in closes.items()}
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from backend.features import jobs
+from backend.features.jobs import JobRunner, JobStore
+
+
+def _wait_done(store, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_claims_outlive_the_ttl_while_queued_and_running(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    release = threading.Event()
+
+    def slow(symbols):
+        release.wait(5)
+        return {s: "hold" for s in symbols}
+
+    runner = JobRunner(JobStore(path), workers=1, run=slow, claim_ttl=0.3)
+    running = runner.submit(["AAPL"])
+    queued = runner.submit(["MSFT"])
+    time.sleep(1.0)  # several TTLs
+
+    # another server process sharing the database
+    other = JobStore(path)
+    skipped = other.create("other", ["AAPL", "MSFT", "NVDA"], ttl=0.3)
+    assert skipped == {"AAPL": running["id"], "MSFT": queued["id"]}
+
+    release.set()
+    assert _wait_done(runner.store, running["id"])["results"] == {"AAPL": "hold"}
+    assert _wait_done(runner.store, queued["id"])["results"] == {"MSFT": "hold"}
+    runner.close()
+    other.update("other", "done")
+    assert other.create("later", ["AAPL", "MSFT"]) == {}
+
+
+def test_claims_of_a_dead_process_expire(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    JobStore(path).create("crashed", ["AAPL"], ttl=0.1)
+    time.sleep(0.2)
+    assert JobStore(path).create("next", ["AAPL"]) == {}
+
+
+def test_failed_job_releases_its_claims(tmp_path):
+    def broken(symbols):
+        raise RuntimeError("broker down")
+
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.db")), run=broken)
+    job = _wait_done(runner.store, runner.submit(["aapl"])["id"])
+    assert job["status"] == "failed" and job["error"] == "broker down"
+    assert runner.store.create("again", ["AAPL"]) == {}
+    runner.close()
+
+
+def test_trade_symbols_holds_until_orders_are_recorded(monkeypatch):
+    calls = []
+
+    class Executor:
+        def wait(self, symbols, timeout=None):
+            calls.append(("wait", timeout))
+            return len(calls) > 3  # still in flight after several timeouts
+
+    class Memory:
+        def refresh(self):
+            calls.append("refresh")
+
+        def flush(self):
+            calls.append("flush")
+
+    monkeypatch.setattr(jobs, "executor", Executor())
+    monkeypatch.setattr(jobs, "memory", Memory())
+    monkeypatch.setattr(jobs, "run_autotrader", lambda symbols: {s: "buy" for s in symbols})
+    assert jobs.trade_symbols(["AAPL"]) == {"AAPL": "buy"}
+    assert calls == ["refresh"] + [("wait", jobs.JOB_CLAIM_TTL / 3)] * 3 + ["flush"]
@@ -0,0 +1,154 @@
+import json
+import random
+import time
+
+import pytest
+
+from backend.features import knowledge
+from backend.features.knowledge import KnowledgeBase
+from backend.features.knowledge_store import JSONStore, make_store
+from backend.features.maintenance import MaintenanceScheduler
+
+
+def _kb(tmp_path):
+    path = str(tmp_path / "knowledge.json")
+    return KnowledgeBase(path, store=make_store(path, "sqlite"))
+
+
+def test_json_is_migrated_only_once(tmp_path):
+    old = time.time() - 90 * 86400
+    (tmp_path / "knowledge.json").write_text(json.dumps({
+        "facts": [{"topic": "AAPL", "fact": "an old fact", "timestamp": old, "count": 1}],
+        "qa": [],
+    }))
+    kb = _kb(tmp_path)
+    assert len(kb.data["facts"]) == 1
+    kb.prune()
+    assert kb.data["facts"] == []
+    kb.store.conn.close()
+    assert _kb(tmp_path).data["facts"] == []
+
+
+class _Clock:
+    """Stand-in for the ``time`` module used by ``knowledge``."""
+
+    def __init__(self):
+        self.now = time.time()
+        self.perf_counter = time.perf_counter
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(knowledge, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def kb(tmp_path):
+    path = str(tmp_path / "knowledge.json")
+    return KnowledgeBase(path, store=JSONStore(path))
+
+
+def test_incremental_maintenance_checks_only_changes(kb, clock):
+    kb.add_facts("markets", [f"fact number {i} about markets" for i in range(50)])
+    assert kb.run_maintenance()["full"]
+    clock.now -= 40 * 86400
+    kb.add_facts("old", ["an old fact nobody repeats", "another old fact here"])
+    clock.now += 40 * 86400
+    kb.add_facts("junk", ["x"])
+    kb.add_facts("old", ["another old fact here"])  # updated: no longer old
+    stats = kb.run_maintenance()
+    assert not stats["full"]
+    assert stats["pruned"] == 1 and stats["low_quality"] == 1
+    assert stats["facts_checked"] < 10
+    assert [f["fact"] for f in kb.get_facts("old")] == ["another old fact here"]
+    assert kb.get_facts("junk") == []
+    assert len(kb.data["facts"]) == 51
+
+
+def test_age_heap_stays_bounded(kb):
+    for _ in range(500):
+        kb.add_facts("markets", ["the same fact again and again"])
+    assert len(kb._fact_ages) <= 2 * len(kb.data["facts"]) + 16
+    assert kb.run_maintenance()["pruned"] == 0
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_scheduler_runs_after_every_mutations(kb):
+    scheduler = MaintenanceScheduler(kb, interval=3600, every=3).start()
+    try:
+        assert _wait_for(lambda: scheduler.runs == 1)
+        kb.add_facts("a", ["first fact for the topic"])
+        kb.add_facts("b", ["second fact for the topic"])
+        time.sleep(0.1)
+        assert scheduler.runs == 1
+        kb.add_facts("c", ["third fact for the topic"])
+        assert _wait_for(lambda: scheduler.runs == 2)
+        assert scheduler.last_stats["facts_checked"] == 3
+    finally:
+        scheduler.stop()
+
+
+def test_scheduler_runs_every_interval(kb):
+    scheduler = MaintenanceScheduler(kb, interval=0.05, every=0).start()
+    try:
+        assert _wait_for(lambda: scheduler.runs >= 3)
+        assert not scheduler.last_stats["full"]
+    finally:
+        scheduler.stop()
+
+
+def _scan_facts(kb, topic):
+    """get_facts as the linear scan did it before the indexes."""
+    return [f for f in kb.data["facts"] if f.get("topic", "").lower() == topic.strip().lower()]
+
+
+def _scan_fact(kb, topic, fact):
+    key = (topic.strip().lower(), fact.strip().lower())
+    return next((f for f in kb.data["facts"]
+                 if (f.get("topic", "").strip().lower(), f.get("fact", "").strip().lower()) == key), None)
+
+
+def _scan_qa(kb, question):
+    normalized = question.strip().lower()
+    return next((q for q in kb.data["qa"] if q.get("question", "").strip().lower() == normalized), None)
+
+
+def test_indexes_match_linear_scan(kb, clock):
+    rng = random.Random(5)
+    topics = ["AAPL", "aapl", "Gold", "Interest Rates"]
+    facts = ["Shares rose today on earnings", "shares rose today on earnings",
+             "Prices fell after the report", "x", "Rates were held steady"]
+    questions = ["What is AAPL?", "what is aapl? ", "Why did gold rise?", "Is it raining?"]
+    for step in range(300):
+        op = rng.choice(["fact", "fact", "qa", "answer", "prune", "cleanup", "dedupe"])
+        if op == "fact":
+            kb.add_facts(rng.choice(topics), [rng.choice(facts)])
+        elif op == "qa":
+            kb.add_qa(rng.choice(questions), rng.choice(["yes", "a longer answer than that"]))
+        elif op == "answer":
+            kb.update_answer(rng.choice(questions), f"answer {step} with a few words")
+        elif op == "prune":
+            kb.prune(max_age_days=1)
+        elif op == "cleanup":
+            kb.cleanup_low_quality()
+        else:
+            kb.deduplicate()
+        clock.now += rng.choice([0, 3600, 86400])
+        for topic in topics:
+            assert kb.get_facts(topic) == _scan_facts(kb, topic)
+            for fact in facts:
+                assert kb._fact_index.get(knowledge.KnowledgeBase._fact_key(
+                    {"topic": topic, "fact": fact})) is _scan_fact(kb, topic, fact)
+        for question in questions:
+            assert kb._qa_index.get(knowledge._norm(question)) is _scan_qa(kb, question)
@@ -0,0 +1,74 @@
+import json
+import multiprocessing as mp
+from datetime import date
+
+from backend.utils.ledger import TradeLedger
+
+
+def _trade(path, symbol):
+    ledger = TradeLedger(path, None)
+    for day in range(20):
+        ledger.record_fill(symbol, "buy", 2, 10, ts=86400 * day)
+        ledger.record_fill(symbol, "sell", 2, 11 if day % 2 else 9.5, ts=86400 * day + 60)
+    ledger.close()
+
+
+def test_concurrent_processes_keep_every_fill(tmp_path):
+    path = str(tmp_path / "trades.db")
+    procs = [mp.Process(target=_trade, args=(path, sym)) for sym in ("AAA", "AAA", "BBB")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    ledger = TradeLedger(path, None)
+    totals = ledger.totals()
+    assert totals["AAA"]["trade_count"] == 40 and totals["BBB"]["trade_count"] == 20
+    assert totals["BBB"]["total_profit"] == 10 * 2 * 1 - 10 * 2 * 0.5
+    assert ledger.stats() == {"wins": 30, "losses": 30}
+    assert len(ledger.fills(0, 86400 * 2, "BBB")) == 4
+
+
+def test_pnl_between_reads_day_totals(tmp_path):
+    ledger = TradeLedger(str(tmp_path / "trades.db"), None)
+    ledger.record_fill("AAA", "buy", 1, 10, ts=0)
+    ledger.record_fill("AAA", "sell", 1, 12, ts=86400 * 3)
+    assert ledger.pnl_between(date(1970, 1, 1), date(1970, 1, 3))["pnl"] == 0
+    assert ledger.pnl_between("1970-01-04", "1970-01-04") == {"pnl": 2, "trades": 1, "wins": 1, "losses": 0}
+
+
+def test_order_ids_are_recorded_once(tmp_path):
+    ledger = TradeLedger(str(tmp_path / "trades.db"), None)
+    ledger.record_fill("AAA", "buy", 1, 10, order_id="x")
+    ledger.record_fill("AAA", "buy", 1, 10, order_id="x")
+    assert ledger.totals()["AAA"]["position"] == 1
+
+
+def test_legacy_totals_are_imported_once(tmp_path):
+    memory = tmp_path / "memory.json"
+    memory.write_text(json.dumps({
+        "AAPL": {"total_profit": 3.0, "trade_count": 2},
+        "stats": {"wins": 1, "losses": 1},
+        "cooldowns": {"AAPL": 1},
+    }))
+    path = str(tmp_path / "trades.db")
+    TradeLedger(path, str(memory)).close()
+    ledger = TradeLedger(path, str(memory))
+    assert ledger.totals()["AAPL"]["total_profit"] == 3.0
+    assert list(ledger.totals()) == ["AAPL"]
+    assert ledger.stats() == {"wins": 1, "losses": 1}
+
+
+def test_daily_report_reads_the_ledger_and_legacy_memory(tmp_path):
+    from backend.daily_report import generate_report
+
+    memory = tmp_path / "memory.json"
+    memory.write_text(json.dumps({"AAPL": {"total_profit": 3.0, "trade_count": 2}}))
+    ledger_path = str(tmp_path / "trades.db")
+    report = generate_report(str(memory), date(1970, 1, 1), ledger_path=ledger_path)
+    assert "AAPL: P/L 3.00 from 2 trades" in report
+    ledger = TradeLedger(ledger_path, None)
+    ledger.record_fill("MSFT", "buy", 1, 10, ts=0)
+    ledger.record_fill("MSFT", "sell", 1, 12, ts=60)
+    ledger.close()
+    report = generate_report(str(tmp_path / "missing.json"), date(1970, 1, 1), ledger_path=ledger_path)
+    assert "1970-01-01: P/L 2.00 from 1 trades" in report
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.features.bar_store import BarStore
+from backend.features.market_data import fetch_snapshot
+
+SYMBOLS = [f"SYM{i}" for i in range(10)]
+
+
+class _FakeREST:
+    """Alpaca REST stand-in that counts requests."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_account(self):
+        self.calls.append(("account",))
+        return SimpleNamespace(cash="1000.5")
+
+    def get_latest_trades(self, symbols):
+        self.calls.append(("trades", tuple(symbols)))
+        return {sym: SimpleNamespace(price=10.0 + i) for i, sym in enumerate(symbols)}
+
+    def get_bars(self, symbols, timeframe, start, end):
+        self.calls.append(("bars", tuple(symbols)))
+        index = pd.date_range(end=pd.Timestamp(end).floor("h"), periods=48, freq="h", tz="UTC")
+        frames = [
+            pd.DataFrame({"close": np.linspace(10, 20, len(index)) + i, "symbol": sym}, index=index)
+            for i, sym in enumerate(symbols)
+        ]
+        return SimpleNamespace(df=pd.concat(frames))
+
+
+@pytest.mark.parametrize("with_store", [False, True])
+def test_ten_symbols_take_three_requests(tmp_path, with_store):
+    api = _FakeREST()
+    store = BarStore(str(tmp_path)) if with_store else None
+    snapshot = fetch_snapshot(api, SYMBOLS, store=store)
+    assert [call[0] for call in api.calls] == ["account", "trades", "bars"]
+    assert api.calls[1][1] == api.calls[2][1] == tuple(SYMBOLS)
+    assert snapshot.cash == 1000.5
+    assert snapshot.prices == {sym: 10.0 + i for i, sym in enumerate(SYMBOLS)}
+    assert sorted(snapshot.closes) == sorted(SYMBOLS)
+    assert all(snapshot.closes_for(sym).iloc[-1] == 20 + i for i, sym in enumerate(SYMBOLS))
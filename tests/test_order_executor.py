@@ -0,0 +1,108 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.features import autotrade
+from backend.features.fill_reconciler import FillReconciler
+from backend.features.order_executor import Order, OrderExecutor
+from backend.utils.ledger import TradeLedger
+from backend.utils.memory import MemoryManager
+from backend.utils.resilience import TokenBucket
+
+
+def _report(cid, status, filled_qty=0, price=None):
+    return SimpleNamespace(client_order_id=cid, status=status, filled_qty=str(filled_qty),
+                           filled_avg_price=None if price is None else str(price),
+                           filled_at="2024-01-02T15:00:00Z" if filled_qty else None)
+
+
+class _Broker:
+    """Alpaca REST stand-in; ``reports`` is what ``list_orders`` returns."""
+
+    def __init__(self):
+        self.reports = {}
+        self.calls = []
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id=None):
+        self.calls.append("submit")
+        return _report(client_order_id, "accepted")
+
+    def list_orders(self, **kwargs):
+        self.calls.append("list")
+        return list(self.reports.values())
+
+    def get_order_by_client_order_id(self, cid):
+        self.calls.append("get")
+        exc = Exception("order not found")
+        exc.status_code = 404
+        raise exc
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = TradeLedger(str(tmp_path / "trades.db"), None)
+    yield ledger
+    ledger.close()
+
+
+def test_submission_does_not_wait_for_the_fill():
+    broker = _Broker()
+    results = []
+    executor = OrderExecutor(broker, rate=100, on_result=lambda *item: results.append(item))
+    start = time.monotonic()
+    executor.submit("AAA", 3, "buy", 10.0)
+    executor.close()
+    assert time.monotonic() - start < 1
+    assert broker.calls == ["submit"]
+    assert results[0][1].status == "accepted"
+
+
+def test_late_and_partial_fills_are_booked_once(ledger):
+    broker = _Broker()
+    fills = []
+    reconciler = FillReconciler(broker, ledger, TokenBucket(100), on_fill=fills.append)
+    ledger.add_order("c1", "AAA", "buy", 10)
+    assert reconciler.reconcile() == 0  # the broker does not list it yet: fetched, 404
+    assert ledger.open_orders() == []
+    ledger.add_order("c2", "AAA", "buy", 10)
+    broker.reports["c2"] = _report("c2", "accepted")
+    assert reconciler.reconcile() == 0
+    broker.reports["c2"] = _report("c2", "partially_filled", 4, 10.0)
+    assert reconciler.reconcile() == 1
+    assert reconciler.reconcile() == 0  # same report again books nothing
+    broker.reports["c2"] = _report("c2", "filled", 10, 10.6)
+    assert reconciler.reconcile() == 1
+    assert [(f["qty"], round(f["price"], 6)) for f in fills] == [(4, 10.0), (6, 11.0)]
+    assert ledger.totals()["AAA"]["position"] == 10
+    assert ledger.totals()["AAA"]["avg_cost"] == pytest.approx(10.6)
+    assert ledger.open_orders() == []
+    assert ledger.fills()[0]["ts"] == pytest.approx(1704207600)
+
+
+def test_polls_take_tokens_from_the_shared_bucket(ledger):
+    broker = _Broker()
+    bucket = TokenBucket(1000)
+    reconciler = FillReconciler(broker, ledger, bucket)
+    ledger.add_order("c1", "AAA", "buy", 1)
+    broker.reports["c1"] = _report("c1", "new")
+    bucket.penalize(0.3)
+    start = time.monotonic()
+    reconciler.reconcile()
+    assert time.monotonic() - start >= 0.25
+
+
+def test_record_order_tracks_the_order_for_the_reconciler(ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(autotrade, "ledger", ledger)
+    monkeypatch.setattr(autotrade, "memory", MemoryManager(str(tmp_path / "memory.json"), autosave=False))
+    monkeypatch.setattr(autotrade, "send_telegram_alert", lambda message: None)
+    reconciler = FillReconciler(_Broker(), ledger, TokenBucket(100), interval=3600)
+    monkeypatch.setattr(autotrade, "reconciler", reconciler)
+    order = Order("AAA", 3, "buy", 10.0)
+    autotrade.record_order(order, _report(order.client_order_id, "accepted"), None)
+    assert [o["client_order_id"] for o in ledger.open_orders()] == [order.client_order_id]
+    assert ledger.fills() == []
+    filled = Order("BBB", 2, "buy", 5.0)
+    autotrade.record_order(filled, _report(filled.client_order_id, "filled", 2, 5.1), None)
+    assert [(f["ticker"], f["qty"], f["price"]) for f in ledger.fills()] == [("BBB", 2, 5.1)]
+    reconciler.close()
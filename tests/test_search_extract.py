@@ -0,0 +1,119 @@
+import os
+import time
+
+import pytest
+from bs4 import BeautifulSoup
+
+from backend.features.search_extract import BACKENDS
+
+# Run this file with a query (python -m tests.test_search_extract QUERY) to
+# replace the saved pages with live ones.
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data', 'fixtures', 'search')
+
+_DDG = (
+    '<html><body><div class="result"><a class="result__a" href="https://example.com">Café crème</a>'
+    '<a class="result__snippet">Naïve résumé</a></div></body></html>'
+)
+_BING = (
+    '<html><body><ol><li class="b_algo"><a href="https://example.com">Café crème</a>'
+    '<p>Naïve résumé</p></li></ol></body></html>'
+)
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+@pytest.mark.parametrize("encoding", ["utf-8", "iso-8859-1", "cp1252"])
+def test_declared_charset(name, encoding):
+    backend = BACKENDS[name]
+    expected = [("Café crème", "https://example.com", "Naïve résumé")]
+    assert backend.duckduckgo(_DDG.encode(encoding), encoding=encoding) == expected
+    assert backend.bing(_BING.encode(encoding), encoding=encoding) == expected
+
+
+def _reference_duckduckgo(html: str):
+    """Extraction exactly as ``web_search`` did it before ``search_extract``."""
+    soup = BeautifulSoup(html, "html.parser")
+    out = []
+    for r in soup.find_all("div", class_="result", limit=5):
+        title = r.find("a", class_="result__a")
+        snippet = (
+            r.find("a", class_="result__snippet")
+            or r.find("div", class_="result__snippet")
+            or r.find("span", class_="result__snippet")
+        )
+        out.append((
+            title.get_text(" ", strip=True) if title else "",
+            (title.get("href") or "") if title else "",
+            snippet.get_text(" ", strip=True) if snippet else "",
+        ))
+    return out
+
+
+def _reference_bing(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    out = []
+    for r in soup.find_all("li", class_="b_algo", limit=5):
+        a_tag = r.find("a")
+        snippet = r.find("p")
+        out.append((
+            a_tag.get_text(" ", strip=True) if a_tag else "",
+            (a_tag.get("href") or "") if a_tag else "",
+            snippet.get_text(" ", strip=True) if snippet else "",
+        ))
+    return out
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+@pytest.mark.parametrize("provider, reference", [
+    ("duckduckgo", _reference_duckduckgo),
+    ("bing", _reference_bing),
+])
+def test_backends_match_reference_on_saved_pages(name, provider, reference):
+    with open(os.path.join(FIXTURE_DIR, f"{provider}.html"), "rb") as f:
+        content = f.read()
+    expected = reference(content.decode("utf-8"))
+    assert expected
+    assert getattr(BACKENDS[name], provider)(content) == expected
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("provider, reference", [
+    ("duckduckgo", _reference_duckduckgo),
+    ("bing", _reference_bing),
+])
+def test_benchmark_backends(provider, reference, rounds=50):
+    with open(os.path.join(FIXTURE_DIR, f"{provider}.html"), "rb") as f:
+        content = f.read()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        expected = reference(content.decode("utf-8"))
+    base = (time.perf_counter() - start) / rounds
+    print(f"\n{provider}: reference {base * 1000:.2f} ms/page, {len(expected)} results")
+    for name, backend in BACKENDS.items():
+        extract = getattr(backend, provider)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            got = extract(content)
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f"  {name:<10} {elapsed * 1000:7.2f} ms/page  x{base / elapsed:5.1f}")
+        assert got == expected
+
+
+def _save_pages(query: str) -> None:
+    import requests
+
+    from backend.features.web_search import _HEADERS, BING_URL, DUCKDUCKGO_URL
+
+    pages = (("duckduckgo", DUCKDUCKGO_URL, _reference_duckduckgo),
+             ("bing", BING_URL, _reference_bing))
+    for provider, url, reference in pages:
+        res = requests.get(url, params={"q": query}, headers=_HEADERS, timeout=10)
+        res.raise_for_status()
+        with open(os.path.join(FIXTURE_DIR, f"{provider}.html"), "wb") as f:
+            f.write(res.content)
+        results = reference(res.content.decode("utf-8"))
+        print(f"{provider}: {len(res.content)} bytes, {len(results)} results")
+
+if __name__ == "__main__":
+    import sys
+
+    _save_pages(" ".join(sys.argv[1:]) or "what is python")
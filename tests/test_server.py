@@ -0,0 +1,129 @@
+import pytest
+
+import backend.server as server
+from backend.features.jobs import JobRunner, JobStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.db")), run=lambda symbols: {s: "hold" for s in symbols})
+    monkeypatch.setattr(server, "jobs", runner)
+    yield server.app.test_client()
+    runner.close()
+
+
+@pytest.mark.parametrize("body", [{"symbols": 5}, {"symbols": [1, 2]}, {"symbols": {"a": 1}}, ["AAPL"], "AAPL", 5])
+def test_create_job_rejects_malformed_bodies(client, body):
+    assert client.post("/jobs", json=body).status_code == 400
+
+
+def test_create_job(client):
+    res = client.post("/jobs", json={"symbols": ["aapl", "msft"]})
+    assert res.status_code == 202
+    job = res.get_json()
+    assert job["symbols"] == ["AAPL", "MSFT"]
+    assert res.headers["Location"] == f"/jobs/{job['id']}"
+    events = client.get(f"/jobs/{job['id']}/events").get_data(as_text=True)
+    assert "event: done" in events
+    assert client.get(f"/jobs/{job['id']}").get_json()["results"] == {"AAPL": "hold", "MSFT": "hold"}
+
+
+class _Brain:
+    def __init__(self):
+        self.calls = []
+        self.conversations = []
+        self.caches = []
+
+    def ask(self, question, cache=True, conversation=None):
+        self.calls.append(question)
+        self.conversations.append(conversation)
+        self.caches.append(cache)
+        return f"answer to {question}"
+
+
+@pytest.fixture
+def brain(monkeypatch):
+    fake = _Brain()
+    monkeypatch.setattr(server, "_brain", fake)
+    return fake
+
+
+@pytest.mark.parametrize("body", [{"question": 5}, {"question": ["a"]}, {"question": "  "}, {}, ["what?"], "what?"])
+def test_ask_rejects_malformed_bodies(client, brain, body):
+    assert client.post("/ask", json=body).status_code == 400
+    assert brain.calls == []
+
+
+def test_ask(client, brain):
+    res = client.post("/ask", json={"question": " What is AAPL? "})
+    assert res.status_code == 200
+    assert res.get_json()["answer"] == "answer to What is AAPL?"
+    assert client.get("/ask?q=hello").get_json()["answer"] == "answer to hello"
+    client.post("/ask", json={"question": "and MSFT?", "conversation": "alice"})
+    assert brain.conversations == [None, None, "alice"]
+    assert client.post("/ask", json={"question": "hi", "conversation": 5}).status_code == 400
+
+
+def test_ask_cache_flag(client, brain):
+    client.post("/ask", json={"question": "a", "cache": "false"})
+    client.post("/ask", json={"question": "b", "cache": False})
+    client.get("/ask?q=c&cache=0")
+    client.post("/ask", json={"question": "d", "cache": "true"})
+    client.post("/ask", json={"question": "e"})
+    assert brain.caches == [False, False, False, True, True]
+    for bad in ("maybe", 2, [True]):
+        assert client.post("/ask", json={"question": "f", "cache": bad}).status_code == 400
+    assert len(brain.caches) == 5
+
+
+def test_job_events_end_when_the_job_is_pruned(client, monkeypatch):
+    from types import SimpleNamespace
+
+    job = {"id": "j1", "status": "running", "updated": 1.0}
+    answers = [job, job, None]
+    store = SimpleNamespace(get=lambda job_id: answers.pop(0) if answers else None)
+    monkeypatch.setattr(server, "jobs", SimpleNamespace(store=store))
+    monkeypatch.setattr(server, "JOB_POLL_INTERVAL", 0.01)
+    events = client.get("/jobs/j1/events").get_data(as_text=True)
+    assert events.startswith("event: running\n")
+    assert events.rstrip().split("\n")[-2:] == ["event: gone", 'data: {"id": "j1"}']
+
+
+def test_identical_questions_share_one_answer_and_overflow_is_shed(client, monkeypatch):
+    import threading
+    import time
+
+    from backend.utils.resilience import ConcurrencyLimit, KeyedLimit, SingleFlight
+
+    class Slow(_Brain):
+        def ask(self, question, cache=True, conversation=None):
+            time.sleep(0.3)
+            return super().ask(question, cache, conversation)
+
+    brain = Slow()
+    monkeypatch.setattr(server, "_brain", brain)
+    monkeypatch.setattr(server, "ask_flight", SingleFlight())
+    monkeypatch.setattr(server, "ask_limit", ConcurrencyLimit(1, 1, 5))
+    monkeypatch.setattr(server, "client_limit", KeyedLimit(1))
+    results = []
+
+    def ask(question, client_id):
+        res = server.app.test_client().post("/ask", json={"question": question},
+                                            headers={"X-Client-Id": client_id})
+        results.append((question, client_id, res.status_code))
+
+    threads = [threading.Thread(target=ask, args=("What is AAPL?" if i % 2 else "what is aapl", f"c{i}"))
+               for i in range(6)]
+    threads += [threading.Thread(target=ask, args=(f"other {i}", f"d{i}")) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    # c0 still waits for its first answer
+    threads.append(threading.Thread(target=ask, args=("again", "c0")))
+    threads[-1].start()
+    for t in threads:
+        t.join()
+    statuses = sorted(code for _, _, code in results)
+    assert len(brain.calls) <= 3  # one shared answer + at most two others
+    assert brain.calls.count("What is AAPL?") + brain.calls.count("what is aapl") == 1
+    assert 503 in statuses and 429 in statuses
@@ -0,0 +1,51 @@
+import json
+import os
+import random
+
+import pytest
+
+from autotrain import DYNAMIC_KEYWORDS, SEED_TOPICS, TEMPLATES
+from backend.features.similarity import QuestionIndex
+
+KNOWLEDGE_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'data', 'knowledge.json')
+
+
+def _questions():
+    """The committed knowledge base questions plus every autotrain question."""
+    with open(KNOWLEDGE_PATH, encoding="utf-8") as f:
+        stored = [qa["question"] for qa in json.load(f)["qa"] if qa["question"]]
+    generated = [t.format(topic=topic, keyword=keyword)
+                 for t in TEMPLATES for topic in SEED_TOPICS for keyword in DYNAMIC_KEYWORDS]
+    return stored + generated
+
+
+def _variants(question, rng):
+    chars = list(question)
+    i = rng.randrange(len(chars))
+    typo = "".join(chars[:i] + chars[i + 1:])
+    return [question.upper(), question.rstrip("?") + " ?", typo, question.split()[-1]]
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = QuestionIndex()
+    for i, question in enumerate(_questions()):
+        index.add(question, {"id": i, "question": question})
+    return index
+
+
+def test_fast_path_matches_exact_scan(index):
+    rng = random.Random(3)
+    queries = [v for q in rng.sample(_questions(), 50) for v in _variants(q, rng)]
+    queries += ["What is the weather in Paris?", "stock price of AAPL", ""]
+    for query in queries:
+        assert index.best_match(query) == index.best_match(query, exact=True), query
+
+
+def test_common_trigrams_are_not_walked(index):
+    common = max(index.max_candidates, int(len(index) * index.max_df))
+    assert any(len(keys) > common for keys in index._postings.values())
+    # most questions share "wha"/"the" grams; the candidates stay bounded
+    candidates = index.candidates("What are the risks of blockchain?")
+    assert len(candidates) <= index.max_candidates
+    assert candidates[0] == "what are the risks of blockchain?"
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.features.streaming import LatestQueue, ReplaySource, StreamTrader
+
+from .test_indicators import SIGNALS
+
+
+def _closes(length: int = 200) -> dict:
+    rng = np.random.default_rng(11)
+    index = pd.date_range("2024-01-01", periods=length, freq="h", tz="UTC")
+    return {
+        sym: pd.Series(50 + np.cumsum(rng.normal(0, 1.5, length)), index=index)
+        for sym in ("AAA", "BBB", "CCC")
+    }
+
+
+@pytest.mark.parametrize("strategy", sorted(SIGNALS))
+def test_replay_decisions_match_pandas(strategy):
+    reference = SIGNALS[strategy][0]
+    closes = _closes()
+    expected = {
+        sym: [(reference(series.iloc[: i + 1]), float(series.iloc[i])) for i in range(1, len(series))]
+        for sym, series in closes.items()
+    }
+    expected = {sym: [d for d in decisions if d[0] != "hold"] for sym, decisions in expected.items()}
+    executed = {sym: [] for sym in closes}
+    trader = StreamTrader(
+        ReplaySource(closes), list(closes), strategy,
+        execute=lambda sym, action, price: executed[sym].append((action, price)),
+    )
+    stats = trader.run()
+    assert stats["bars"] == sum(len(s) for s in closes.values())
+    assert stats["signals"] == sum(len(d) for d in expected.values()) > 0
+    assert stats["executed"] + stats["coalesced"] == stats["signals"]
+    for sym, decisions in executed.items():
+        # coalescing only drops decisions, it never reorders or invents them
+        it = iter(expected[sym])
+        assert all(d in it for d in decisions)
+
+
+def test_latest_queue_keeps_the_newest_item_per_key():
+    queue = LatestQueue()
+    queue.put("AAA", "buy")
+    queue.put("BBB", "sell")
+    queue.put("AAA", "sell")
+    assert queue.dropped == 1
+    assert queue.get(0) == ("AAA", "sell")
+    assert queue.get(0) == ("BBB", "sell")
+
+
+def test_latest_queue_applies_backpressure():
+    queue = LatestQueue(maxsize=1)
+    assert queue.put("AAA", "buy")
+    assert not queue.put("BBB", "buy", timeout=0.05)
+    assert queue.put("AAA", "sell", timeout=0.05)  # a waiting key never blocks
+    queue.close()
+    assert queue.get(0) == ("AAA", "sell")
+    assert queue.get(0) is None
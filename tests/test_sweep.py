@@ -0,0 +1,47 @@
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from backend.features import sweep as sweep_module
+from backend.features.sweep import sweep
+
+GRID = {"EMA": {"short": [5, 8], "long": [20]}}
+
+
+def _prices(unit: str) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    index = pd.date_range("2024-01-01", periods=2000, freq="h", tz="UTC").as_unit(unit)
+    walks = {sym: 12 + np.cumsum(rng.normal(0, 0.15, len(index))) for sym in ("AAA", "BBB")}
+    return pd.DataFrame(walks, index=index).clip(lower=1)
+
+
+def test_sweep_does_not_depend_on_index_unit():
+    tables = [
+        sweep(_prices(unit), GRID, workers=1, cash=10000, cooldown=3600)
+        .set_index("params")[["fills", "pnl"]].sort_index()
+        for unit in ("s", "us", "ns")
+    ]
+    assert (tables[0]["fills"] > 0).all()
+    for table in tables[1:]:
+        pd.testing.assert_frame_equal(table, tables[0])
+
+
+def test_single_worker_closes_the_blocks_it_attached(monkeypatch):
+    opened = []
+
+    class Tracked(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.closed = False
+            opened.append(self)
+
+        def close(self):
+            super().close()
+            self.closed = True
+
+    monkeypatch.setattr(sweep_module, "shared_memory", SimpleNamespace(SharedMemory=Tracked))
+    sweep(_prices("ns"), GRID, workers=1)
+    assert len(opened) == 8  # four created, four attached
+    assert all(block.closed for block in opened)
@@ -0,0 +1,112 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.features import telegram_alerts
+
+
+class _Telegram(ThreadingHTTPServer):
+    """sendMessage stub: answers with the next queued status (200 when empty)."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.messages = []
+        self.statuses = []
+        self.release = threading.Event()
+        self.release.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.release.wait(10)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status == 200:
+            self.server.messages.append(body["text"])
+            out = {"ok": True}
+        else:
+            out = {"ok": False, "parameters": {"retry_after": 0.1}}
+        data = json.dumps(out).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    srv = _Telegram()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(telegram_alerts, "TELEGRAM_API_URL", f"http://127.0.0.1:{srv.server_port}")
+    yield srv
+    srv.release.set()
+    srv.shutdown()
+
+
+@pytest.fixture
+def dispatcher(telegram, tmp_path):
+    d = telegram_alerts.TelegramDispatcher(
+        "token", "chat", window=0.3, rate=100,
+        spool_path=str(tmp_path / "spool.jsonl"), retry_interval=3600,
+    )
+    yield d
+    d.close()
+
+
+def test_coalesces_messages(dispatcher, telegram):
+    for i in range(3):
+        dispatcher.enqueue(f"alert {i}")
+    dispatcher.close()
+    assert telegram.messages == ["alert 0\nalert 1\nalert 2"]
+    assert dispatcher.stats["coalesced"] == 2
+
+
+def test_429_spools_and_retries(dispatcher, telegram):
+    telegram.statuses.append(429)
+    dispatcher._last_retry = time.monotonic()  # no retry right after the batch
+    dispatcher.enqueue("alert")
+    dispatcher.close()
+    assert telegram.messages == []
+    assert dispatcher.stats["spooled"] == 1
+    time.sleep(0.2)
+    dispatcher._retry_spool()
+    assert telegram.messages == ["alert"]
+    assert telegram_alerts._read_spool(dispatcher.spool_path) == []
+
+
+def test_spooling_is_not_blocked_by_a_retry(dispatcher, telegram):
+    dispatcher.close()
+    dispatcher._spool([("chat", "old 1"), ("chat", "old 2")])
+    telegram.release.clear()
+    telegram.statuses.extend([200, 429])
+    retry = threading.Thread(target=dispatcher._retry_spool)
+    retry.start()
+    time.sleep(0.2)
+    start = time.monotonic()
+    dispatcher._spool([("chat", "new")])
+    assert time.monotonic() - start < 1
+    telegram.release.set()
+    retry.join(10)
+    assert telegram.messages == ["old 1"]
+    # what failed stays ahead of what was spooled meanwhile
+    assert [e["text"] for e in telegram_alerts._read_spool(dispatcher.spool_path)] == ["old 2", "new"]
+
+
+def test_retry_picks_up_sending_files_of_dead_processes(dispatcher, telegram):
+    dispatcher.close()
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    telegram_alerts._write_spool(
+        f"{dispatcher.spool_path}.{dead.pid}.sending", [{"chat_id": "chat", "text": "orphan", "ts": 0}]
+    )
+    dispatcher._spool([("chat", "spooled")])
+    dispatcher._retry_spool()
+    assert telegram.messages == ["orphan", "spooled"]
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.features import ollama, web_search
+from backend.utils.cache import PersistentCache
+from backend.utils.resilience import CircuitBreaker, LatencyHistogram, TokenBucket
+
+QUERY = "python release schedule"
+_PAGES = {
+    "/ddg": '<div class="result"><a class="result__a" href="https://python.org/ddg">Python release schedule</a>'
+            '<a class="result__snippet">The python release schedule from DuckDuckGo</a></div>',
+    "/bing": '<ol><li class="b_algo"><a href="https://python.org/bing">Python release schedule</a>'
+             '<p>The python release schedule from Bing</p></li></ol>',
+}
+
+
+class _Stub(ThreadingHTTPServer):
+    """DuckDuckGo, Bing and Ollama on one port; ``delays`` and ``statuses``
+    are per path."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delays = {}
+        self.statuses = {}
+        self.hits = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, body: bytes, content_type: str):
+        path = self.path.split("?")[0]
+        self.server.hits.append(path)
+        time.sleep(self.server.delays.get(path, 0))
+        self.send_response(self.server.statuses.get(path, 200))
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        page = _PAGES.get(self.path.split("?")[0], "")
+        self._reply(f"<html><body>{page}</body></html>".encode(), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = {"response": "Python releases follow an annual schedule", "done": True}
+        self._reply(json.dumps(body).encode(), "application/json")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    srv = _Stub()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(web_search, "DUCKDUCKGO_URL", srv.url + "/ddg")
+    monkeypatch.setattr(web_search, "BING_URL", srv.url + "/bing")
+    monkeypatch.setattr(web_search, "SEARCH_TIMEOUT", 3)
+    monkeypatch.setattr(web_search, "breakers", {n: CircuitBreaker(2, 60) for n in web_search._PROVIDERS})
+    monkeypatch.setattr(web_search, "latencies", {n: LatencyHistogram() for n in web_search._PROVIDERS})
+    monkeypatch.setattr(web_search, "limits", {n: TokenBucket(0) for n in web_search._PROVIDERS})
+    monkeypatch.setattr(ollama, "limit", TokenBucket(0))
+    monkeypatch.setattr(ollama, "OLLAMA_URL", srv.url)
+    monkeypatch.setattr(ollama, "generation_cache", PersistentCache(str(tmp_path / "gen.db")))
+    yield srv
+    srv.shutdown()
+
+
+def test_race_returns_the_fast_provider(stub):
+    stub.delays["/ddg"] = 2
+    start = time.monotonic()
+    text, source = web_search.search_with_source(QUERY, use_cache=False)
+    assert time.monotonic() - start < 1.5
+    assert source == "bing"
+    assert "from Bing" in text
+
+
+def test_hedge_waits_for_the_p90_of_the_first_provider(stub):
+    # with latency history the slower provider only starts after the p90
+    for _ in range(5):
+        web_search.latencies["duckduckgo"].record(0.01)
+        web_search.latencies["bing"].record(1.0)
+    text, source = web_search.search_with_source(QUERY, use_cache=False)
+    assert source == "duckduckgo"
+    assert stub.hits == ["/ddg"]
+
+
+def test_failing_provider_opens_its_breaker(stub):
+    stub.statuses["/ddg"] = 500
+    for _ in range(2):
+        assert web_search.search_with_source(QUERY, use_cache=False)[1] == "bing"
+    # a losing request finishes in the background
+    deadline = time.monotonic() + 2
+    while web_search.provider_stats()["duckduckgo"]["breaker"] != "open" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert web_search.provider_stats()["duckduckgo"]["breaker"] == "open"
+    stub.hits.clear()
+    assert web_search.search_with_source(QUERY, use_cache=False)[1] == "bing"
+    assert "/ddg" not in stub.hits
+
+
+def test_ollama_fallback_when_every_provider_fails(stub):
+    stub.statuses["/ddg"] = stub.statuses["/bing"] = 503
+    text, source = web_search.search_with_source(QUERY, use_cache=False)
+    assert source == "ollama"
+    assert text.endswith("Python releases follow an annual schedule")
+    assert "/api/generate" in stub.hits
+
+
+def test_each_provider_has_its_own_rate_limit(stub):
+    web_search.limits["duckduckgo"].penalize(1)
+    start = time.monotonic()
+    assert web_search.search_with_source(QUERY, use_cache=False)[1] == "bing"
+    assert time.monotonic() - start < 0.8
+    assert "/ddg" not in stub.hits
+    # the held-back DuckDuckGo request goes out once its bucket allows
+    deadline = time.monotonic() + 3
+    while "/ddg" not in stub.hits and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "/ddg" in stub.hits
+
+
+def test_ollama_rate_limit_skips_cached_completions(stub):
+    assert ollama.generate("mistral", "hello")
+    ollama.limit.penalize(5)
+    start = time.monotonic()
+    assert ollama.generate("mistral", "hello")
+    assert time.monotonic() - start < 1
+    assert stub.hits.count("/api/generate") == 1
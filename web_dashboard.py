@@ -1,15 +1,24 @@
+from datetime import datetime, timedelta, timezone
+
 import streamlit as st
-from backend.utils.memory import MemoryManager
+from backend.features.dashboard import TradingSnapshot
 
+REFRESH_SECONDS = 2
 
-def show_dashboard():
-    mem = MemoryManager()
-    st.title("JARVIS Web Dashboard")
-    for ticker, info in mem.memory.items():
-        if ticker in ("stats", "cooldowns"):
-            continue
+
+@st.cache_resource
+def get_snapshot() -> TradingSnapshot:
+    # one ledger connection and watcher shared by every session
+    return TradingSnapshot().watch()
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_totals(snapshot: TradingSnapshot):
+    # reruns only redraw from the cached figures
+    data = snapshot.data
+    for ticker, info in data["totals"].items():
         st.write(f"**{ticker}** - P/L: {info['total_profit']:.2f} from {info['trade_count']} trades")
-    stats = mem.memory.get("stats", {})
+    stats = data["stats"]
     wins = stats.get("wins", 0)
     losses = stats.get("losses", 0)
     total = wins + losses
@@ -17,5 +26,17 @@ def show_dashboard():
         st.write(f"Win rate: {wins/total*100:.2f}%")
 
 
+def show_dashboard():
+    snapshot = get_snapshot()
+    st.title("JARVIS Web Dashboard")
+    show_totals(snapshot)
+    today = datetime.now(timezone.utc).date()
+    picked = st.date_input("P/L for dates", (today - timedelta(days=6), today))
+    if len(picked) == 2:
+        start, end = picked
+        period = snapshot.pnl_between(start, end)
+        st.write(f"P/L {start} to {end}: {period['pnl']:.2f} from {period['trades']} trades")
+
+
 if __name__ == "__main__":
     show_dashboard()